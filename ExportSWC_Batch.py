@@ -16,18 +16,32 @@
 #    </CustomTools>
 
 
-import ImarisLib
-import time
-import random
-import numpy as np
 import logging
 import traceback # Import traceback module for detailed error info
 import os # Import os module for path manipulation
 
-# GUI imports
-from tkinter import *
-from tkinter import messagebox
-from tkinter import simpledialog, filedialog
+import _utils
+
+# Helper modules (and numpy through them) load on first use, so the XTension
+# starts and shows its first dialog without waiting for them
+_batch_scheduler = _utils.lazy_import('_batch_scheduler')
+_convert_pool = _utils.lazy_import('_convert_pool')
+_coord_transform = _utils.lazy_import('_coord_transform')
+_dataset_ready = _utils.lazy_import('_dataset_ready')
+_export_pipeline = _utils.lazy_import('_export_pipeline')
+_filament_fetch = _utils.lazy_import('_filament_fetch')
+_h5_store = _utils.lazy_import('_h5_store')
+_imaris_pool = _utils.lazy_import('_imaris_pool')
+_manifest = _utils.lazy_import('_manifest')
+_morphometry = _utils.lazy_import('_morphometry')
+_perf = _utils.lazy_import('_perf')
+_scene_index = _utils.lazy_import('_scene_index')
+_swc_binary = _utils.lazy_import('_swc_binary')
+_swc_convert = _utils.lazy_import('_swc_convert')
+_swc_io = _utils.lazy_import('_swc_io')
+
+# GUI imports are made by the XTension entry points only, so the export logic
+# also runs headless (see swc_cli)
 
 # --- Configuration ---
 # *** IMPORTANT: SET A VALID PATH FOR YOUR LOG FILE ***
@@ -37,184 +51,488 @@ from tkinter import simpledialog, filedialog
 # Using os.path.expanduser('~') gets your home directory automatically:
 log_file_path = os.path.join(os.path.expanduser('~'), 'imaris_swc_export.log')
 
-# Configure logging to write to the specified file
-logging.basicConfig(filename=log_file_path,
-                    level=logging.DEBUG, # Log everything from DEBUG level up
-                    format='%(asctime)s - %(levelname)s - %(funcName)s - %(message)s', # Include function name
-                    filemode='a') # 'a' to append, 'w' to overwrite each time
-
-# Also log to console (useful if the window *doesn't* close instantly)
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO) # Log INFO level and above to console
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-console_handler.setFormatter(formatter)
-logging.getLogger().addHandler(console_handler)
-
-
-def _wait_for_dataset(vImaris, timeout_sec=60.0, poll_sec=0.5):
-    """Wait until Imaris dataset is loaded or timeout."""
-    start = time.time()
-    while time.time() - start < timeout_sec:
-        try:
-            if vImaris.GetDataSet() is not None:
-                return True
-        except Exception:
-            pass
-        time.sleep(poll_sec)
-    return False
-
 
-def _find_first_filaments(vImaris):
-    """Traverse the Surpass scene and return the first Filaments object found, else None."""
-    vFactory = vImaris.GetFactory()
-    scene = vImaris.GetSurpassScene()
-    if scene is None:
-        return None
-
-    # DFS over DataContainer tree
-    stack = [scene]
-    while stack:
-        container = stack.pop()
-        try:
-            n = container.GetNumberOfChildren()
-        except Exception:
-            n = 0
-        for i in range(n):
-            try:
-                child = container.GetChild(i)
-            except Exception:
-                continue
-            fil = vFactory.ToFilaments(child)
-            if fil is not None:
-                return fil
-            # If this child is a container, go deeper
-            c_as_container = vFactory.ToDataContainer(child)
-            if c_as_container is not None:
-                stack.append(c_as_container)
-    return None
-
-
-def _export_filaments_to_swc(vImaris, vFilaments, savename, write_individual=False):
-    """Core export logic to write SWC(s) for the given Imaris Filaments object.
-    If write_individual is False, only writes the combined SWC to savename.
-    If True, also writes per-filament files using <savename_base>_filament_<i>.swc.
-    """
-    V = vImaris.GetDataSet()
-    if V is None:
-        raise RuntimeError("Could not get DataSet from Imaris.")
+def _setup_logging():
+    """Log everything to log_file_path (appending) and INFO and up to the console.
+    Called by the entry points, so importing this module configures nothing."""
+    _utils.setup_logging(log_file_path, console_level=logging.INFO,
+                         file_format='%(asctime)s - %(levelname)s - %(funcName)s - %(message)s')
+
+# Extra Imaris instances for batch export, as (endpoints, application id) pairs.
+# Each one gets its own worker process and connection next to the instance that
+# launched the XTension; leave empty to process all files in that instance.
+# Example: [('default -p 4029', 1), ('default -h node2 -p 4029', 0)]
+BATCH_WORKERS = []
+
+# Batch export skips files already exported (see _manifest). Set to True to also
+# store a content hash of every .ims file, so files that were only touched or
+# copied are recognised as unchanged. Hashing reads every source once.
+MANIFEST_HASH_SOURCES = False
+
+# Start every exported SWC with a standard '#' comment header (source, date, columns)
+WRITE_SWC_HEADER = False
+
+# Time-lapse datasets: write the combined SWC in timepoint order, each timepoint
+# introduced by a '# TIME_INDEX <t>' comment, so the import tools can restore it.
+# Timepoints are converted in parallel by TIME_POINT_WORKERS threads.
+EXPORT_TIME_INDEX = False
+TIME_POINT_WORKERS = min(8, os.cpu_count() or 1)
+
+# Processes converting the filaments of one large object in parallel (objects of
+# at least _convert_pool.PARALLEL_MIN_VERTICES vertices); 0 or 1 converts them
+# on one core. The filament data is shared with the workers, not copied. Off by
+# default: enable it only where benchmarks/bench_convert_pool.py shows a gain on
+# the processing machine (it did not on the machines it was measured on).
+CONVERT_WORKERS = 0
+
+# Output format: 'swc' (text) or 'swcb', a memory-mappable binary file holding all
+# filaments of an object (see _swc_binary), much faster to write and read back.
+# With 'swcb' no per-filament files or text header are written.
+EXPORT_FORMAT = 'swc'
+
+# Batch output target: 'files' mirrors the input tree with one file per .ims, 'hdf5'
+# writes everything into one compressed store (_h5_store.STORE_NAME in the output
+# folder, needs h5py) with a group per .ims file and a dataset per filament.
+# The store has a single writer, so 'hdf5' ignores BATCH_WORKERS.
+BATCH_OUTPUT = 'files'
+
+# Longest wait for a batch file to load after FileOpen (see _dataset_ready)
+LOAD_TIMEOUT_SEC = 120.0
+
+# Filaments objects exported from each batch file: 'first' (first in the Surpass
+# tree), 'all', or a glob pattern matched against the object name or its path of
+# '/'-joined folder names, e.g. 'Neuron*' or '*/Traced/*'. Except with 'first',
+# each object goes to <file>_<object name>.swc (with 'hdf5', to the group
+# <file>/objects/<object name>).
+EXPORT_OBJECTS = 'first'
+
+# Where each SWC tree is rooted (see _swc_convert.ROOT_POLICIES): 'beginning' the
+# Imaris beginning vertex of the filament (usually the soma; the lowest vertex index
+# where Imaris does not report one), 'index' the lowest vertex index, 'radius' the
+# widest vertex. 'beginning' costs one extra Imaris call per filament on top of the
+# bulk fetch; 'index' skips it where the root does not matter.
+# SWC_ORDER numbers the nodes 'bfs' (by tree level) or 'dfs' (depth-first, each
+# branch contiguous); either way every parent comes before its children.
+SWC_ROOT = 'beginning'
+SWC_ORDER = 'bfs'
+
+# Streaming text SWC export: fetch, convert and append one filament at a time, so
+# memory is bounded by the largest filament instead of the whole object (at 4-6
+# Imaris calls per filament instead of one bulk call). Applies to single export
+# and to batch export with BATCH_OUTPUT 'files', whose files are then exported on
+# the Imaris thread without the background pipeline. The SWC is the same;
+# EXPORT_FORMAT 'swcb' needs all filaments at once and is not streamed.
+EXPORT_STREAMING = False
+
+# Morphometrics computed from the converted trees during export (see _morphometry):
+# cable length, branch points, tips and a Sholl profile (intersections every
+# SHOLL_STEP around each filament's root). Lengths and SHOLL_STEP are in Imaris
+# world units (micrometres), not the voxel units of the SWC positions. Written
+# to <file>_morphometry.csv next to each SWC and, for a batch, summed per file in
+# batch_morphometry.csv in the output folder (with 'hdf5', only there).
+MORPHOMETRY = False
+SHOLL_STEP = 10.0
+
+# Batch export times the open, scene, fetch, convert and write stage of every file
+# and counts Imaris calls, filaments, vertices, edges, SWC nodes and bytes written
+# (see _perf). They go to batch_metrics_<start time>.jsonl in the output folder,
+# one JSON line per file and a summary line; the summary table is also logged.
+PERF_LOG = True
+
+
+def _select_filaments(index):
+    """Filaments objects of a _scene_index.SceneIndex chosen by EXPORT_OBJECTS."""
+    if EXPORT_OBJECTS == 'first':
+        first = index.first()
+        return [first] if first is not None else []
+    return index.select(None if EXPORT_OBJECTS == 'all' else EXPORT_OBJECTS)
+
+
+def _object_outputs(base_path, objects):
+    """Output path (or store key) of each selected object; base_path is the output
+    path without extension (or, with 'hdf5', the source's store key)."""
+    if EXPORT_OBJECTS == 'first':
+        names = [base_path]
+    else:
+        names, seen = [], {}
+        for o in objects:
+            name = _scene_index.safe_name(o.name)
+            seen[name] = seen.get(name, 0) + 1
+            if seen[name] > 1:
+                name = f"{name}_{seen[name]}"
+            names.append(_h5_store.object_key(base_path, name) if BATCH_OUTPUT == 'hdf5'
+                         else f"{base_path}_{name}")
+    return names if BATCH_OUTPUT == 'hdf5' else [n + _output_extension() for n in names]
+
+
+def _dataset_transform(vImaris, metrics=None):
+    """CoordinateTransform of the open dataset. Its extents and sizes take several
+    RPCs, so it is read once per opened file and shared by all its objects."""
+    with _perf.span(metrics, 'fetch'):
+        V = vImaris.GetDataSet()
+        if V is None:
+            raise RuntimeError("Could not get DataSet from Imaris.")
+        return _coord_transform.CoordinateTransform.from_dataset(V)
 
-    # Calculate pixel scaling and offset
-    min_x, min_y, min_z = V.GetExtendMinX(), V.GetExtendMinY(), V.GetExtendMinZ()
-    max_x, max_y, max_z = V.GetExtendMaxX(), V.GetExtendMaxY(), V.GetExtendMaxZ()
-    size_x, size_y, size_z = V.GetSizeX(), V.GetSizeY(), V.GetSizeZ()
 
-    scale_x = size_x / (max_x - min_x) if (max_x - min_x) != 0 else 1.0
-    scale_y = size_y / (max_y - min_y) if (max_y - min_y) != 0 else 1.0
-    scale_z = size_z / (max_z - min_z) if (max_z - min_z) != 0 else 1.0
+def _fetch_filaments(vFilaments, transform, metrics=None):
+    """Fetch everything needed to convert a Filaments object (all the Imaris RPCs).
+    Returns (transform, filament_data), or None if it has no filaments.
+    """
+    with _perf.span(metrics, 'fetch'):
+        vCount = vFilaments.GetNumberOfFilaments()
+        if vCount == 0:
+            logging.warning("Filaments object contains 0 filaments.")
+            return None
+        fetched = transform, _filament_fetch.fetch_filaments(vFilaments, vCount, with_time=EXPORT_TIME_INDEX,
+                                                             with_root=SWC_ROOT == 'beginning')
+    _perf.count_fetched(metrics, fetched)
+    return fetched
+
+
+def _convert_group(transform, filament_data, indices):
+    """Convert the filaments at `indices` to a list of (filament index, time index, SWC array)."""
+    converted = []
+    for i in indices:
+        f = filament_data[i]
+        if len(f.positions) == 0:
+            logging.warning(f"Filament index {i} has no points. Skipping.")
+            continue
 
-    pixel_scale = np.array([scale_x, scale_y, scale_z])
-    pixel_offset = np.array([min_x, min_y, min_z])
+        # SWC conversion: traversal of every connected component from the root
+        # chosen by SWC_ROOT, numbered by SWC_ORDER (see _swc_convert)
+        swc_lines, n_invalid = _swc_convert.filament_to_swc(
+            f.positions, f.radii, f.types, f.edges, transform, SWC_ROOT, f.root, SWC_ORDER)
+        if n_invalid:
+            logging.warning(f"Filament {i}: ignored {n_invalid} edge(s) with out-of-range vertex indices")
+        converted.append((i, f.time_index, swc_lines))
+    return converted
 
-    if abs(min_z) > abs(max_z) and (max_z - min_z) != 0:
-        pixel_offset = np.array([min_x, min_y, max_z])
-        pixel_scale[2] = -pixel_scale[2]
 
+def _convert_filaments(fetched):
+    """Convert fetched filament data to a list of (filament index, time index, SWC array).
+    With EXPORT_TIME_INDEX the list is in timepoint order and the timepoints are
+    converted in parallel.
+    """
+    if fetched is None:
+        return []
+    transform, filament_data = fetched
+    if _convert_pool.can_parallelize(CONVERT_WORKERS, sum(len(f.positions) for f in filament_data)):
+        return _convert_in_pool(transform, filament_data)
+    if not EXPORT_TIME_INDEX:
+        return _convert_group(transform, filament_data, range(len(filament_data)))
+
+    groups = {}
+    for i, f in enumerate(filament_data):
+        groups.setdefault(f.time_index, []).append(i)
+    groups = [groups[t] for t in sorted(groups)]
+    if len(groups) == 1 or TIME_POINT_WORKERS <= 1:
+        parts = [_convert_group(transform, filament_data, g) for g in groups]
+    else:
+        import concurrent.futures
+        with concurrent.futures.ThreadPoolExecutor(min(TIME_POINT_WORKERS, len(groups))) as pool:
+            parts = list(pool.map(lambda g: _convert_group(transform, filament_data, g), groups))
+    return [item for part in parts for item in part]
+
+
+def _convert_in_pool(transform, filament_data):
+    """_convert_filaments on CONVERT_WORKERS processes, with the same result."""
+    indices = range(len(filament_data))
+    if EXPORT_TIME_INDEX:
+        indices = sorted(indices, key=lambda i: filament_data[i].time_index)
+    for i in indices:
+        if len(filament_data[i].positions) == 0:
+            logging.warning(f"Filament index {i} has no points. Skipping.")
+    converted = _convert_pool.convert(filament_data, [i for i in indices if len(filament_data[i].positions)],
+                                      transform, CONVERT_WORKERS, SWC_ROOT, SWC_ORDER)
+    for i, _swc, n_invalid in converted:
+        if n_invalid:
+            logging.warning(f"Filament {i}: ignored {n_invalid} edge(s) with out-of-range vertex indices")
+    return [(i, filament_data[i].time_index, swc_lines) for i, swc_lines, _n in converted]
+
+
+def _output_extension():
+    return _swc_binary.EXTENSION if EXPORT_FORMAT == 'swcb' else '.swc'
+
+
+def _write_combined(savename, converted, header=None):
+    """Stream all converted filaments into one SWC, with running node offsets.
+    With EXPORT_TIME_INDEX every timepoint starts with a TIME_INDEX comment.
+    With EXPORT_FORMAT 'swcb' a binary file is written instead.
+    """
+    if EXPORT_FORMAT == 'swcb':
+        _swc_binary.write_swcb(savename, [swc_lines for _i, _t, swc_lines in converted],
+                               [t for _i, t, _swc in converted])
+        return
+    with _swc_io.SWCWriter(savename, header) as writer:
+        time_index = None
+        for _i, t, swc_lines in converted:
+            if EXPORT_TIME_INDEX and t != time_index:
+                writer.comment(f"{_swc_io.TIME_INDEX_TAG} {t}")
+                time_index = t
+            writer.append(swc_lines)
+
+
+def _write_swc(savename, converted, write_individual=False, header=None, metrics=None):
+    """Write the combined SWC (and optionally per-filament files). Returns True if written."""
     base_name, _ = os.path.splitext(savename)
-
-    all_filaments_swc_data = []
-    vCount = vFilaments.GetNumberOfFilaments()
+    written = []
+    with _perf.span(metrics, 'write'):
+        if write_individual and EXPORT_FORMAT == 'swc':
+            for i, _t, swc_lines in converted:
+                filename_filament = f"{base_name}_filament_{i}.swc"
+                _swc_io.write_swc(filename_filament, swc_lines, header)
+                written.append(filename_filament)
+
+        if converted:
+            _write_combined(savename, converted, header)
+            written.append(savename)
+    if metrics is not None:
+        metrics['bytes_written'] += sum(os.path.getsize(path) for path in written)
+    return bool(converted)
+
+
+def _streaming():
+    return EXPORT_STREAMING and EXPORT_FORMAT == 'swc'
+
+
+def _stream_filaments_to_swc(vFilaments, transform, savename, write_individual=False, header=None, metrics=None,
+                             measured=None):
+    """EXPORT_STREAMING export: append each filament to savename as soon as it is
+    converted, with running node offsets. Returns True if anything was written.
+    With a `measured` list, the morphometry row of each filament is appended to it.
+    """
+    with _perf.span(metrics, 'fetch'):
+        vCount = vFilaments.GetNumberOfFilaments()
+        indices, times = range(vCount), None
+        if EXPORT_TIME_INDEX:
+            # The timepoint order of _convert_filaments: by time index, then filament index
+            times = [vFilaments.GetTimeIndex(i) for i in indices]
+            indices = sorted(indices, key=times.__getitem__)
     if vCount == 0:
         logging.warning("Filaments object contains 0 filaments.")
         return False
 
-    for i in range(vCount):
-        vFilamentsXYZ = vFilaments.GetPositionsXYZ(i)
-        vFilamentsRadius = vFilaments.GetRadii(i)
-        vFilamentsEdges = vFilaments.GetEdges(i)
-        vFilamentsTypes = vFilaments.GetTypes(i)
+    base_name, _ = os.path.splitext(savename)
+    filaments = _filament_fetch.iter_filaments(vFilaments, indices, with_time=EXPORT_TIME_INDEX,
+                                               with_root=SWC_ROOT == 'beginning', times=times)
+    writer = None
+    individual = []
+    time_index = None
+    try:
+        while True:
+            with _perf.span(metrics, 'fetch'):
+                item = next(filaments, None)
+            if item is None:
+                break
+            i, f = item
+            _perf.count_fetched(metrics, (transform, [f]))
+            with _perf.span(metrics, 'convert'):
+                converted = _convert_group(transform, {i: f}, [i])
+            _perf.count_converted(metrics, converted)
+            del item, f
+            with _perf.span(metrics, 'write'):
+                for _i, t, swc_lines in converted:
+                    if write_individual:
+                        individual.append(f"{base_name}_filament_{i}.swc")
+                        _swc_io.write_swc(individual[-1], swc_lines, header)
+                    if writer is None:
+                        writer = _swc_io.SWCWriter(savename, header)
+                    if EXPORT_TIME_INDEX and t != time_index:
+                        writer.comment(f"{_swc_io.TIME_INDEX_TAG} {t}")
+                        time_index = t
+                    writer.append(swc_lines)
+            if measured is not None:
+                measured.extend(_measure(converted, transform, metrics))
+            del converted
+    finally:
+        if writer is not None:
+            writer.close()
+    if metrics is not None:
+        metrics['bytes_written'] += sum(os.path.getsize(path) for path in individual)
+        metrics['bytes_written'] += writer.bytes_written if writer is not None else 0
+    return writer is not None
 
-        N = len(vFilamentsXYZ)
-        if N == 0:
-            continue
 
-        adj = [[] for _ in range(N)]
-        for p1, p2 in vFilamentsEdges:
-            if 0 <= p1 < N and 0 <= p2 < N:
-                adj[p1].append(p2)
-                adj[p2].append(p1)
-
-        swc_lines = np.zeros((N, 7))
-        visited = np.zeros(N, dtype=bool)
-        swc_idx_counter = 1
-        nodes_processed = 0
-
-        for start_node_idx in range(N):
-            if not visited[start_node_idx]:
-                queue = [(start_node_idx, -1)]
-                visited[start_node_idx] = True
-                while queue:
-                    cur_imaris_idx, current_swc_parent_idx = queue.pop(0)
-                    current_swc_idx = swc_idx_counter
-                    swc_idx_counter += 1
-
-                    pos = np.array(vFilamentsXYZ[cur_imaris_idx]) - pixel_offset
-                    scaled_pos = pos * pixel_scale
-                    radius = vFilamentsRadius[cur_imaris_idx]
-                    node_type = (
-                        vFilamentsTypes[cur_imaris_idx]
-                        if vFilamentsTypes and cur_imaris_idx < len(vFilamentsTypes)
-                        else 3
-                    )
-
-                    swc_lines[nodes_processed] = [
-                        current_swc_idx, node_type,
-                        scaled_pos[0], scaled_pos[1], scaled_pos[2],
-                        radius, current_swc_parent_idx
-                    ]
-                    nodes_processed += 1
-
-                    for neighbor_imaris_idx in adj[cur_imaris_idx]:
-                        if not visited[neighbor_imaris_idx]:
-                            visited[neighbor_imaris_idx] = True
-                            queue.append((neighbor_imaris_idx, current_swc_idx))
-
-        if nodes_processed != N:
-            swc_lines = swc_lines[:nodes_processed]
-
-        if write_individual:
-            filename_filament = f"{base_name}_filament_{i}.swc"
-            swc_format = '%d %d %.6f %.6f %.6f %.6f %d'
-            np.savetxt(filename_filament, swc_lines, fmt=swc_format, delimiter=' ')
-        all_filaments_swc_data.append(swc_lines)
-
-    if all_filaments_swc_data:
-        final_swc_data = []
-        node_offset = 0
-        for swc_data in all_filaments_swc_data:
-            if swc_data.shape[0] > 0:
-                temp_data = swc_data.copy()
-                temp_data[:, 0] += node_offset
-                parent_mask = temp_data[:, 6] != -1
-                temp_data[parent_mask, 6] += node_offset
-                final_swc_data.append(temp_data)
-                node_offset += swc_data.shape[0]
-        if final_swc_data:
-            combined_swcs = np.vstack(final_swc_data)
-            swc_format = '%d %d %.6f %.6f %.6f %.6f %d'
-            np.savetxt(savename, combined_swcs, fmt=swc_format, delimiter=' ')
-            return True
+def _export_filaments_to_swc(vImaris, vFilaments, savename, write_individual=False, metrics=None):
+    """Core export logic to write SWC(s) for the given Imaris Filaments object.
+    If write_individual is False, only writes the combined SWC to savename.
+    If True, also writes per-filament files using <savename_base>_filament_<i>.swc.
+    A metrics dict from _perf.new_metrics() collects the stage times and counters.
+    """
+    vImaris = _perf.count_calls(vImaris, metrics)
+    vFilaments = _perf.count_calls(vFilaments, metrics)
+    header = _swc_io.make_header(source=vFilaments.GetName()) if WRITE_SWC_HEADER else None
+    transform = _dataset_transform(vImaris, metrics)
+    if _streaming():
+        measured = [] if MORPHOMETRY else None
+        written = _stream_filaments_to_swc(vFilaments, transform, savename, write_individual, header, metrics,
+                                           measured)
+    else:
+        fetched = _fetch_filaments(vFilaments, transform, metrics)
+        with _perf.span(metrics, 'convert'):
+            converted = _convert_filaments(fetched)
+        _perf.count_converted(metrics, converted)
+        written = _write_swc(savename, converted, write_individual, header, metrics)
+        measured = _measure(converted, fetched[0], metrics) if MORPHOMETRY and written else None
+    if written and measured is not None:
+        _morphometry.write_csv(_morphometry.csv_path(savename), measured)
+    return written
+
+
+def _measure(converted, transform, metrics=None):
+    """Morphometry rows of converted filaments, in the world units of `transform` (see MORPHOMETRY)."""
+    with _perf.span(metrics, 'measure'):
+        return _morphometry.measure_filaments(converted, SHOLL_STEP, transform)
+
+
+def _record_morphometry(result, out_path, rows, write_csv=True):
+    """Write <out_path>_morphometry.csv and keep the summary for the batch CSV."""
+    if write_csv:
+        _morphometry.write_csv(_morphometry.csv_path(out_path), rows)
+    result.setdefault('morphometry', []).append((out_path, _morphometry.summarize(rows)))
+
+
+def _record_export(result, out_paths):
+    """Fill in a batch result dict once the SWC files out_paths were written (if any)."""
+    if out_paths:
+        for out_path in out_paths:
+            logging.info(f"Saved: {out_path}")
+        result.update(output='; '.join(out_paths), outputs=out_paths, status='ok')
+    else:
+        logging.warning(f"No SWC content for: {result['source']}")
+        result.update(status='empty', message='Filaments object has no vertices')
+
+
+def _pipeline_convert(payload):
+    """Pipeline convert stage; payload is (metrics or None, [(out_path, fetched), ...]).
+    Returns [(out_path, transform or None, converted), ...] for the write stage."""
+    metrics, targets = payload
+    with _perf.span(metrics, 'convert'):
+        converted = [(out_path, fetched[0] if fetched else None, _convert_filaments(fetched))
+                     for out_path, fetched in targets]
+    for _out_path, _transform, c in converted:
+        _perf.count_converted(metrics, c)
+    return converted
+
+
+def _batch_header(fpath):
+    return _swc_io.make_header(source=os.path.basename(fpath)) if WRITE_SWC_HEADER else None
+
+
+def _pipeline_write(result, targets):
+    header = _batch_header(result['source'])
+    metrics = result.get('metrics')
+    written = []
+    for out_path, transform, converted in targets:
+        if _write_swc(out_path, converted, header=header, metrics=metrics):
+            written.append(out_path)
+            if MORPHOMETRY:
+                _record_morphometry(result, out_path, _measure(converted, transform, metrics))
+    _record_export(result, written)
+
+
+def _store_write(store, result, targets):
+    """Pipeline write stage for BATCH_OUTPUT 'hdf5': one group per source file (and object).
+    Bytes written are counted uncompressed, as the store shares one file."""
+    metrics = result.get('metrics')
+    written = []
+    with _perf.span(metrics, 'write'):
+        for key, _transform, converted in targets:
+            if converted:
+                store.write_source(key, converted, source=os.path.basename(result['source']))
+                written.append(store.ref(key))
+                if metrics is not None:
+                    metrics['bytes_written'] += sum(swc.nbytes for _i, _t, swc in converted)
+    if MORPHOMETRY:
+        for key, transform, converted in targets:
+            if converted:
+                _record_morphometry(result, store.ref(key), _measure(converted, transform, metrics),
+                                    write_csv=False)
+    _record_export(result, written)
+
+
+def _export_settings():
+    """Settings that determine the batch SWC content; changing them invalidates the manifest."""
+    settings = {'swc_format': _swc_convert.SWC_FORMAT, 'write_individual': False, 'header': WRITE_SWC_HEADER,
+                'time_index': EXPORT_TIME_INDEX, 'format': EXPORT_FORMAT, 'output': BATCH_OUTPUT,
+                'objects': EXPORT_OBJECTS, 'root': SWC_ROOT, 'order': SWC_ORDER,
+                'morphometry': SHOLL_STEP if MORPHOMETRY else None}
+    if BATCH_OUTPUT == 'hdf5':
+        settings['store_layout'] = _h5_store.LAYOUT_VERSION
+    return settings
+
+
+def _export_one_file(vImaris, fpath, input_dir, output_dir, pipeline=None, result=None):
+    """Open one Imaris file and export its Filaments object(s) chosen by EXPORT_OBJECTS.
+    The SWC goes to the mirror of the file's folder under output_dir (or, with
+    BATCH_OUTPUT 'hdf5', to the store group the pipeline's write stage owns).
+    Fills in `result`, a _batch_scheduler.new_result() dict for the batch report.
+    With a pipeline, only the Imaris part runs here and True is returned once
+    the dict is handed on; conversion and writing complete it later.
+    """
+    _setup_logging()
+    if result is None:
+        result = _batch_scheduler.new_result(fpath)
+    metrics = result['metrics'] = _perf.new_metrics() if PERF_LOG else None
+    vImaris = _perf.count_calls(vImaris, metrics)
+    if BATCH_OUTPUT == 'hdf5':
+        base_path = _h5_store.source_key(fpath, input_dir)
+    else:
+        base = os.path.splitext(os.path.basename(fpath))[0]
+        # Mirror relative folder structure in output to avoid overwrites
+        rel_dir = os.path.relpath(os.path.dirname(fpath), input_dir)
+        dest_dir = os.path.join(output_dir, rel_dir) if rel_dir != '.' else output_dir
+        os.makedirs(dest_dir, exist_ok=True)
+        base_path = os.path.join(dest_dir, base)
+    logging.info(f"Opening: {fpath}")
+    with _perf.span(metrics, 'open'):
+        load = _dataset_ready.open_file(vImaris, fpath, timeout_sec=LOAD_TIMEOUT_SEC)
+    result['load_seconds'] = round(load.seconds, 3)
+    if not load.ready:
+        logging.error(f"{_dataset_ready.MESSAGES[load.status]}: {fpath}")
+        result.update(status=load.status, message=_dataset_ready.MESSAGES[load.status])
+        return False
+    # A newly opened file replaces the scene, so a fresh index is built for it
+    with _perf.span(metrics, 'scene'):
+        objects = _select_filaments(_scene_index.SceneIndex(vImaris))
+    if not objects:
+        logging.warning(f"No Filaments found in: {fpath}")
+        result.update(status='no_filaments', message='No matching Filaments object in scene')
+        return False
+    if metrics is not None:
+        metrics['objects'] = len(objects)
+    logging.info(f"Exporting {len(objects)} Filaments object(s): " + ', '.join(o.path for o in objects))
+    transform = _dataset_transform(vImaris, metrics)
+    if _streaming() and BATCH_OUTPUT == 'files':
+        # One filament at a time on this thread (see EXPORT_STREAMING)
+        header = _batch_header(fpath)
+        written = []
+        for out_path, o in zip(_object_outputs(base_path, objects), objects):
+            measured = [] if MORPHOMETRY else None
+            if _stream_filaments_to_swc(o.filaments, transform, out_path, header=header, metrics=metrics,
+                                        measured=measured):
+                written.append(out_path)
+                if measured is not None:
+                    _record_morphometry(result, out_path, measured)
+        _record_export(result, written)
+        return False
+    targets = [(out_path, _fetch_filaments(o.filaments, transform, metrics))
+               for out_path, o in zip(_object_outputs(base_path, objects), objects)]
+    if pipeline is not None:
+        pipeline.submit(result, (metrics, targets))
+        return True
+    _pipeline_write(result, _pipeline_convert((metrics, targets)))
     return False
 
 
 def XTExportSWC(aImarisId):
+    from tkinter import Tk, messagebox, filedialog
+    _setup_logging()
     logging.info(f"--- Script Started for Imaris ID: {aImarisId} ---")
     try:
-        # Create an ImarisLib object
-        vImarisLib = ImarisLib.ImarisLib()
-        logging.debug("ImarisLib object created.")
-
-        # Get an imaris object with id aImarisId
-        vImaris = vImarisLib.GetApplication(aImarisId)
+        # Get an imaris object with id aImarisId (shared connection, see _imaris_pool)
+        vImaris = _imaris_pool.get_application(aImarisId)
 
         if vImaris is None:
             logging.error("Could not connect to Imaris!")
@@ -240,35 +558,21 @@ def XTExportSWC(aImarisId):
              messagebox.showerror("Error", "Could not get image dataset details from Imaris.")
              return # Exit early
 
-        # Calculate pixel scaling and offset
-        min_x, min_y, min_z = V.GetExtendMinX(), V.GetExtendMinY(), V.GetExtendMinZ()
-        max_x, max_y, max_z = V.GetExtendMaxX(), V.GetExtendMaxY(), V.GetExtendMaxZ()
-        size_x, size_y, size_z = V.GetSizeX(), V.GetSizeY(), V.GetSizeZ()
-
-        # Avoid division by zero if extent is zero in any dimension (though unlikely)
-        scale_x = size_x / (max_x - min_x) if (max_x - min_x) != 0 else 1.0
-        scale_y = size_y / (max_y - min_y) if (max_y - min_y) != 0 else 1.0
-        scale_z = size_z / (max_z - min_z) if (max_z - min_z) != 0 else 1.0
-
-        pixel_scale = np.array([scale_x, scale_y, scale_z])
-        pixel_offset = np.array([min_x, min_y, min_z])
-
-        # ad-hoc fix Z-flip when |maxZ| < |minZ| (common in some microscope setups)
-        if abs(min_z) > abs(max_z) and (max_z - min_z) != 0:
+        # Pixel scaling and offset, read once for this dataset
+        transform = _coord_transform.CoordinateTransform.from_dataset(V)
+        if transform.z_flipped:
             logging.warning("Detected potential Z-flip (|minZ| > |maxZ|). Adjusting offset and scale.")
-            pixel_offset = np.array([min_x, min_y, max_z]) # Use max_z as the origin offset
-            pixel_scale[2] = -pixel_scale[2] # Invert Z scaling
 
-        logging.debug(f"Pixel Scale: {pixel_scale}")
-        logging.debug(f"Pixel Offset: {pixel_offset}")
+        logging.debug(f"Pixel Scale: {transform.scale}")
+        logging.debug(f"Pixel Offset: {transform.offset}")
 
         # get filename
         root = Tk()
         root.withdraw() # Hide the main Tk window
         savename = filedialog.asksaveasfilename(
             title="Save SWC file(s)",
-            defaultextension=".swc",
-            filetypes=[("SWC files", "*.swc"), ("All files", "*.*")]
+            defaultextension=_output_extension(),
+            filetypes=[("SWC files", "*" + _output_extension()), ("All files", "*.*")]
         )
         root.destroy() # Clean up the Tk root window
 
@@ -278,12 +582,12 @@ def XTExportSWC(aImarisId):
             return # Exit early
 
         logging.info(f"Selected base save name: {savename}")
+        header = _swc_io.make_header(source=vFilaments.GetName()) if WRITE_SWC_HEADER else None
         # Optional: Split base name and extension for cleaner individual file naming
         base_name, _ = os.path.splitext(savename)
 
 
         #main conversion
-        all_filaments_swc_data = [] # Use a list to collect numpy arrays first
         vCount = vFilaments.GetNumberOfFilaments()
         logging.info(f"Found {vCount} individual filament(s) to process.")
 
@@ -292,125 +596,45 @@ def XTExportSWC(aImarisId):
             messagebox.showwarning("Empty Object", "The selected Filaments object contains no actual filaments.")
             return
 
-        for i in range(vCount):
-            logging.debug(f"Processing filament index {i}")
-            vFilamentsXYZ = vFilaments.GetPositionsXYZ(i)
-            vFilamentsRadius = vFilaments.GetRadii(i)
-            vFilamentsEdges = vFilaments.GetEdges(i) # List of (p1, p2) index tuples
-            vFilamentsTypes = vFilaments.GetTypes(i) # Optional: Get segment types if set
-
-            N = len(vFilamentsXYZ)
-            if N == 0:
-                logging.warning(f"Filament index {i} has no points. Skipping.")
-                continue # Skip this filament
-
-            # Adjacency list is often more efficient for sparse graphs like neurons
-            adj = [[] for _ in range(N)]
-            for p1, p2 in vFilamentsEdges:
-                 # Ensure indices are within bounds (paranoia check)
-                if 0 <= p1 < N and 0 <= p2 < N:
-                    adj[p1].append(p2)
-                    adj[p2].append(p1)
-                else:
-                    logging.warning(f"Invalid edge found in filament {i}: ({p1}, {p2}) - Max index is {N-1}")
-
-
-            # SWC conversion using Breadth-First Search (BFS) or Depth-First Search (DFS)
-            # We need to handle potential disconnections and find a root.
-            # Let's assume the first point (index 0) is a potential root,
-            # but handle cases where the filament might be disconnected.
-            # We'll use BFS here.
-
-            swc_lines = np.zeros((N, 7))
-            visited = np.zeros(N, dtype=bool)
-            node_map = {} # Map original Imaris index to new SWC index (1-based)
-            parent_map = {} # Map original Imaris index to SWC parent index (-1 for root)
-            swc_idx_counter = 1
-            nodes_processed = 0
-
-            # Handle potentially disconnected components
-            for start_node_idx in range(N):
-                if not visited[start_node_idx]:
-                    logging.debug(f"Starting traversal from node {start_node_idx} (potential new root)")
-                    queue = [(start_node_idx, -1)] # (imaris_idx, swc_parent_idx)
-                    visited[start_node_idx] = True
-
-                    while queue:
-                        cur_imaris_idx, current_swc_parent_idx = queue.pop(0) # BFS
-
-                        # Assign current node its SWC index
-                        current_swc_idx = swc_idx_counter
-                        node_map[cur_imaris_idx] = current_swc_idx
-                        parent_map[cur_imaris_idx] = current_swc_parent_idx
-                        swc_idx_counter += 1
-
-                        # Get position, radius, type
-                        pos = np.array(vFilamentsXYZ[cur_imaris_idx]) - pixel_offset
-                        scaled_pos = pos * pixel_scale
-                        radius = vFilamentsRadius[cur_imaris_idx]
-                        # Use default type 3 (axon) if types array is empty or invalid
-                        node_type = vFilamentsTypes[cur_imaris_idx] if vFilamentsTypes and cur_imaris_idx < len(vFilamentsTypes) else 3
-
-                        # Create SWC line (indices filled later)
-                        swc_lines[nodes_processed] = [
-                            current_swc_idx, node_type,
-                            scaled_pos[0], scaled_pos[1], scaled_pos[2],
-                            radius, current_swc_parent_idx
-                        ]
-                        nodes_processed += 1
-
-                        # Add neighbors to queue
-                        for neighbor_imaris_idx in adj[cur_imaris_idx]:
-                            if not visited[neighbor_imaris_idx]:
-                                visited[neighbor_imaris_idx] = True
-                                queue.append((neighbor_imaris_idx, current_swc_idx)) # Parent is the current node's SWC index
-
-            if nodes_processed != N:
-                 logging.warning(f"Filament {i}: Processed {nodes_processed} nodes, but expected {N}. Possible isolated nodes?")
-                 # Truncate swc_lines if needed, though usually N should match
-                 swc_lines = swc_lines[:nodes_processed]
-
-
-            # --- Save individual filament ---
-            # Use the modified base name
-            filename_filament = f"{base_name}_filament_{i}.swc"
-            print(f'Exporting filament {i+1}/{vCount} to {filename_filament}') # Use standard print for user feedback
-            logging.info(f"Saving individual filament {i} to {filename_filament}")
-            # Define the format string explicitly for clarity
-            swc_format = '%d %d %.6f %.6f %.6f %.6f %d'
-            np.savetxt(filename_filament, swc_lines, fmt=swc_format, delimiter=' ')
-            all_filaments_swc_data.append(swc_lines) # Add to the list for combined saving
-
-        # --- Combine and save all filaments ---
-        if all_filaments_swc_data:
-            # Correctly merge SWC files: re-index node IDs and parent IDs
-            logging.info("Combining SWC data for final output file...")
-            final_swc_data = []
-            node_offset = 0
-            for swc_data in all_filaments_swc_data:
-                if swc_data.shape[0] > 0: # If the filament wasn't empty
-                    temp_data = swc_data.copy()
-                    # Update node index (column 0)
-                    temp_data[:, 0] += node_offset
-                    # Update parent index (column 6), ignoring roots (-1)
-                    parent_mask = temp_data[:, 6] != -1
-                    temp_data[parent_mask, 6] += node_offset
-                    final_swc_data.append(temp_data)
-                    node_offset += swc_data.shape[0] # Increment offset by number of nodes in this filament
-
-            if final_swc_data:
-                combined_swcs = np.vstack(final_swc_data)
-                logging.info(f"Saving combined SWC data ({combined_swcs.shape[0]} nodes) to {savename}")
-                print(f"\nSaving combined file with all filaments to: {savename}")
-                swc_format = '%d %d %.6f %.6f %.6f %.6f %d'
-                np.savetxt(savename, combined_swcs, fmt=swc_format, delimiter=' ')
+        if _streaming():
+            # One filament at a time, straight into the files (see EXPORT_STREAMING)
+            print(f"\nStreaming {vCount} filament(s) to: {savename} and per-filament files")
+            measured = [] if MORPHOMETRY else None
+            if _stream_filaments_to_swc(vFilaments, transform, savename, write_individual=True, header=header,
+                                        measured=measured):
                 logging.info("Combined SWC file saved successfully.")
+                if measured is not None:
+                    _morphometry.write_csv(_morphometry.csv_path(savename), measured)
             else:
-                 logging.warning("No valid filament data found to combine.")
-                 print("\nWarning: No filament data was generated to save in the combined file.")
+                logging.warning("No individual filaments were successfully processed.")
+                print("\nWarning: No individual filaments processed, combined file will not be saved.")
         else:
-             logging.warning("No individual filaments were successfully processed.")
-             print("\nWarning: No individual filaments processed, combined file will not be saved.")
+            # Fetch all filaments up front (one bulk RPC where Imaris supports it)
+            vFilamentData = _filament_fetch.fetch_filaments(vFilaments, vCount, with_time=EXPORT_TIME_INDEX,
+                                                            with_root=SWC_ROOT == 'beginning')
+            converted = _convert_filaments((transform, vFilamentData))
+
+            for i, _t, swc_lines in (converted if EXPORT_FORMAT == 'swc' else []):
+                # --- Save individual filament ---
+                # Use the modified base name
+                filename_filament = f"{base_name}_filament_{i}.swc"
+                print(f'Exporting filament {i+1}/{vCount} to {filename_filament}') # Use standard print for user feedback
+                logging.info(f"Saving individual filament {i} to {filename_filament}")
+                _swc_io.write_swc(filename_filament, swc_lines, header)
+
+            # --- Combine and save all filaments ---
+            if converted:
+                # Correctly merge SWC files: the writer re-indexes node IDs and parent IDs
+                total_nodes = sum(swc_data.shape[0] for _i, _t, swc_data in converted)
+                logging.info(f"Saving combined SWC data ({total_nodes} nodes) to {savename}")
+                print(f"\nSaving combined file with all filaments to: {savename}")
+                _write_combined(savename, converted, header)
+                logging.info("Combined SWC file saved successfully.")
+                if MORPHOMETRY:
+                    _morphometry.write_csv(_morphometry.csv_path(savename), _measure(converted, transform))
+            else:
+                 logging.warning("No individual filaments were successfully processed.")
+                 print("\nWarning: No individual filaments processed, combined file will not be saved.")
 
 
         print("\nScript finished successfully!")
@@ -441,11 +665,138 @@ def XTExportSWC(aImarisId):
         logging.info("--- Terminal Window Closing ---")
 
 
+def find_ims_files(input_dir):
+    """Sorted .ims/.imsr files in input_dir and all its subfolders."""
+    ims_files = []
+    # Recursively walk through subfolders
+    for root_dir, _dirs, files in os.walk(input_dir):
+        for name in files:
+            lower = name.lower()
+            if lower.endswith('.ims') or lower.endswith('.imsr'):
+                ims_files.append(os.path.join(root_dir, name))
+    ims_files.sort()
+    return ims_files
+
+
+def _write_batch_morphometry(results, output_dir):
+    """batch_morphometry.csv with a row per exported object; objects of files skipped
+    as up to date are taken from their per-file CSVs. Returns the path."""
+    entries = []
+    for result in results:
+        measured = result.get('morphometry')
+        if measured is None and result['status'] == 'skipped' and result['output']:
+            measured = [(out_path, _morphometry.summarize(_morphometry.read_csv(_morphometry.csv_path(out_path))))
+                        for out_path in result['output'].split('; ')
+                        if os.path.exists(_morphometry.csv_path(out_path))]
+        entries.extend((result['source'], out_path, summary) for out_path, summary in measured or [])
+    path = os.path.join(output_dir, _morphometry.BATCH_CSV_NAME)
+    _morphometry.write_batch_csv(path, entries)
+    return path
+
+
+def run_batch_export(vImaris, slot, input_dir, output_dir, on_result=None, worker_setup=None):
+    """Export every .ims file under input_dir to output_dir, without any dialogs.
+
+    Args:
+        vImaris: connected application of `slot`, the (endpoints, application id)
+            that processes files next to the BATCH_WORKERS instances
+        on_result: optional callable(result) for every finished file
+        worker_setup: optional picklable callable run first in each worker
+            process (e.g. to apply settings changed at runtime)
+    Returns a summary dict with the counts, the report and metrics paths and
+    all results (with PERF_LOG, each exported one has its 'metrics').
+    """
+    _setup_logging()
+    ims_files = find_ims_files(input_dir)
+    summary = {'input_dir': input_dir, 'output_dir': output_dir, 'files': len(ims_files),
+               'exported': 0, 'skipped': 0, 'failed': 0, 'report': '', 'metrics': '', 'morphometry': '',
+               'results': []}
+    if not ims_files:
+        return summary
+    metrics_log = _perf.MetricsLog(output_dir) if PERF_LOG else None
+
+    store = None
+    write = _pipeline_write
+    if BATCH_OUTPUT == 'hdf5':
+        store = _h5_store.MorphologyStore(os.path.join(output_dir, _h5_store.STORE_NAME))
+        write = lambda result, item: _store_write(store, result, item)
+
+    # Skip files whose export is still up to date (also resumes interrupted runs)
+    manifest = _manifest.ExportManifest(input_dir, output_dir, _export_settings(),
+                                        hash_sources=MANIFEST_HASH_SOURCES,
+                                        output_check=lambda ref: store is not None
+                                        and _h5_store.split_ref(ref)[1] in store)
+    results_by_source = {}
+    todo_files = []
+    for fpath in ims_files:
+        entry = manifest.lookup(fpath)
+        if entry is None:
+            todo_files.append(fpath)
+        else:
+            results_by_source[fpath] = {'source': fpath, 'output': '; '.join(manifest.output_paths(entry)),
+                                        'status': 'skipped', 'message': f"up to date ({entry['status']})",
+                                        'worker': '', 'seconds': 0.0}
+    logging.info(f"{len(todo_files)} of {len(ims_files)} file(s) need exporting")
+
+    def _report_progress(result):
+        if 'seconds' not in result:
+            # Handed to the pipeline, which now completed it (see run_task)
+            _batch_scheduler.finish_result(result)
+        manifest.record(result['source'], result)
+        if metrics_log is not None:
+            metrics_log.write(result)
+        if on_result is not None:
+            on_result(result)
+
+    slots = [slot] + (list(BATCH_WORKERS) if store is None else [])
+    if len(slots) > 1 and len(todo_files) > 1:
+        logging.info(f"Distributing {len(todo_files)} file(s) over {len(slots)} Imaris instance(s)")
+        task = (__name__, '_export_one_file', {'input_dir': input_dir, 'output_dir': output_dir})
+        results = _batch_scheduler.run_batch(todo_files, slots, task, progress=_report_progress,
+                                             setup=worker_setup)
+    else:
+        # Convert and write each file on background threads while Imaris
+        # loads the next one; results are completed in place.
+        name = _batch_scheduler.worker_name(slots[0])
+        results = []
+        with _export_pipeline.ExportPipeline(_pipeline_convert, write,
+                                             on_done=_report_progress) as pipeline:
+            for fpath in todo_files:
+                submitted = pipeline.submitted
+                result = _batch_scheduler.run_task(
+                    vImaris, fpath,
+                    lambda v, f, r: _export_one_file(v, f, input_dir, output_dir, pipeline, r), name)
+                if pipeline.submitted == submitted:
+                    pipeline.skip(result)
+                results.append(result)
+
+    manifest.compact()
+    if store is not None:
+        store.close()
+    for result in results:
+        results_by_source[result['source']] = result
+    results = [results_by_source[fpath] for fpath in ims_files]
+
+    report_path = os.path.join(output_dir, 'batch_report.csv')
+    _batch_scheduler.write_report(results, report_path)
+    if MORPHOMETRY:
+        summary['morphometry'] = _write_batch_morphometry(results, output_dir)
+    if metrics_log is not None and metrics_log.records:
+        logging.info("Batch metrics (seconds and counts per file):\n" + metrics_log.close())
+        summary['metrics'] = metrics_log.path
+    summary.update(exported=sum(1 for r in results if r['status'] == 'ok'),
+                   skipped=len(ims_files) - len(todo_files),
+                   failed=sum(1 for r in results if r['status'] in ('error', 'timeout', 'unconfirmed')),
+                   report=report_path, results=results)
+    return summary
+
+
 def XTExportSWC_Batch(aImarisId):
+    from tkinter import Tk, messagebox, filedialog
+    _setup_logging()
     logging.info(f"--- Batch Export Started for Imaris ID: {aImarisId} ---")
     try:
-        vImarisLib = ImarisLib.ImarisLib()
-        vImaris = vImarisLib.GetApplication(aImarisId)
+        vImaris = _imaris_pool.get_application(aImarisId)
         if vImaris is None:
             messagebox.showerror("Error", "Could not connect to Imaris instance.")
             return
@@ -462,49 +813,16 @@ def XTExportSWC_Batch(aImarisId):
             root.destroy(); return
         root.destroy()
 
-        # Collect ims files
-        ims_files = []
-        # Recursively walk through subfolders
-        for root_dir, _dirs, files in os.walk(input_dir):
-            for name in files:
-                lower = name.lower()
-                if lower.endswith('.ims') or lower.endswith('.imsr'):
-                    ims_files.append(os.path.join(root_dir, name))
-        ims_files.sort()
-        if not ims_files:
+        def _print_saved(result):
+            if result['status'] == 'ok':
+                print(f"Saved: {result['output']}")
+
+        summary = run_batch_export(vImaris, (None, aImarisId), input_dir, output_dir, on_result=_print_saved)
+        if not summary['files']:
             messagebox.showwarning("No files", "No .ims/.imsr files found in the selected folder or its subfolders.")
             return
 
-        successes = 0
-        for fpath in ims_files:
-            try:
-                base = os.path.splitext(os.path.basename(fpath))[0]
-                # Mirror relative folder structure in output to avoid overwrites
-                rel_dir = os.path.relpath(os.path.dirname(fpath), input_dir)
-                dest_dir = os.path.join(output_dir, rel_dir) if rel_dir != '.' else output_dir
-                os.makedirs(dest_dir, exist_ok=True)
-                out_path = os.path.join(dest_dir, f"{base}.swc")
-                logging.info(f"Opening: {fpath}")
-                vImaris.FileOpen(fpath, "")
-                if not _wait_for_dataset(vImaris, timeout_sec=120):
-                    logging.error(f"Timeout waiting dataset for: {fpath}")
-                    continue
-                fil = _find_first_filaments(vImaris)
-                if fil is None:
-                    logging.warning(f"No Filaments found in: {fpath}")
-                    continue
-                ok = _export_filaments_to_swc(vImaris, fil, out_path, write_individual=False)
-                if ok:
-                    logging.info(f"Saved: {out_path}")
-                    print(f"Saved: {out_path}")
-                    successes += 1
-                else:
-                    logging.warning(f"No SWC content for: {fpath}")
-            except Exception:
-                logging.error("Error processing file:\n" + traceback.format_exc())
-                continue
-
-        messagebox.showinfo("Batch finished", f"Exported {successes} / {len(ims_files)} file(s).\nOutput: {output_dir}\nLog: {log_file_path}")
+        messagebox.showinfo("Batch finished", f"Exported {summary['exported']} / {summary['files']} file(s), {summary['skipped']} already up to date.\nOutput: {output_dir}\nReport: {summary['report']}\nLog: {log_file_path}")
         logging.info("--- Batch Export Finished ---")
 
     except Exception as e:
@@ -14,8 +14,6 @@ import IceClient
 
 import Imaris
 
-import time
-
 class ImarisLib:
 
   _mIceClient = None
@@ -29,7 +27,6 @@ class ImarisLib:
 
 
   def Disconnect(self):
-    time.sleep(2)
     if self._mIceClient is not None:
       self._mIceClient.Terminate()
       self._mIceClient = None
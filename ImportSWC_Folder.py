@@ -1,94 +1,149 @@
 ﻿#
 #
-#  Import SWC XTension  
+#  Import SWC Folder XTension  
 #
 #  @Mostafa Bakhshi
 #
 #    <CustomTools>
 #      <Menu>
-#       <Item name="SWC Importer 1.0" icon="Python3" tooltip="Calls the Imaris to import SWC">
+#       <Item name="SWC Import (Folder)" icon="Python3" tooltip="Import all SWC files of a folder into Imaris Filaments">
 #         <Command>Python3XT::XTImportSWC(%i)</Command>
 #       </Item>
 #      </Menu>
 #    </CustomTools>
 
 
-import ImarisLib
 import time
-import random
-import numpy as np
 import logging
-# GUI imports
-from tkinter import *
-from tkinter import messagebox
-from tkinter import simpledialog,filedialog
 import os 
-logging.basicConfig(filename='', level=logging.DEBUG, 
-                    format='%(asctime)s - %(levelname)s - %(message)s') #add your filepath
-def XTImportSWC(aImarisId):
-	# Create an ImarisLib object
-	vImarisLib = ImarisLib.ImarisLib()
 
-	# Get an imaris object with id aImarisId
-	vImaris = vImarisLib.GetApplication(aImarisId)
+import _utils
+
+# Helper modules (and numpy through them) load on first use
+_coord_transform = _utils.lazy_import('_coord_transform')
+_imaris_pool = _utils.lazy_import('_imaris_pool')
+_swc_import = _utils.lazy_import('_swc_import')
+
+# Processes parsing SWC files in parallel (0 or 1: parse on the XTension thread;
+# None: one per CPU, up to 8)
+IMPORT_WORKERS = None
+
+# Import all files as filaments of a single Filaments object (one bulk Imaris
+# call) instead of one Filaments object per file
+IMPORT_AS_ONE_OBJECT = False
+def import_folder(vImaris, swc_dir, recursive=True, as_one_object=None, workers=None):
+	"""Import the SWC files of swc_dir into the current scene, without any dialogs.
+	Returns a summary dict (files, imported, failed names, seconds), with an
+	'error' when nothing could be imported because no dataset is open.
+	"""
+	_utils.setup_logging(console_level=logging.DEBUG)
+	if as_one_object is None:
+		as_one_object = IMPORT_AS_ONE_OBJECT
+	if workers is None:
+		workers = IMPORT_WORKERS
+	swc_paths = _swc_import.find_swc_files(swc_dir, recursive)
+	summary = {'input_dir': swc_dir, 'files': len(swc_paths), 'imported': 0, 'failed': [], 'seconds': 0.0}
+	if not swc_paths:
+		return summary
+	vFactory = vImaris.GetFactory()
+	V = vImaris.GetDataSet()
+	if V is None:
+		logging.error('No dataset open in Imaris; open one before importing')
+		summary['error'] = 'No dataset open'
+		return summary
+	# Pixel scaling and offset, shared with the exporters
+	transform = _coord_transform.CoordinateTransform.from_dataset(V)
+
+	vScene = vImaris.GetSurpassScene()
+	group_name = os.path.basename(os.path.normpath(swc_dir))
+	if as_one_object:
+		# All files become filaments of one object, added together at the end
+		vParent = None
+		imported = []
+	else:
+		# Group the imported filaments in one Surpass folder named after the input folder
+		vParent = vFactory.CreateDataContainer()
+		vParent.SetName(group_name)
+		vScene.AddChild(vParent, -1)
+
+	# Files are parsed in worker processes; the Imaris calls stay on this connection
+	n_files = len(swc_paths)
+	failed = summary['failed']
+	t0 = time.time()
+	loaded = _swc_import.load_swc_files(swc_paths, transform, workers)
+	for k, (swc_path, filaments, error) in enumerate(loaded, 1):
+		name = os.path.relpath(swc_path, swc_dir)
+		try:
+			if error is not None:
+				raise error
+			if as_one_object:
+				imported.append((name, filaments))
+				logging.info(f'[{k}/{n_files}] Loaded {name}')
+			else:
+				_swc_import.add_filament_object(vFactory, vParent, filaments, os.path.basename(swc_path))
+				logging.info(f'[{k}/{n_files}] Imported {name}')
+		except Exception as e:
+			failed.append(name)
+			logging.error(f'[{k}/{n_files}] Failed to import {name}: {e}')
+
+	if as_one_object and imported:
+		logging.info(f'Adding {len(imported)} files to one Filaments object')
+		try:
+			vFilaments = vFactory.CreateFilaments()
+			_swc_import.add_filaments(vFilaments, [f for _, trees in imported for f in trees])
+			vFilaments.SetName(group_name)
+			vScene.AddChild(vFilaments, -1)
+			index = 0
+			for name, trees in imported:
+				logging.info(f'Imported {name} as filament {index}' if len(trees) == 1 else
+							 f'Imported {name} as filaments {index}-{index + len(trees) - 1}')
+				index += len(trees)
+		except Exception as e:
+			logging.error(f'Failed to add filaments to Imaris: {e}')
+			failed.extend(name for name, _ in imported)
+		del imported
+
+	summary.update(imported=n_files - len(failed), seconds=round(time.time() - t0, 3))
+	return summary
+
+
+def XTImportSWC(aImarisId):
+	from tkinter import Tk, messagebox, filedialog
+	_utils.setup_logging(console_level=logging.DEBUG)
+	# Get an imaris object with id aImarisId (shared connection, see _imaris_pool)
+	vImaris = _imaris_pool.get_application(aImarisId)
 
 	if vImaris is None:
 		print('Could not connect to Imaris!')
 		time.sleep(10)
 		return
 	
-	vFactory = vImaris.GetFactory()
-	vFilaments = vFactory.ToFilaments(vImaris.GetSurpassSelection())
 	root = Tk()
-	root.withdraw()
-	# Ask for a single SWC file instead of a directory
-	swc_path = filedialog.askopenfilename(title='Select SWC file', filetypes=[('SWC files','*.swc'), ('All files','*.*')])
-	root.destroy()
-	if not swc_path: # dialog returns '' if cancelled
-		print('No file selected')
-		time.sleep(10)
-		return
-	print(swc_path)
-	V = vImaris.GetDataSet()
-	pixel_scale = np.array([V.GetSizeX() / (V.GetExtendMaxX() - V.GetExtendMinX()),
-							V.GetSizeY() / (V.GetExtendMaxY() - V.GetExtendMinY()),
-							V.GetSizeZ() / (V.GetExtendMaxZ() - V.GetExtendMinZ())])
-	pixel_offset = np.array([V.GetExtendMinX(), V.GetExtendMinY(), V.GetExtendMinZ()])
-	# ad-hoc fix Z-flip when |maxZ| < |minZ|
-	if abs(V.GetExtendMinZ()) > abs(V.GetExtendMaxZ()):
-		pixel_offset = np.array([V.GetExtendMinX(), V.GetExtendMinY(), V.GetExtendMaxZ()])
-		pixel_scale[2] = -pixel_scale[2]
-	
-	# Import the selected file
 	try:
-		print('Importing: ' + swc_path)
-		swc = np.loadtxt(swc_path)
-		# Ensure 2D array even for a single-node SWC
-		if swc.ndim == 1:
-			swc = swc.reshape(1, -1)
+		root.withdraw()
+		swc_dir = filedialog.askdirectory(title='Select folder with SWC files')
+		if not swc_dir: # dialog returns '' if cancelled
+			print('No folder selected')
+			time.sleep(10)
+			return
+		recursive = messagebox.askyesno('SWC Import', 'Include subfolders?')
+		print(swc_dir)
+		# Per-file progress is logged to the console
+		result = import_folder(vImaris, swc_dir, recursive)
+		if not result['files']:
+			messagebox.showinfo('SWC Import', f'No SWC files found in {swc_dir}')
+			return
+		if 'error' in result:
+			messagebox.showerror('SWC Import', 'No dataset is open in Imaris. Open an image before importing.')
+			return
 
-		N = swc.shape[0]
-		vFilaments = vImaris.GetFactory().CreateFilaments()
-		vPositions = swc[:, 2:5].astype(float) / pixel_scale
-		vPositions = vPositions + pixel_offset
-		vRadii = swc[:, 5].astype(float)
-		vTypes = np.zeros((N))  # (0: Dendrite; 1: Spine)
-		vEdges = swc[:, [6, 0]]
-		idx = np.all(vEdges > 0, axis=1)
-		vEdges = vEdges[idx, :] - 1
-		vTimeIndex = 0
-		vFilaments.AddFilament(vPositions.tolist(), vRadii.tolist(), vTypes.tolist(), vEdges.tolist(), vTimeIndex)
-		vFilamentIndex = 0
-		vVertexIndex = 1
-		vFilaments.SetBeginningVertexIndex(vFilamentIndex, vVertexIndex)
-		# Name the filaments after the file
-		try:
-			vFilaments.SetName(os.path.basename(swc_path))
-		except Exception:
-			pass
-		vScene = vImaris.GetSurpassScene()
-		vScene.AddChild(vFilaments, -1)
-		logging.info(f'Imported {os.path.basename(swc_path)}')
-	except Exception as e:
-		logging.error(f'Failed to import {os.path.basename(swc_path)}: {e}')
-	print('SWC file imported')
+		failed = result['failed']
+		summary = f"Imported {result['imported']} of {result['files']} SWC files in {result['seconds']:.1f} s"
+		if failed:
+			summary += '\n\nFailed:\n' + '\n'.join(failed[:20])
+			if len(failed) > 20:
+				summary += f'\n... and {len(failed) - 20} more (see log)'
+		print(summary)
+		messagebox.showinfo('SWC Import', summary)
+	finally:
+		root.destroy()
@@ -0,0 +1,156 @@
+# Multi-instance scheduler for the batch SWC export
+# Spreads a list of .ims files over several Imaris instances, one worker process
+# (and one Ice connection) per instance, and merges the per-file results.
+
+import csv
+import importlib
+import logging
+import multiprocessing
+import queue
+import time
+import traceback
+
+
+# Columns of the combined batch report; seconds covers a file's whole job, from
+# the start of its task until its result is final (written, where the task hands
+# the writing to another thread)
+REPORT_FIELDS = ['source', 'output', 'status', 'message', 'worker', 'seconds', 'load_seconds']
+
+
+def connect_imaris(endpoints, aImarisId):
+    """Connect to Imaris application aImarisId, optionally at specific Ice endpoints."""
+    import _imaris_pool
+    return _imaris_pool.get_application(aImarisId, endpoints or None)
+
+
+def worker_name(slot):
+    """Human readable label of a (endpoints, application id) slot."""
+    endpoints, aImarisId = slot
+    return f"{endpoints or 'default'}#{aImarisId}"
+
+
+def new_result(fpath, name=''):
+    """Result dict of one file, with its worker and start time set before any work is done."""
+    return {'source': fpath, 'output': '', 'status': 'error', 'message': '', 'worker': name,
+            'started': time.time()}
+
+
+def finish_result(result):
+    """Set result['seconds'], the time since new_result(); returns the result."""
+    result['seconds'] = round(time.time() - result['started'], 3)
+    return result
+
+
+def run_task(vImaris, fpath, task_fn, name=''):
+    """Run task_fn(vImaris, fpath, result) on a new_result() dict and return the dict.
+
+    task_fn fills in the dict and returns True if it handed it on to another
+    thread, which then owns it and calls finish_result() once it is final; the
+    dict is not touched here after that. Otherwise it is finished here.
+    """
+    result = new_result(fpath, name)
+    try:
+        handed_off = task_fn(vImaris, fpath, result)
+    except Exception as e:
+        logging.error(f"Error processing {fpath}:\n" + traceback.format_exc())
+        result.update(status='error', message=str(e))
+        handed_off = False
+    if not handed_off:
+        finish_result(result)
+    return result
+
+
+def _resolve_task(task):
+    module_name, func_name, kwargs = task
+    func = getattr(importlib.import_module(module_name), func_name)
+    return lambda vImaris, fpath, result: func(vImaris, fpath, result=result, **kwargs)
+
+
+def _worker_main(slot, tasks, results, task, setup):
+    """Worker process: connect to one Imaris instance and drain the task queue."""
+    import _utils
+    _utils.setup_logging()
+    if setup is not None:
+        setup()
+    name = worker_name(slot)
+    vImaris = connect_imaris(*slot)
+    if vImaris is None:
+        # Leave the remaining files to the other workers
+        logging.error(f"Worker {name}: could not connect to Imaris, stopping")
+        return
+    task_fn = _resolve_task(task)
+    logging.info(f"Worker {name}: connected")
+    while True:
+        item = tasks.get()
+        if item is None:
+            break
+        index, fpath = item
+        results.put((index, run_task(vImaris, fpath, task_fn, name)))
+
+
+def run_batch(files, slots, task, setup=None, progress=None):
+    """Export files on several Imaris instances in parallel.
+
+    Args:
+        files: list of input file paths
+        slots: list of (endpoints, aImarisId); endpoints None means ImarisLib's default
+        task: (module, function, kwargs) called in the worker as
+              function(vImaris, fpath, result=result, **kwargs) to fill in the
+              run_task result dict of each file; it must complete it before
+              returning. Given by name so workers import it only after
+              `setup` has run.
+        setup: optional picklable callable run first in every worker process
+        progress: optional callable(result) invoked in the parent as files finish
+
+    Returns:
+        list: one result dict per input file, in input order
+    """
+    ctx = multiprocessing.get_context('spawn')
+    tasks = ctx.Queue()
+    results = ctx.Queue()
+    for item in enumerate(files):
+        tasks.put(item)
+    for _ in slots:
+        tasks.put(None)
+
+    procs = [ctx.Process(target=_worker_main, args=(slot, tasks, results, task, setup), daemon=True)
+             for slot in slots]
+    for p in procs:
+        p.start()
+
+    collected = {}
+
+    def _collect(index, result):
+        collected[index] = result
+        if progress is not None:
+            progress(result)
+
+    while len(collected) < len(files):
+        try:
+            _collect(*results.get(timeout=1.0))
+        except queue.Empty:
+            if not any(p.is_alive() for p in procs):
+                break
+    # Results put just before the last worker exited may still be in flight
+    while True:
+        try:
+            _collect(*results.get(timeout=0.1))
+        except queue.Empty:
+            break
+    for p in procs:
+        p.join(timeout=5.0)
+
+    merged = []
+    for index, fpath in enumerate(files):
+        merged.append(collected.get(index) or {
+            'source': fpath, 'output': '', 'status': 'error',
+            'message': 'Not processed: no Imaris worker available', 'worker': '', 'seconds': 0.0})
+    return merged
+
+
+def write_report(results, report_path):
+    """Write the merged per-file results as CSV."""
+    with open(report_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(results)
@@ -0,0 +1,196 @@
+# Parallel filament -> SWC conversion for the export XTensions
+# Filaments of one object convert independently, so large objects are split over
+# a pool of worker processes. Vertex and edge arrays are handed over in one
+# shared-memory block and the SWC rows come back in another, so nothing large is
+# pickled; the workers only receive offsets. Results keep the requested order.
+
+import atexit
+import concurrent.futures
+import concurrent.futures.process
+import logging
+import multiprocessing
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+import _swc_convert
+
+
+# Objects with fewer vertices than this are converted in the calling thread;
+# below it, handing the data to the pool costs more than the conversion
+PARALLEL_MIN_VERTICES = 200_000
+
+# Tasks per worker; more tasks balance uneven filament sizes better
+_TASKS_PER_WORKER = 4
+
+_lock = threading.Lock()
+_pool = None
+_pool_workers = 0
+
+# Where one filament's data sits in the shared input block (element offsets and
+# lengths) and where its rows go in the shared output block
+_Slot = namedtuple('_Slot', 'index n_vertices pos rad typ n_types edg n_edges out root')
+
+
+def default_workers():
+    return min(8, os.cpu_count() or 1)
+
+
+def _get_pool(workers):
+    """The process pool, (re)created when the worker count changes."""
+    global _pool, _pool_workers
+    with _lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown()
+            _pool = concurrent.futures.ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown(wait=True):
+    """Stop the worker processes (they are also stopped when the process exits)."""
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=wait)
+            _pool = None
+
+
+atexit.register(shutdown)
+
+
+def can_parallelize(workers, n_vertices):
+    """Whether convert() would use the pool for an object of n_vertices."""
+    # Daemonic processes (the batch workers) may not start processes of their own
+    return (workers is not None and workers > 1 and n_vertices >= PARALLEL_MIN_VERTICES
+            and not multiprocessing.current_process().daemon)
+
+
+def _pack(filament_data, indices):
+    """Copy the filaments at indices into one float64 block; returns (block, slots, n_rows)."""
+    slots = []
+    size = 0
+    rows = 0
+    for i in indices:
+        f = filament_data[i]
+        n = len(f.positions)
+        n_types = len(f.types) if f.types is not None else 0
+        n_edges = len(f.edges)
+        slots.append(_Slot(i, n, size, size + 3 * n, size + 4 * n, n_types, size + 4 * n + n_types, n_edges,
+                           rows, f.root))
+        size += 4 * n + n_types + 2 * n_edges
+        rows += n
+
+    from multiprocessing import shared_memory
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1) * 8)
+    data = np.ndarray(size, dtype=np.float64, buffer=block.buf)
+    for s in slots:
+        f = filament_data[s.index]
+        n = s.n_vertices
+        data[s.pos:s.pos + 3 * n] = np.asarray(f.positions, dtype=np.float64).reshape(-1)
+        data[s.rad:s.rad + n] = np.asarray(f.radii, dtype=np.float64).reshape(-1)
+        if s.n_types:
+            data[s.typ:s.typ + s.n_types] = np.asarray(f.types, dtype=np.float64).reshape(-1)
+        # Vertex indices are far below 2**53, so float64 holds them exactly
+        data[s.edg:s.edg + 2 * s.n_edges] = np.asarray(f.edges, dtype=np.int64).reshape(-1)
+    del data
+    return block, slots, rows
+
+
+def _convert_slots(in_name, out_name, slots, transform, root_policy, node_order):
+    """Worker: convert the filaments of `slots` from the input block into the output block.
+    Returns the number of out-of-range edges of each filament."""
+    from multiprocessing import shared_memory
+    in_block = shared_memory.SharedMemory(name=in_name)
+    out_block = shared_memory.SharedMemory(name=out_name)
+    try:
+        data = np.ndarray(in_block.size // 8, dtype=np.float64, buffer=in_block.buf)
+        out = np.ndarray((out_block.size // 56, 7), dtype=np.float64, buffer=out_block.buf)
+        n_invalid = []
+        for s in slots:
+            n = s.n_vertices
+            swc, bad = _swc_convert.filament_to_swc(
+                data[s.pos:s.pos + 3 * n].reshape(-1, 3), data[s.rad:s.rad + n],
+                data[s.typ:s.typ + s.n_types] if s.n_types else None,
+                data[s.edg:s.edg + 2 * s.n_edges].astype(np.int64).reshape(-1, 2),
+                transform, root_policy, s.root, node_order)
+            out[s.out:s.out + n] = swc
+            n_invalid.append(bad)
+        del data, out
+        return n_invalid
+    finally:
+        in_block.close()
+        out_block.close()
+
+
+def _tasks(slots, n_tasks):
+    """Split slots (kept in order) into about n_tasks runs of similar vertex count."""
+    total = sum(s.n_vertices for s in slots)
+    target = max(1, total // n_tasks)
+    tasks, current, size = [], [], 0
+    for s in slots:
+        current.append(s)
+        size += s.n_vertices
+        if size >= target:
+            tasks.append(current)
+            current, size = [], 0
+    if current:
+        tasks.append(current)
+    return tasks
+
+
+def _convert_here(filament_data, indices, transform, root_policy, node_order):
+    """convert() in the calling process."""
+    result = []
+    for i in indices:
+        f = filament_data[i]
+        swc, bad = _swc_convert.filament_to_swc(f.positions, f.radii, f.types, f.edges, transform,
+                                                root_policy, f.root, node_order)
+        result.append((i, swc, bad))
+    return result
+
+
+def convert(filament_data, indices, transform, workers, root_policy='index', node_order='bfs'):
+    """Convert the filaments at `indices` (all with vertices) in the process pool.
+
+    Returns a list of (filament index, SWC array, n_invalid_edges) in `indices`
+    order, the same arrays _swc_convert.filament_to_swc gives. If a worker
+    died (e.g. out of memory), the pool is discarded, to be restarted for the
+    next object, and this object is converted in the calling process.
+    """
+    try:
+        return _convert_in_pool(filament_data, indices, transform, workers, root_policy, node_order)
+    except concurrent.futures.process.BrokenProcessPool as e:
+        logging.warning(f"Conversion worker failed ({e}); converting this object in-process")
+        shutdown(wait=False)
+        return _convert_here(filament_data, indices, transform, root_policy, node_order)
+
+
+def _convert_in_pool(filament_data, indices, transform, workers, root_policy, node_order):
+    from multiprocessing import shared_memory
+    in_block, slots, n_rows = _pack(filament_data, indices)
+    try:
+        out_block = shared_memory.SharedMemory(create=True, size=max(n_rows, 1) * 56)
+        try:
+            pool = _get_pool(workers)
+            tasks = _tasks(slots, workers * _TASKS_PER_WORKER)
+            futures = [pool.submit(_convert_slots, in_block.name, out_block.name, task, transform,
+                                   root_policy, node_order) for task in tasks]
+            n_invalid = [bad for future in futures for bad in future.result()]
+            out = np.ndarray((n_rows, 7), dtype=np.float64, buffer=out_block.buf)
+            # Copy out of the shared block so it can be released
+            result = [(s.index, out[s.out:s.out + s.n_vertices].copy(), bad)
+                      for s, bad in zip(slots, n_invalid)]
+            del out
+        finally:
+            out_block.close()
+            out_block.unlink()
+    finally:
+        in_block.close()
+        in_block.unlink()
+    logging.debug(f"Converted {len(slots)} filament(s), {n_rows} vertices, in {len(tasks)} task(s)")
+    return result
@@ -0,0 +1,59 @@
+# Imaris world <-> SWC voxel coordinate transform shared by the export and import tools
+# SWC files store positions in voxel units: swc = (world - offset) * scale, with
+# scale = voxels per world unit along each axis and offset the dataset origin.
+
+import numpy as np
+
+
+class CoordinateTransform:
+    """Calibration of one dataset, read once and applied to whole (N, 3) arrays.
+
+    Attributes:
+        offset: (3,) world position of the SWC origin
+        scale: (3,) SWC units per world unit (negative along z for flipped datasets)
+        z_flipped: True if the ad-hoc Z-flip fix was applied
+    """
+
+    def __init__(self, offset, scale, z_flipped=False):
+        self.offset = np.asarray(offset, dtype=np.float64).reshape(3)
+        self.scale = np.asarray(scale, dtype=np.float64).reshape(3)
+        self.z_flipped = z_flipped
+
+    @classmethod
+    def from_extents(cls, extent_min, extent_max, size):
+        """Build the transform from the dataset extents and its size in voxels."""
+        extent_min = np.asarray(extent_min, dtype=np.float64)
+        extent_max = np.asarray(extent_max, dtype=np.float64)
+        span = extent_max - extent_min
+        # Avoid division by zero if extent is zero in any dimension (though unlikely)
+        scale = np.ones(3)
+        np.divide(np.asarray(size, dtype=np.float64), span, out=scale, where=span != 0)
+        offset = extent_min.copy()
+        # ad-hoc fix Z-flip when |maxZ| < |minZ| (common in some microscope setups)
+        z_flipped = bool(abs(extent_min[2]) > abs(extent_max[2]) and span[2] != 0)
+        if z_flipped:
+            offset[2] = extent_max[2]
+            scale[2] = -scale[2]
+        return cls(offset, scale, z_flipped)
+
+    @classmethod
+    def from_dataset(cls, V):
+        """Read the calibration of an Imaris IDataSet (nine calls, made once)."""
+        return cls.from_extents((V.GetExtendMinX(), V.GetExtendMinY(), V.GetExtendMinZ()),
+                                (V.GetExtendMaxX(), V.GetExtendMaxY(), V.GetExtendMaxZ()),
+                                (V.GetSizeX(), V.GetSizeY(), V.GetSizeZ()))
+
+    def to_swc(self, world, out=None):
+        """Imaris world coordinates (N, 3) -> SWC coordinates."""
+        out = np.subtract(world, self.offset, out=out)
+        out *= self.scale
+        return out
+
+    def to_world(self, swc, out=None):
+        """SWC coordinates (N, 3) -> Imaris world coordinates."""
+        out = np.divide(swc, self.scale, out=out)
+        out += self.offset
+        return out
+
+    def __repr__(self):
+        return f"CoordinateTransform(offset={self.offset.tolist()}, scale={self.scale.tolist()})"
@@ -0,0 +1,158 @@
+# Dataset readiness after FileOpen for the batch SWC export
+# Instead of sleeping a fixed interval until any dataset exists, poll with a
+# backoff that starts in the millisecond range and only accept the dataset once
+# it is the file just opened: Imaris reports that file name (where it can), or
+# the dataset differs from the one before the open (another proxy, other extents
+# or size, or none at all in between), with non-zero dimensions. Imaris versions
+# that report no file name may reuse the DataSet proxy; when a file of the same
+# geometry is opened there, nothing shows which file the dataset belongs to, and
+# after STABLE_SEC the open is given up as 'unconfirmed' rather than ready.
+
+import collections
+import logging
+import os
+import statistics
+import time
+
+
+# Backoff between readiness polls: first wait, growth factor and longest wait (seconds)
+FIRST_POLL_SEC = 0.005
+POLL_GROWTH = 1.5
+MAX_POLL_SEC = 0.1
+
+# Without a file name or a visible change, how long the dataset may stay
+# unchanged after FileOpen before the open is reported as unconfirmed
+STABLE_SEC = 0.25
+
+# A load is reported as slow when it takes this many times the median of recent loads
+SLOW_LOAD_FACTOR = 3.0
+_SLOW_LOAD_MIN_SAMPLES = 5
+
+# Load times of this process, for spotting slow opens
+_recent_loads = collections.deque(maxlen=100)
+
+# ready: dataset confirmed, seconds: FileOpen to ready (or giving up), polls: readiness checks,
+# status: 'ready', 'timeout', or 'unconfirmed' (a dataset is shown, but maybe the previous file's)
+LoadResult = collections.namedtuple('LoadResult', ['ready', 'seconds', 'polls', 'status'])
+
+READY = 'ready'
+TIMEOUT = 'timeout'
+UNCONFIRMED = 'unconfirmed'
+
+# Report message of each status of a load that is not ready
+MESSAGES = {TIMEOUT: 'Timeout waiting for dataset',
+            UNCONFIRMED: 'Could not confirm the dataset was loaded (no file name, dataset unchanged)'}
+
+
+def _same_file(a, b):
+    return os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+
+def _current_file(vImaris):
+    """File name Imaris reports as loaded, or None if it can't tell (or is busy)."""
+    try:
+        return vImaris.GetCurrentFileName()
+    except Exception:
+        return None
+
+
+def _signature(V):
+    """Extents and size of a dataset; they change when a file of other geometry is loaded."""
+    return (V.GetExtendMinX(), V.GetExtendMinY(), V.GetExtendMinZ(),
+            V.GetExtendMaxX(), V.GetExtendMaxY(), V.GetExtendMaxZ(),
+            V.GetSizeX(), V.GetSizeY(), V.GetSizeZ())
+
+
+class _Readiness:
+    """Readiness checks of one FileOpen of `path`, made through open()."""
+
+    def __init__(self, vImaris, path):
+        self.path = path
+        self.by_name = _current_file(vImaris) is not None
+        self.previous = self.previous_signature = None
+        if not self.by_name:
+            try:
+                self.previous = vImaris.GetDataSet()
+                if self.previous is not None:
+                    self.previous_signature = _signature(self.previous)
+            except Exception:
+                pass
+        # Set once Imaris showed no dataset (or was busy) after the open: the next one is new
+        self.changed = False
+        self.opened = None
+
+    def open(self, vImaris):
+        vImaris.FileOpen(self.path, "")
+        self.opened = time.perf_counter()
+
+    def busy(self):
+        self.changed = True
+
+    def check(self, vImaris):
+        """One readiness check. Returns READY once the dataset of `path` is there
+        and has dimensions, UNCONFIRMED once it can't be told apart from the
+        dataset before the open for STABLE_SEC, and None while waiting."""
+        if self.by_name:
+            name = _current_file(vImaris)
+            if not name or not _same_file(name, self.path):
+                return None
+            V = vImaris.GetDataSet()
+            ready = V is not None and V.GetSizeX() > 0 and V.GetSizeY() > 0 and V.GetSizeZ() > 0
+            return READY if ready else None
+        V = vImaris.GetDataSet()
+        if V is None:
+            self.busy()
+            return None
+        signature = _signature(V)
+        if not all(n > 0 for n in signature[6:]):
+            return None
+        if self.changed or V != self.previous or signature != self.previous_signature:
+            return READY
+        # Same proxy and geometry as before the open: either Imaris reused the proxy
+        # for a file like the last one, or it still shows the old dataset
+        return UNCONFIRMED if time.perf_counter() - self.opened >= STABLE_SEC else None
+
+
+def open_file(vImaris, path, timeout_sec=120.0):
+    """FileOpen `path` and wait until its dataset is loaded. Returns a LoadResult.
+
+    If Imaris reports the current file name, readiness requires it to be `path`;
+    otherwise the dataset has to differ from the one loaded before the call. If
+    it still looks the same after STABLE_SEC, the result is not ready and has
+    status UNCONFIRMED.
+    """
+    readiness = _Readiness(vImaris, path)
+    start = time.perf_counter()
+    readiness.open(vImaris)
+
+    polls = 0
+    wait = FIRST_POLL_SEC
+    while True:
+        polls += 1
+        try:
+            status = readiness.check(vImaris)
+        except Exception:
+            status = None
+            readiness.busy()  # Imaris is busy loading; try again
+        if status == READY:
+            return _finish(path, LoadResult(True, time.perf_counter() - start, polls, READY))
+        if status == UNCONFIRMED:
+            logging.warning(f"Could not confirm that {path} was loaded: Imaris reports no file name "
+                            f"and the dataset looks the same as before FileOpen")
+            return LoadResult(False, time.perf_counter() - start, polls, UNCONFIRMED)
+        elapsed = time.perf_counter() - start
+        if elapsed >= timeout_sec:
+            return LoadResult(False, elapsed, polls, TIMEOUT)
+        time.sleep(min(wait, timeout_sec - elapsed))
+        wait = min(wait * POLL_GROWTH, MAX_POLL_SEC)
+
+
+def _finish(path, load):
+    """Log the load time, with a warning if it is far above the recent median."""
+    if len(_recent_loads) >= _SLOW_LOAD_MIN_SAMPLES:
+        median = statistics.median(_recent_loads)
+        if load.seconds > SLOW_LOAD_FACTOR * median:
+            logging.warning(f"Slow load: {path} took {load.seconds:.2f} s (median {median:.2f} s)")
+    _recent_loads.append(load.seconds)
+    logging.debug(f"Loaded {path} in {load.seconds:.3f} s after {load.polls} poll(s)")
+    return load
@@ -0,0 +1,102 @@
+# Background convert/write stages for the batch SWC export
+# The Imaris thread opens files and fetches filament data; conversion and disk
+# writes run on two worker threads so they overlap with loading the next file.
+
+import logging
+import queue
+import threading
+import traceback
+
+
+_STOP = object()
+_SKIP = object()  # payload of a result that needs no further processing
+
+
+class ExportPipeline:
+    """Bounded producer/consumer pipeline: fetch (caller) -> convert -> write.
+
+    Args:
+        convert: callable(payload) -> converted, run on the convert thread
+        write: callable(result, converted), run on the write thread; fills in
+               the result dict (status, output, message)
+        max_pending: files that may wait in front of each stage. submit() blocks
+                     when the convert queue is full, so at most
+                     2 * max_pending + 2 fetched files are held in memory.
+        on_done: optional callable(result) run on the write thread when a file
+                 has finished (successfully or not)
+    """
+
+    def __init__(self, convert, write, max_pending=2, on_done=None):
+        self._convert = convert
+        self._write = write
+        self._on_done = on_done
+        self.submitted = 0
+        self._convert_q = queue.Queue(max_pending)
+        self._write_q = queue.Queue(max_pending)
+        self._threads = [
+            threading.Thread(target=self._convert_loop, name='swc-convert', daemon=True),
+            threading.Thread(target=self._write_loop, name='swc-write', daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, result, payload):
+        """Queue a fetched file; `result` is completed in place by the write stage."""
+        result['status'] = 'pending'
+        self.submitted += 1
+        self._convert_q.put((result, payload))
+
+    def skip(self, result):
+        """Pass an already final result through, so on_done still sees files in order."""
+        self._convert_q.put((result, _SKIP))
+
+    def close(self):
+        """Wait until every submitted file has been written, then stop the threads."""
+        self._convert_q.put(_STOP)
+        for t in self._threads:
+            t.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _fail(self, result, stage, e):
+        logging.error(f"Error in {stage} stage for {result['source']}:\n" + traceback.format_exc())
+        result.update(status='error', message=str(e))
+
+    def _convert_loop(self):
+        while True:
+            item = self._convert_q.get()
+            if item is _STOP:
+                self._write_q.put(_STOP)
+                return
+            result, payload = item
+            converted = _SKIP
+            if payload is not _SKIP:
+                try:
+                    converted = self._convert(payload)
+                except Exception as e:
+                    self._fail(result, 'convert', e)
+            del payload, item  # release the fetched arrays before blocking on the queue
+            self._write_q.put((result, converted))
+
+    def _write_loop(self):
+        while True:
+            item = self._write_q.get()
+            if item is _STOP:
+                return
+            result, converted = item
+            if converted is not _SKIP:
+                try:
+                    self._write(result, converted)
+                except Exception as e:
+                    self._fail(result, 'write', e)
+            del converted, item
+            if self._on_done is not None:
+                try:
+                    self._on_done(result)
+                except Exception:
+                    logging.error("Progress callback failed:\n" + traceback.format_exc())
@@ -0,0 +1,127 @@
+# Consolidated HDF5 morphology store for batch exports
+# One file instead of a mirrored tree of .swc files: a group per source .ims file
+# (nested like its folder, named with its extension) holding one chunked,
+# compressed (N, 7) SWC dataset per filament. With several Filaments objects per
+# file, each object is a group under '<source>/objects/'. Any single neuron can
+# be read without touching the others.
+# Needs the optional h5py package; it is only imported when a store is opened.
+
+import datetime
+import os
+import re
+
+import numpy as np
+
+import _manifest
+
+
+STORE_NAME = 'swc_export.h5'
+
+# Rows per HDF5 chunk of a filament dataset
+CHUNK_ROWS = 16384
+
+# Outputs inside the store are referred to as '<store path>::<group key>'
+REF_SEPARATOR = _manifest.CONTAINER_SEPARATOR
+
+# Version of the group layout above; stores of another layout are re-exported
+LAYOUT_VERSION = 2
+
+# Sub-group of a source group holding its Filaments objects, and filament dataset names
+OBJECTS_GROUP = 'objects'
+_FILAMENT_NAME = re.compile(r'filament_(\d+)$')
+
+
+def _h5py():
+    try:
+        import h5py
+    except ImportError:
+        raise ImportError("HDF5 batch output needs the h5py package (pip install h5py)") from None
+    return h5py
+
+
+def source_key(fpath, input_dir):
+    """Group key of a source file: its path relative to input_dir. The extension is
+    kept, so a file's group never coincides with the folder group of another file
+    (a.ims -> 'a.ims', a/b.ims -> 'a/b.ims')."""
+    return os.path.relpath(fpath, input_dir).replace(os.sep, '/')
+
+
+def object_key(key, name):
+    """Group key of the Filaments object `name` of the source group `key`."""
+    return f"{key}/{OBJECTS_GROUP}/{name}"
+
+
+def split_ref(ref):
+    """Split '<store path>::<key>' into (store path, key)."""
+    path, _, key = ref.partition(REF_SEPARATOR)
+    return path, key
+
+
+class MorphologyStore:
+    """HDF5 file holding the SWC arrays of many sources.
+
+    Args:
+        path: store file, created if missing
+        mode: h5py file mode ('a' to add to an existing store, 'r' to read)
+        compression: h5py compression filter for the filament datasets
+    """
+
+    def __init__(self, path, mode='a', compression='gzip', compression_opts=1):
+        self.path = path
+        self.compression = compression
+        self.compression_opts = compression_opts
+        self._file = _h5py().File(path, mode)
+
+    def ref(self, key):
+        return f"{self.path}{REF_SEPARATOR}{key}"
+
+    def write_source(self, key, converted, source=None):
+        """Replace the filaments of group `key` with one dataset per (filament index,
+        time index, SWC array). Only the group's own filament datasets are removed;
+        its sub-groups (the objects of a source) are kept.
+
+        Each dataset is written in a single call and the file is flushed, so an
+        interrupted batch keeps every source written before it.
+        """
+        group = self._file.require_group(key)
+        for name in self.filament_names(key):
+            del group[name]
+        group.attrs['source'] = source or key
+        group.attrs['created'] = datetime.datetime.now().isoformat(timespec='seconds')
+        group.attrs['n_filaments'] = len(converted)
+        for i, time_index, swc in converted:
+            swc = np.asarray(swc, dtype=np.float64)
+            dataset = group.create_dataset(
+                f'filament_{i}', data=swc, chunks=(max(1, min(swc.shape[0], CHUNK_ROWS)), 7),
+                compression=self.compression, compression_opts=self.compression_opts, shuffle=True)
+            dataset.attrs['time_index'] = time_index
+        self._file.flush()
+
+    def __contains__(self, key):
+        return key in self._file and 'n_filaments' in self._file[key].attrs
+
+    def sources(self):
+        """Keys of all source groups in the store."""
+        keys = []
+        self._file.visititems(lambda name, obj: keys.append(name)
+                              if 'n_filaments' in obj.attrs else None)
+        return keys
+
+    def filament_names(self, key):
+        """Names of the filament datasets of group `key`, by filament index."""
+        matches = [_FILAMENT_NAME.match(name) for name in self._file[key]]
+        return [m.group(0) for m in sorted((m for m in matches if m), key=lambda m: int(m.group(1)))]
+
+    def read_filament(self, key, name):
+        """(N, 7) SWC array of one filament dataset, e.g. read_filament(key, 'filament_3')."""
+        return self._file[key][name][()]
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,94 @@
+# Shared Imaris connections for the XTensions
+# Creating an ImarisLib client sets up an Ice communicator and connection, so the
+# tools share one client per endpoint and one application proxy per Imaris id.
+# A proxy that has been idle is health-checked before it is handed out again and
+# reconnected if Imaris went away; all clients are closed when the process exits.
+
+import atexit
+import logging
+import threading
+import time
+
+
+# A cached application proxy idle for longer than this is pinged before reuse
+HEALTH_CHECK_IDLE_SEC = 5.0
+
+_lock = threading.Lock()
+_clients = {}       # endpoints -> ImarisLib client
+_applications = {}  # (endpoints, Imaris id) -> [application proxy, time of last use]
+
+
+def _new_client(endpoints):
+    import ImarisLib
+    vImarisLib = ImarisLib.ImarisLib()
+    if endpoints:
+        vImarisLib.SetEndPoints(endpoints)
+    return vImarisLib
+
+
+def _is_alive(vImaris):
+    """Cheapest call that proves the application still answers."""
+    try:
+        ping = getattr(vImaris, 'ice_ping', None)
+        if ping is not None:
+            ping()
+        else:
+            vImaris.GetVersion()
+        return True
+    except Exception:
+        return False
+
+
+def get_application(aImarisId, endpoints=None):
+    """Imaris application aImarisId (at `endpoints`, default: ImarisLib's), or None.
+
+    Reuses the pooled client and proxy while they work. A proxy that fails its
+    health check, or a client that can no longer reach Imaris, is replaced once.
+    """
+    key = (endpoints, aImarisId)
+    with _lock:
+        cached = _applications.get(key)
+        if cached is not None:
+            vImaris, last_used = cached
+            if time.monotonic() - last_used < HEALTH_CHECK_IDLE_SEC or _is_alive(vImaris):
+                cached[1] = time.monotonic()
+                return vImaris
+            logging.warning(f"Imaris connection {key} lost, reconnecting")
+            del _applications[key]
+            _drop_client(endpoints)
+
+        vImaris = None
+        for attempt in range(2):
+            vImarisLib = _clients.get(endpoints)
+            if vImarisLib is None:
+                vImarisLib = _clients[endpoints] = _new_client(endpoints)
+            vImaris = vImarisLib.GetApplication(aImarisId)
+            if vImaris is not None:
+                break
+            # ImarisLib disconnects after a failure; start over with a new client
+            _drop_client(endpoints)
+        if vImaris is not None:
+            _applications[key] = [vImaris, time.monotonic()]
+        return vImaris
+
+
+def _drop_client(endpoints):
+    vImarisLib = _clients.pop(endpoints, None)
+    for key in [k for k in _applications if k[0] == endpoints]:
+        del _applications[key]
+    if vImarisLib is not None:
+        try:
+            vImarisLib.Disconnect()
+        except Exception:
+            logging.debug("Error closing Imaris connection", exc_info=True)
+
+
+def disconnect_all():
+    """Close every pooled connection."""
+    with _lock:
+        for endpoints in list(_clients):
+            _drop_client(endpoints)
+        _applications.clear()
+
+
+atexit.register(disconnect_all)
@@ -0,0 +1,161 @@
+# Export manifest for incremental / resumable batch SWC export
+# One JSON line per finished source file is appended to the manifest in the output
+# folder, so an interrupted run loses at most the file that was in progress.
+# Later lines override earlier ones; compact() rewrites the file with one line each.
+
+import hashlib
+import json
+import logging
+import os
+import threading
+
+
+MANIFEST_NAME = 'swc_export_manifest.jsonl'
+
+# Statuses that are a final outcome for an unchanged source; others are retried
+_FINAL_STATUSES = ('ok', 'empty', 'no_filaments')
+
+_HASH_CHUNK = 8 * 1024 * 1024
+
+# Separates a container file from the key of an output stored inside it
+CONTAINER_SEPARATOR = '::'
+
+
+def file_checksum(path):
+    """SHA-256 of a file, read in chunks."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ExportManifest:
+    """Tracks which sources were exported, from what state, with which settings.
+
+    Args:
+        input_dir, output_dir: batch folders; entries are keyed by path relative
+            to input_dir and outputs are stored relative to output_dir
+        settings: JSON-serialisable dict of export settings; entries written with
+            different settings are treated as stale
+        hash_sources: also record a content hash of each source. A source whose
+            size matches but mtime changed is then re-hashed instead of re-exported.
+        output_check: callable(output) -> bool deciding whether an output stored
+            inside a container ('<file>::<key>', see _h5_store) still exists.
+            Plain file outputs are checked by size.
+    """
+
+    def __init__(self, input_dir, output_dir, settings, hash_sources=False, output_check=None):
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.settings = settings
+        self.hash_sources = hash_sources
+        self.output_check = output_check
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        damaged = False
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self._entries[entry['source']] = entry
+                except (ValueError, KeyError):
+                    # Truncated last line of a crashed run
+                    damaged = True
+        logging.info(f"Loaded {len(self._entries)} manifest entries from {self.path}")
+        if damaged:
+            # Drop the broken line so new entries don't get appended onto it
+            self.compact()
+
+    def _key(self, fpath):
+        return os.path.relpath(fpath, self.input_dir).replace(os.sep, '/')
+
+    def _source_state(self, fpath, with_hash):
+        st = os.stat(fpath)
+        state = {'size': st.st_size, 'mtime': st.st_mtime}
+        if with_hash:
+            state['sha256'] = file_checksum(fpath)
+        return state
+
+    def lookup(self, fpath):
+        """Return the manifest entry for fpath if its export is still up to date, else None."""
+        entry = self._entries.get(self._key(fpath))
+        if entry is None or entry.get('settings') != self.settings:
+            return None
+        if entry['status'] not in _FINAL_STATUSES:
+            return None
+        try:
+            st = os.stat(fpath)
+        except OSError:
+            return None
+        if st.st_size != entry['size']:
+            return None
+        if st.st_mtime != entry['mtime']:
+            # Touched or copied: content hash decides, if we have one
+            if not (self.hash_sources and entry.get('sha256')):
+                return None
+            if file_checksum(fpath) != entry['sha256']:
+                return None
+            entry = dict(entry, mtime=st.st_mtime)  # remember the new mtime
+            self._append(entry)
+        if entry['status'] == 'ok':
+            # Entries of older manifests have no 'outputs' and are re-exported
+            outputs = entry.get('outputs')
+            if not outputs or not all(self._output_exists(out) for out in outputs):
+                return None
+        return entry
+
+    def _output_exists(self, out):
+        out_path = os.path.join(self.output_dir, out['path'])
+        if CONTAINER_SEPARATOR in out['path']:
+            return self.output_check is not None and self.output_check(out_path)
+        try:
+            return os.path.getsize(out_path) == out['size']
+        except OSError:
+            return False
+
+    def output_paths(self, entry):
+        """Absolute output paths of an up-to-date entry (empty if none was written)."""
+        return [os.path.join(self.output_dir, out['path']) for out in entry.get('outputs', ())]
+
+    def _output_entry(self, out_path):
+        if CONTAINER_SEPARATOR in out_path:
+            out_path, key = out_path.split(CONTAINER_SEPARATOR, 1)
+            rel = os.path.relpath(out_path, self.output_dir).replace(os.sep, '/')
+            return {'path': rel + CONTAINER_SEPARATOR + key}
+        rel = os.path.relpath(out_path, self.output_dir).replace(os.sep, '/')
+        return {'path': rel, 'size': os.path.getsize(out_path), 'sha256': file_checksum(out_path)}
+
+    def record(self, fpath, result):
+        """Append the outcome of exporting fpath; non-final statuses are not recorded.
+        The written files are taken from result['outputs'] (or result['output']).
+        """
+        if result['status'] not in _FINAL_STATUSES:
+            return
+        entry = {'source': self._key(fpath), 'status': result['status'], 'settings': self.settings}
+        entry.update(self._source_state(fpath, self.hash_sources))
+        if result['status'] == 'ok':
+            outputs = result.get('outputs') or [result['output']]
+            entry['outputs'] = [self._output_entry(out_path) for out_path in outputs]
+        self._append(entry)
+
+    def _append(self, entry):
+        with self._lock:
+            self._entries[entry['source']] = entry
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+
+    def compact(self):
+        """Rewrite the manifest with one line per source."""
+        with self._lock:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in self._entries.values():
+                    f.write(json.dumps(entry) + '\n')
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,134 @@
+# Morphometrics of exported SWC trees for the batch SWC export
+# Computed from the converted (N, 7) SWC arrays while they are still in memory, so
+# the exported files never have to be parsed again: cable length, branch points,
+# tips and a Sholl profile per filament, with one CSV per SWC file and a summary
+# row per file in a batch CSV.
+# SWC positions are in voxel units (see _coord_transform), which differ per axis
+# on anisotropic datasets, so lengths and distances are measured after mapping
+# the nodes back to Imaris world coordinates (micrometres, UNIT).
+
+import csv
+import os
+
+import numpy as np
+
+
+# Unit of total_length, max_distance and sholl_step: Imaris world units
+UNIT = 'um'
+
+# Columns of the per-file CSV (one row per filament). sholl holds the intersection
+# counts at sholl_step, 2 * sholl_step, ... around the filament's first root,
+# space separated; max_distance is the farthest node from that root.
+FIELDS = ['filament', 'time_index', 'nodes', 'trees', 'total_length', 'branch_points', 'tips',
+          'max_distance', 'sholl_step', 'sholl', 'unit']
+
+# Columns of the batch CSV (one row per exported object)
+BATCH_FIELDS = ['source', 'output', 'filaments'] + FIELDS[2:]
+
+CSV_SUFFIX = '_morphometry.csv'
+BATCH_CSV_NAME = 'batch_morphometry.csv'
+
+
+def measure_swc(swc, sholl_step, transform=None):
+    """Metrics of one filament's SWC array (ids 1..N, parents before children).
+    With the export's CoordinateTransform, lengths are in world units (UNIT);
+    without one, in SWC units.
+    """
+    n = swc.shape[0]
+    parent = swc[:, 6].astype(np.int64) - 1
+    has_parent = parent >= 0
+    child = np.flatnonzero(has_parent)
+    xyz = transform.to_world(swc[:, 2:5]) if transform is not None else swc[:, 2:5]
+    n_children = np.bincount(parent[child], minlength=n)
+
+    distance = np.linalg.norm(xyz - xyz[0], axis=1) if n else np.zeros(0)
+    max_distance = float(distance.max()) if n else 0.0
+    # An edge crosses the sphere of radius k * step if its ends lie on both sides
+    # (lo < k * step <= hi); count crossings per k with a difference array
+    n_radii = int(max_distance // sholl_step) if sholl_step > 0 else 0
+    lo = np.minimum(distance[child], distance[parent[child]])
+    hi = np.maximum(distance[child], distance[parent[child]])
+    first = np.floor(lo / sholl_step).astype(np.int64) + 1 if n_radii else np.zeros(0, dtype=np.int64)
+    last = np.floor(hi / sholl_step).astype(np.int64) if n_radii else np.zeros(0, dtype=np.int64)
+    crossing = last >= first
+    diff = (np.bincount(first[crossing], minlength=n_radii + 2)[:n_radii + 2]
+            - np.bincount(last[crossing] + 1, minlength=n_radii + 2)[:n_radii + 2])
+    sholl = np.cumsum(diff)[1:n_radii + 1]
+
+    return {'nodes': n, 'trees': int(n - child.shape[0]),
+            'total_length': float(np.linalg.norm(xyz[child] - xyz[parent[child]], axis=1).sum()),
+            'branch_points': int(np.count_nonzero(n_children >= 2)),
+            'tips': int(np.count_nonzero(n_children == 0)),
+            'max_distance': max_distance, 'sholl_step': sholl_step, 'sholl': sholl.tolist(),
+            'unit': UNIT if transform is not None else 'swc'}
+
+
+def measure_filaments(converted, sholl_step, transform=None):
+    """One metrics row per (filament index, time index, SWC array) of `converted`,
+    measured in world units with `transform` (see measure_swc)."""
+    rows = []
+    for i, t, swc in converted:
+        row = {'filament': i, 'time_index': t}
+        row.update(measure_swc(swc, sholl_step, transform))
+        rows.append(row)
+    return rows
+
+
+def summarize(rows):
+    """Totals over the filament rows of one object; Sholl counts are summed per radius."""
+    sholl = np.zeros(max([len(r['sholl']) for r in rows], default=0), dtype=np.int64)
+    for r in rows:
+        sholl[:len(r['sholl'])] += r['sholl']
+    return {'filaments': len(rows), 'nodes': sum(r['nodes'] for r in rows),
+            'trees': sum(r['trees'] for r in rows),
+            'total_length': sum(r['total_length'] for r in rows),
+            'branch_points': sum(r['branch_points'] for r in rows),
+            'tips': sum(r['tips'] for r in rows),
+            'max_distance': max([r['max_distance'] for r in rows], default=0.0),
+            'sholl_step': rows[0]['sholl_step'] if rows else '', 'sholl': sholl.tolist(),
+            'unit': rows[0]['unit'] if rows else ''}
+
+
+def csv_path(swc_path):
+    """Per-file CSV written next to an exported SWC file."""
+    return os.path.splitext(swc_path)[0] + CSV_SUFFIX
+
+
+def _csv_row(row):
+    row = dict(row)
+    row['sholl'] = ' '.join(str(c) for c in row['sholl'])
+    for key in ('total_length', 'max_distance'):
+        row[key] = f"{row[key]:.6f}"
+    return row
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(_csv_row(r) for r in rows)
+
+
+def read_csv(path):
+    """Filament rows of a per-file CSV written by write_csv."""
+    rows = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            for key in ('filament', 'time_index', 'nodes', 'trees', 'branch_points', 'tips'):
+                row[key] = int(row[key])
+            for key in ('total_length', 'max_distance', 'sholl_step'):
+                row[key] = float(row[key])
+            row['sholl'] = [int(c) for c in row['sholl'].split()]
+            rows.append(row)
+    return rows
+
+
+def write_batch_csv(path, entries):
+    """Batch CSV from (source, output, summary) entries."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=BATCH_FIELDS)
+        writer.writeheader()
+        for source, output, summary in entries:
+            row = _csv_row(summary)
+            row.update(source=source, output=output)
+            writer.writerow(row)
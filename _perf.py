@@ -0,0 +1,163 @@
+# Per-file timing spans and counters for the batch SWC export
+# Every exported file gets a metrics dict (kept in its batch result, so it also
+# comes back from worker processes) with the seconds spent in each stage and
+# counts of Imaris calls, filaments, vertices, edges, SWC nodes and bytes
+# written. A run writes one JSON line per file plus a summary table.
+
+import contextlib
+import datetime
+import json
+import os
+import statistics
+import time
+
+import numpy as np
+
+
+# Stages in the order a file passes through them; the metrics key is '<stage>_s'
+STAGES = ('open', 'scene', 'fetch', 'convert', 'write', 'measure')
+COUNTERS = ('rpc_calls', 'objects', 'filaments', 'vertices', 'edges', 'nodes', 'bytes_written')
+
+METRICS_PREFIX = 'batch_metrics_'
+
+# Return values that are data rather than Imaris objects, and are not wrapped
+_PLAIN = (type(None), bool, int, float, str, bytes, list, tuple, dict, set, np.ndarray, np.generic)
+
+
+def new_metrics():
+    metrics = {f'{stage}_s': 0.0 for stage in STAGES}
+    metrics.update({name: 0 for name in COUNTERS})
+    metrics['started'] = time.time()
+    return metrics
+
+
+@contextlib.contextmanager
+def span(metrics, stage):
+    """Add the time spent in the block to metrics['<stage>_s'] (no-op without metrics)."""
+    if metrics is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics[f'{stage}_s'] += time.perf_counter() - t0
+
+
+def count_fetched(metrics, fetched):
+    """Add the filament, vertex and edge counts of one _fetch_filaments result."""
+    if metrics is None or fetched is None:
+        return
+    _transform, filament_data = fetched
+    metrics['filaments'] += len(filament_data)
+    metrics['vertices'] += sum(len(f.positions) for f in filament_data)
+    metrics['edges'] += sum(len(f.edges) for f in filament_data)
+
+
+def count_converted(metrics, converted):
+    if metrics is not None:
+        metrics['nodes'] += sum(swc.shape[0] for _i, _t, swc in converted)
+
+
+class _CountingProxy:
+    """Wraps an Imaris proxy and counts the calls made through it (and through
+    the objects its calls return) in metrics['rpc_calls']."""
+
+    __slots__ = ('_target', '_metrics')
+
+    def __init__(self, target, metrics):
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_metrics', metrics)
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+        metrics = self._metrics
+
+        def call(*args, **kwargs):
+            metrics['rpc_calls'] += 1
+            return _wrap(attr(*[_unwrap(a) for a in args], **kwargs), metrics)
+        return call
+
+    @property
+    def __class__(self):
+        return self._target.__class__
+
+    def __eq__(self, other):
+        return self._target == _unwrap(other)
+
+    def __hash__(self):
+        return hash(self._target)
+
+    def __repr__(self):
+        return f"<counted {self._target!r}>"
+
+
+def _wrap(value, metrics):
+    if isinstance(value, _PLAIN) or type(value) is _CountingProxy:
+        return value
+    return _CountingProxy(value, metrics)
+
+
+def _unwrap(value):
+    return value._target if type(value) is _CountingProxy else value
+
+
+def count_calls(proxy, metrics):
+    """`proxy` with every call through it counted; unchanged without metrics."""
+    return proxy if metrics is None else _wrap(proxy, metrics)
+
+
+class MetricsLog:
+    """JSON lines file of the per-file metrics of one batch run.
+
+    Args:
+        output_dir: folder of the file, named METRICS_PREFIX + start time + '.jsonl'
+    """
+
+    def __init__(self, output_dir):
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.path = os.path.join(output_dir, f'{METRICS_PREFIX}{stamp}.jsonl')
+        self.records = []
+
+    def write(self, result):
+        """Append the metrics of a finished batch result (results without any are skipped)."""
+        metrics = result.get('metrics')
+        if metrics is None:
+            return
+        record = {'source': result['source'], 'status': result['status'], 'worker': result.get('worker', '')}
+        record.update({k: round(v, 4) if isinstance(v, float) else v for k, v in metrics.items()})
+        self.records.append(record)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def summary(self):
+        """Totals and per-file statistics of every stage and counter."""
+        summary = {'files': len(self.records)}
+        for key in [f'{stage}_s' for stage in STAGES] + list(COUNTERS):
+            values = [r[key] for r in self.records]
+            if not values:
+                continue
+            summary[key] = {'total': sum(values), 'mean': statistics.mean(values),
+                            'median': statistics.median(values), 'max': max(values)}
+        return summary
+
+    def close(self):
+        """Append the summary line and return the summary as a text table."""
+        summary = self.summary()
+        if self.records:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'summary': summary}) + '\n')
+        return format_summary(summary)
+
+
+def format_summary(summary):
+    lines = [f"{summary['files']} file(s)",
+             f"{'':>14} {'total':>12} {'mean':>12} {'median':>12} {'max':>12}"]
+    for key, stats in summary.items():
+        if key == 'files':
+            continue
+        fmt = '{:>12.3f}' if key.endswith('_s') else '{:>12.0f}'
+        lines.append(f"{key:>14} " + ' '.join(fmt.format(stats[s]) for s in ('total', 'mean', 'median', 'max')))
+    return '\n'.join(lines)
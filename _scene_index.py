@@ -0,0 +1,86 @@
+# Index of the Filaments objects in an Imaris Surpass scene
+# Walking the scene costs several Ice round-trips per item, so the tree is walked
+# once and every Filaments object is recorded with its name, folder path and
+# filament count. An index is a snapshot: build a new one for a new scene.
+
+import fnmatch
+import logging
+import re
+from collections import namedtuple
+
+
+# One Filaments object of the scene.
+#   name: object name, path: '/'-joined names of the folders above it plus the name,
+#   n_filaments: filament count when indexed, filaments: the IFilaments proxy
+FilamentsObject = namedtuple('FilamentsObject', ['name', 'path', 'n_filaments', 'filaments'])
+
+
+class SceneIndex:
+    """All Filaments objects of the Surpass scene of one Imaris application, in tree order.
+
+    The scene is walked on first use and the result kept for the lifetime of the
+    index, so lookups through one index never walk it again. Changes to the scene
+    after that are not seen; create a new index for a newly opened file.
+    """
+
+    def __init__(self, vImaris):
+        self._imaris = vImaris
+        self._objects = None
+
+    def objects(self):
+        """List of FilamentsObject for every Filaments object in the scene."""
+        if self._objects is None:
+            scene = self._imaris.GetSurpassScene()
+            self._objects = _walk(self._imaris.GetFactory(), scene) if scene is not None else []
+            logging.debug(f"Scene index: {len(self._objects)} Filaments object(s)")
+        return self._objects
+
+    def select(self, pattern=None):
+        """Filaments objects whose name or path matches the glob `pattern` (all if None)."""
+        objects = self.objects()
+        if pattern is None:
+            return list(objects)
+        return [o for o in objects if fnmatch.fnmatchcase(o.name, pattern)
+                or fnmatch.fnmatchcase(o.path, pattern)]
+
+    def first(self):
+        """First Filaments object in tree order, or None."""
+        objects = self.objects()
+        return objects[0] if objects else None
+
+
+def safe_name(name):
+    """Object name usable in a file name or HDF5 key."""
+    return re.sub(r'[^\w.-]+', '_', name).strip('_') or 'Filaments'
+
+
+def _child_count(container):
+    try:
+        return container.GetNumberOfChildren()
+    except Exception:
+        return 0
+
+
+def _walk(vFactory, scene):
+    """Depth-first walk of the DataContainer tree, children in scene order."""
+    objects = []
+    stack = [(scene, '')]
+    while stack:
+        container, prefix = stack.pop()
+        folders = []
+        for i in range(_child_count(container)):
+            try:
+                child = container.GetChild(i)
+            except Exception:
+                continue
+            fil = vFactory.ToFilaments(child)
+            if fil is not None:
+                name = fil.GetName()
+                objects.append(FilamentsObject(name, prefix + name, fil.GetNumberOfFilaments(), fil))
+                continue
+            folder = vFactory.ToDataContainer(child)
+            if folder is not None:
+                folders.append((folder, prefix + folder.GetName() + '/'))
+        # Visit sub-folders in scene order, after this folder's own objects
+        stack.extend(reversed(folders))
+    return objects
@@ -0,0 +1,143 @@
+# Binary columnar morphology format (.swcb) for fast export/import round trips
+# Holds the same nodes as a combined SWC file, stored column by column so a reader
+# can memory-map the file and use the columns in place, without any text parsing.
+#
+# Layout (little endian), every block starting on a 64-byte boundary:
+#   header   magic b'SWCB', uint16 version, uint16 reserved, uint64 n_nodes, uint64 n_filaments
+#   offsets  int64[n_filaments + 1]   first node row of each filament, then n_nodes
+#   time     int32[n_filaments]       time index of each filament
+#   id       int64[n_nodes]           node ids, numbered through the file like a combined SWC
+#   type     int32[n_nodes]
+#   xyz      float64[n_nodes, 3]
+#   radius   float64[n_nodes]
+#   parent   int64[n_nodes]           parent node id, -1 for roots
+
+import mmap
+import struct
+
+import numpy as np
+
+
+MAGIC = b'SWCB'
+VERSION = 1
+EXTENSION = '.swcb'
+
+_HEADER = struct.Struct('<4sHHQQ')
+_ALIGN = 64
+
+# (name, dtype, values per node or filament); 'offsets' has n_filaments + 1 entries
+_FILAMENT_COLUMNS = (('offsets', np.dtype('<i8'), 1), ('time', np.dtype('<i4'), 1))
+_NODE_COLUMNS = (('id', np.dtype('<i8'), 1), ('type', np.dtype('<i4'), 1), ('xyz', np.dtype('<f8'), 3),
+                 ('radius', np.dtype('<f8'), 1), ('parent', np.dtype('<i8'), 1))
+
+
+def _aligned(pos):
+    return -(-pos // _ALIGN) * _ALIGN
+
+
+def _layout(n_nodes, n_filaments):
+    """Yield (name, dtype, width, count, file offset) for every column."""
+    pos = _aligned(_HEADER.size)
+    for name, dtype, width in _FILAMENT_COLUMNS + _NODE_COLUMNS:
+        count = n_nodes if (name, dtype, width) in _NODE_COLUMNS else n_filaments
+        if name == 'offsets':
+            count += 1
+        yield name, dtype, width, count, pos
+        pos = _aligned(pos + count * width * dtype.itemsize)
+
+
+def write_swcb(path, swc_arrays, time_indices=None):
+    """Write (N, 7) SWC arrays (one per filament) to a .swcb file.
+
+    Node and parent ids are offset like _swc_convert.combine_swc, so the file
+    holds the same numbers as the combined text SWC. Returns the file size.
+    """
+    swc_arrays = [np.asarray(a, dtype=np.float64).reshape(-1, 7) for a in swc_arrays]
+    sizes = np.array([a.shape[0] for a in swc_arrays], dtype=np.int64)
+    n_nodes, n_filaments = int(sizes.sum()), len(swc_arrays)
+    node_offset = np.concatenate(([0], np.cumsum(sizes)))
+    if time_indices is None:
+        time_indices = np.zeros(n_filaments)
+
+    def node_column(name, dtype):
+        for a, offset in zip(swc_arrays, node_offset):
+            if name == 'id':
+                yield a[:, 0] + offset
+            elif name == 'type':
+                yield a[:, 1]
+            elif name == 'xyz':
+                yield a[:, 2:5]
+            elif name == 'radius':
+                yield a[:, 5]
+            else:
+                yield np.where(a[:, 6] != -1, a[:, 6] + offset, -1)
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, 0, n_nodes, n_filaments))
+        for name, dtype, width, count, pos in _layout(n_nodes, n_filaments):
+            f.write(b'\0' * (pos - f.tell()))
+            if name == 'offsets':
+                f.write(node_offset.astype(dtype).tobytes())
+            elif name == 'time':
+                f.write(np.asarray(time_indices).astype(dtype).tobytes())
+            else:
+                for block in node_column(name, dtype):
+                    f.write(np.ascontiguousarray(block, dtype=dtype).tobytes())
+        return f.tell()
+
+
+class SWCBFile:
+    """A .swcb file opened for reading; columns are read-only views of the file.
+
+    Attributes:
+        n_nodes, n_filaments, version
+        offsets, time, id, type, xyz, radius, parent: column arrays (see module comment)
+
+    With use_mmap (the default) the columns map the file directly and stay valid
+    until close(); otherwise the file is read into memory once.
+    """
+
+    def __init__(self, path, use_mmap=True):
+        self.path = path
+        with open(path, 'rb') as f:
+            if use_mmap:
+                self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._buffer = f.read()
+        if len(self._buffer) < _HEADER.size:
+            raise ValueError(f"{path} is not a .swcb file (too short)")
+        magic, self.version, _reserved, self.n_nodes, self.n_filaments = _HEADER.unpack_from(self._buffer)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a .swcb file")
+        if self.version > VERSION:
+            raise ValueError(f"{path}: .swcb version {self.version} is newer than supported ({VERSION})")
+        for name, dtype, width, count, pos in _layout(self.n_nodes, self.n_filaments):
+            if pos + count * width * dtype.itemsize > len(self._buffer):
+                raise ValueError(f"{path} is truncated")
+            column = np.frombuffer(self._buffer, dtype=dtype, count=count * width, offset=pos)
+            setattr(self, name, column.reshape(-1, 3) if width == 3 else column)
+
+    def filament(self, i):
+        """Columns of filament i as a dict of views with SWC_DTYPE field names."""
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        xyz = self.xyz[start:end]
+        return {'id': self.id[start:end], 'type': self.type[start:end],
+                'x': xyz[:, 0], 'y': xyz[:, 1], 'z': xyz[:, 2],
+                'radius': self.radius[start:end], 'parent': self.parent[start:end]}
+
+    def close(self):
+        """Release the mapping; column arrays must not be used afterwards."""
+        for name, _dtype, _width in _FILAMENT_COLUMNS + _NODE_COLUMNS:
+            self.__dict__.pop(name, None)
+        if isinstance(self._buffer, mmap.mmap):
+            try:
+                self._buffer.close()
+            except BufferError:
+                pass  # views handed out by filament() still exist; unmapped when they are freed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
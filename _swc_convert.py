@@ -0,0 +1,306 @@
+# Filament to SWC conversion for the Imaris SWC XTensions
+# Array-based replacement for the per-vertex BFS that used to live in ExportSWC_*.py
+
+import numpy as np
+
+
+# Column layout of an SWC row: id, type, x, y, z, radius, parent
+SWC_FORMAT = '%d %d %.6f %.6f %.6f %.6f %d'
+
+# Default SWC type when Imaris reports no (or too few) vertex types
+DEFAULT_TYPE = 3
+
+# Where each connected component is rooted:
+#   'index'      its lowest vertex index (the original exporter's behaviour)
+#   'beginning'  the Imaris beginning vertex for the filament's component (usually
+#                the soma), other components by lowest index
+#   'radius'     its vertex with the largest radius (lowest index on ties)
+ROOT_POLICIES = ('index', 'beginning', 'radius')
+
+# Node numbering: 'bfs' (breadth-first, by tree level) or 'dfs' (depth-first
+# pre-order, so every branch is a contiguous run of rows). Both put every parent
+# before its children.
+NODE_ORDERS = ('bfs', 'dfs')
+
+# Frontiers narrower than this are expanded in plain Python; for long unbranched
+# chains the per-level NumPy call overhead would otherwise dominate.
+_NARROW_FRONTIER = 48
+
+
+def build_adjacency(n, edges):
+    """Build a CSR adjacency (indptr, indices) for an undirected filament graph.
+
+    Neighbours of each vertex keep the order in which their edges appear in
+    `edges`, which is the order the original adjacency-list BFS visited them.
+    Edges that reference vertices outside 0..n-1 are dropped.
+
+    Returns:
+        tuple: (indptr, indices, n_invalid)
+    """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    valid = np.all((edges >= 0) & (edges < n), axis=1)
+    n_invalid = int(edges.shape[0] - np.count_nonzero(valid))
+    if n_invalid:
+        edges = edges[valid]
+
+    # Interleave both directions so (p1 -> p2) precedes (p2 -> p1) for every edge,
+    # then a stable sort by source keeps per-vertex insertion order.
+    src = edges.reshape(-1)
+    dst = edges[:, ::-1].reshape(-1)
+    indices = dst[np.argsort(src, kind='stable')]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, indices, n_invalid
+
+
+def _next_unvisited(visited, start, step=4096):
+    """Return the first index >= start with visited False, or len(visited)."""
+    n = visited.shape[0]
+    while start < n:
+        chunk = visited[start:start + step]
+        if not chunk.all():
+            return start + int(np.argmin(chunk))
+        start += step
+    return n
+
+
+def bfs_order(n, indptr, indices, roots=None):
+    """Breadth-first ordering of all components of a filament graph.
+
+    Components are started from the vertices in `roots` (in that order, skipping
+    any already reached), then from their lowest unvisited vertex index.
+    Neighbours are enqueued in CSR order; without roots this reproduces the
+    traversal order of the original queue-based exporter exactly.
+
+    Returns:
+        tuple: (order, parent) where order[k] is the Imaris vertex placed at SWC
+        row k and parent[k] is the row of its parent (-1 for a root).
+    """
+    order = np.empty(n, dtype=np.int64)
+    parent = np.full(n, -1, dtype=np.int64)
+    # One buffer, two views: bytearray for fast scalar access in the narrow
+    # path, bool array for the vectorised path.
+    visited_buf = bytearray(n)
+    visited = np.frombuffer(visited_buf, dtype=bool)
+    ip = ix = None  # Python-list copies of the CSR, built on first narrow level
+    first_seen = np.empty(n, dtype=np.int64)
+
+    roots = [] if roots is None else [int(r) for r in roots]
+    next_root = 0
+    pos = 0
+    scan = 0
+    while pos < n:
+        while next_root < len(roots) and visited_buf[roots[next_root]]:
+            next_root += 1
+        if next_root < len(roots):
+            start = roots[next_root]
+        else:
+            start = scan = _next_unvisited(visited, scan)
+        visited_buf[start] = 1
+        order[pos] = start
+        frontier = [start]
+        base = pos  # row of frontier[0]
+        pos += 1
+
+        while len(frontier):
+            if len(frontier) < _NARROW_FRONTIER:
+                if ip is None:
+                    ip = indptr.tolist()
+                    ix = indices.tolist()
+                nxt = []
+                par = []
+                for k, u in enumerate(frontier if isinstance(frontier, list) else frontier.tolist()):
+                    for j in range(ip[u], ip[u + 1]):
+                        v = ix[j]
+                        if not visited_buf[v]:
+                            visited_buf[v] = 1
+                            nxt.append(v)
+                            par.append(k)
+                m = len(nxt)
+                if m == 0:
+                    break
+            else:
+                frontier = np.asarray(frontier, dtype=np.int64)
+                starts = indptr[frontier]
+                counts = indptr[frontier + 1] - starts
+                total = int(counts.sum())
+                if total == 0:
+                    break
+                owner = np.repeat(np.arange(frontier.shape[0]), counts)
+                offs = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+                nb = indices[starts[owner] + offs]
+                fresh = ~visited[nb]
+                nb = nb[fresh]
+                owner = owner[fresh]
+                if nb.shape[0] == 0:
+                    break
+                # A vertex reached from several frontier vertices goes to the
+                # first one in queue order, as in the sequential BFS. Assigning
+                # in reverse lets the earliest occurrence win without a sort.
+                slot = np.arange(nb.shape[0])
+                first_seen[nb[::-1]] = slot[::-1]
+                first = first_seen[nb] == slot
+                nxt = nb[first]
+                par = owner[first]
+                visited[nxt] = True
+                m = nxt.shape[0]
+
+            order[pos:pos + m] = nxt
+            parent[pos:pos + m] = np.asarray(par, dtype=np.int64) + base
+            base = pos
+            pos += m
+            frontier = nxt
+
+    return order, parent
+
+
+def _preorder_rows(parent):
+    """Depth-first pre-order row of every row of a forest whose parents come first.
+
+    Unbranched runs are found with NumPy (pointer jumping along parent links), so
+    the Python-level walk only visits one item per branch, not per vertex.
+    Children are taken in row order.
+    """
+    n = parent.shape[0]
+    rows = np.arange(n)
+    has_parent = parent >= 0
+    n_children = np.bincount(parent[has_parent], minlength=n)
+    # A row continues its parent's run if it is that parent's only child
+    cont = np.zeros(n, dtype=bool)
+    cont[has_parent] = n_children[parent[has_parent]] == 1
+    head = np.where(cont, parent, rows)
+    dist = cont.astype(np.int64)
+    while True:
+        # After this loop head[k] is the first row of k's run and dist[k] k's offset in it
+        jumped = head[head]
+        if np.array_equal(jumped, head):
+            break
+        dist += dist[head]
+        head = jumped
+
+    starts = np.flatnonzero(~cont)
+    run_id = np.empty(n, dtype=np.int64)
+    run_id[starts] = np.arange(starts.shape[0])
+    run_of_row = run_id[head]
+    run_len = np.bincount(run_of_row, minlength=starts.shape[0])
+    run_parent = np.where(parent[starts] >= 0, run_of_row[np.maximum(parent[starts], 0)], -1)
+
+    # Walk the (much smaller) tree of runs depth-first, children in row order
+    by_parent = np.argsort(run_parent, kind='stable')
+    n_roots = int(np.count_nonzero(run_parent < 0))
+    child_ptr = np.zeros(starts.shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(run_parent[by_parent[n_roots:]], minlength=starts.shape[0]), out=child_ptr[1:])
+    cp = child_ptr.tolist()
+    kids = by_parent[n_roots:].tolist()
+    run_order = []
+    stack = by_parent[:n_roots][::-1].tolist()
+    while stack:
+        r = stack.pop()
+        run_order.append(r)
+        stack.extend(reversed(kids[cp[r]:cp[r + 1]]))
+
+    run_order = np.asarray(run_order, dtype=np.int64)
+    run_start = np.empty(starts.shape[0], dtype=np.int64)
+    run_start[run_order] = np.cumsum(run_len[run_order]) - run_len[run_order]
+    return run_start[run_of_row] + dist
+
+
+def dfs_order(n, indptr, indices, roots=None):
+    """Depth-first pre-order of all components of a filament graph.
+
+    The pre-order of the breadth-first spanning tree of bfs_order (the same
+    roots, children in CSR order); for a tree this is the depth-first traversal
+    itself. Each branch occupies a contiguous run of rows after its branch point.
+
+    Returns:
+        tuple: (order, parent) as for bfs_order.
+    """
+    order, parent = bfs_order(n, indptr, indices, roots)
+    new_row = _preorder_rows(parent)
+    pre_order = np.empty(n, dtype=np.int64)
+    pre_parent = np.empty(n, dtype=np.int64)
+    pre_order[new_row] = order
+    pre_parent[new_row] = np.where(parent >= 0, new_row[np.maximum(parent, 0)], -1)
+    return pre_order, pre_parent
+
+
+def choose_roots(n, indptr, indices, policy='index', radii=None, beginning=-1):
+    """Start vertices for bfs_order / dfs_order under a ROOT_POLICIES policy.
+
+    Returns None for 'index' (and for 'beginning' without a valid beginning vertex,
+    which falls back to it); otherwise an array of root vertices.
+    """
+    if policy not in ROOT_POLICIES:
+        raise ValueError(f"Unknown root policy {policy!r}; expected one of {ROOT_POLICIES}")
+    if policy == 'beginning':
+        return np.array([beginning], dtype=np.int64) if 0 <= beginning < n else None
+    if policy == 'radius':
+        # Label components with an index-rooted pass, then take each one's widest vertex
+        order, parent = bfs_order(n, indptr, indices)
+        component = np.cumsum(parent == -1) - 1
+        radius = np.asarray(radii, dtype=np.float64).reshape(-1)[order]
+        ranked = np.lexsort((order, -radius, component))
+        first = np.ones(n, dtype=bool)
+        first[1:] = component[ranked][1:] != component[ranked][:-1]
+        return order[ranked[first]]
+    return None
+
+
+def filament_to_swc(positions, radii, types, edges, transform, root_policy='index', beginning=-1,
+                    node_order='bfs'):
+    """Convert one Imaris filament to an (N, 7) SWC array.
+
+    Args:
+        positions: (N, 3) vertex positions in Imaris world coordinates
+        radii: (N,) vertex radii
+        types: per-vertex types; missing entries default to DEFAULT_TYPE
+        edges: (E, 2) vertex index pairs
+        transform: _coord_transform.CoordinateTransform of the dataset
+        root_policy: one of ROOT_POLICIES
+        beginning: Imaris beginning vertex of the filament ('beginning' policy)
+        node_order: one of NODE_ORDERS
+
+    Returns:
+        tuple: (swc, n_invalid_edges). Every parent id is smaller than its node's id.
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    n = positions.shape[0]
+    swc = np.zeros((n, 7))
+    if n == 0:
+        return swc, 0
+    if node_order not in NODE_ORDERS:
+        raise ValueError(f"Unknown node order {node_order!r}; expected one of {NODE_ORDERS}")
+
+    indptr, indices, n_invalid = build_adjacency(n, edges)
+    roots = choose_roots(n, indptr, indices, root_policy, radii, beginning)
+    traverse = dfs_order if node_order == 'dfs' else bfs_order
+    order, parent = traverse(n, indptr, indices, roots)
+
+    node_type = np.full(n, DEFAULT_TYPE, dtype=np.float64)
+    if types is not None and len(types):
+        types = np.asarray(types, dtype=np.float64).reshape(-1)[:n]
+        node_type[:types.shape[0]] = types
+
+    swc[:, 0] = np.arange(1, n + 1)
+    swc[:, 1] = node_type[order]
+    swc[:, 2:5] = transform.to_swc(positions[order])
+    swc[:, 5] = np.asarray(radii, dtype=np.float64).reshape(-1)[order]
+    swc[:, 6] = np.where(parent >= 0, parent + 1, -1)
+    return swc, n_invalid
+
+
+def combine_swc(swc_arrays):
+    """Stack per-filament SWC arrays into one, offsetting node and parent ids."""
+    final_swc_data = []
+    node_offset = 0
+    for swc_data in swc_arrays:
+        if swc_data.shape[0] > 0:
+            temp_data = swc_data.copy()
+            temp_data[:, 0] += node_offset
+            parent_mask = temp_data[:, 6] != -1
+            temp_data[parent_mask, 6] += node_offset
+            final_swc_data.append(temp_data)
+            node_offset += swc_data.shape[0]
+    if not final_swc_data:
+        return None
+    return np.vstack(final_swc_data)
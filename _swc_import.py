@@ -0,0 +1,301 @@
+# SWC -> Imaris filament conversion for the import XTensions
+# Finding, parsing and converting files needs no Imaris connection, so folder
+# imports do it in a worker pool while the XTension thread makes the Imaris calls.
+
+import collections
+import concurrent.futures
+import logging
+import os
+
+import numpy as np
+
+import _swc_binary
+import _swc_io
+
+
+# File types the import tools read: text SWC and the binary columnar format
+IMPORT_EXTENSIONS = ('.swc', _swc_binary.EXTENSION)
+
+# Worker processes used by load_swc_files by default
+IMPORT_WORKERS = min(8, os.cpu_count() or 1)
+
+# Upper bound on vertices sent in one AddFilamentsList call; larger imports are
+# split so a single Ice message stays well below Ice.MessageSizeMax
+BULK_MAX_VERTICES = 2_000_000
+
+# Bytes at the start of a file searched for a TIME_INDEX section; the exporters
+# write the first one right after the (short) header
+_TIME_INDEX_PROBE = 64 * 1024
+
+# Proxy classes on which AddFilamentsList already failed, so we don't retry it
+_bulk_unsupported = set()
+
+# Filament arrays ready for IFilaments.AddFilament (types 0: Dendrite; 1: Spine);
+# root is the vertex index of the SWC root, used as the beginning vertex
+ImportedFilament = collections.namedtuple('ImportedFilament', 'positions radii types edges root time_index',
+                                          defaults=(0,))
+
+
+def find_swc_files(folder, recursive=False):
+    """Sorted paths of the .swc/.swcb files in folder (and its subfolders if recursive)."""
+    found = []
+    if recursive:
+        for dirpath, dirnames, filenames in os.walk(folder):
+            dirnames.sort()
+            found.extend(os.path.join(dirpath, f) for f in filenames if f.lower().endswith(IMPORT_EXTENSIONS))
+    else:
+        found = [os.path.join(folder, f) for f in os.listdir(folder)
+                 if f.lower().endswith(IMPORT_EXTENSIONS) and os.path.isfile(os.path.join(folder, f))]
+    return sorted(found)
+
+
+def parent_rows(ids, parents):
+    """Row index of each node's parent, or -1 for roots.
+
+    Node ids may be sparse and rows in any order. A node is a root when its
+    parent id is negative, not in the file, or its own id.
+    """
+    n = ids.shape[0]
+    order = np.argsort(ids, kind='stable')
+    sorted_ids = ids[order]
+    duplicate = sorted_ids[1:] == sorted_ids[:-1]
+    if duplicate.any():
+        raise ValueError(f"Duplicate SWC node id {sorted_ids[1:][duplicate][0]}")
+    pos = np.searchsorted(sorted_ids, parents)
+    pos[pos == n] = 0
+    found = sorted_ids[pos] == parents
+    rows = np.where(found, order[pos], -1)
+    rows[rows == np.arange(n)] = -1
+    missing = np.count_nonzero(~found & (parents >= 0))
+    if missing:
+        logging.warning(f"{missing} SWC nodes reference a missing parent id; imported as roots")
+    return rows
+
+
+def tree_labels(parent_row):
+    """Row of the root of the tree each node belongs to (pointer jumping, O(n log depth))."""
+    n = parent_row.shape[0]
+    label = np.where(parent_row < 0, np.arange(n), parent_row)
+    for _ in range(n.bit_length() + 1):
+        jumped = label[label]
+        if np.array_equal(jumped, label):
+            break
+        label = jumped
+    if (parent_row[label] >= 0).any():
+        raise ValueError('SWC parent ids form a cycle')
+    return label
+
+
+def swc_to_filaments(swc, transform, time_index=0):
+    """Convert SWC nodes to ImportedFilaments in dataset coordinates, one per tree.
+
+    swc is a SWC_DTYPE array or a dict of equally long columns with the same names.
+
+    Nodes keep their file order within each tree and trees are ordered by the
+    position of their root in the file.
+    """
+    n = len(swc['id'])
+    if n == 0:
+        raise ValueError('SWC file contains no nodes')
+    positions = np.column_stack((swc['x'], swc['y'], swc['z']))
+    transform.to_world(positions, out=positions)
+    radii = np.array(swc['radius'], dtype=np.float64)
+    types = np.zeros((n))
+    parent_row = parent_rows(swc['id'], swc['parent'])
+    child = np.flatnonzero(parent_row >= 0)
+    edges = np.column_stack((parent_row[child], child))
+    roots = np.flatnonzero(parent_row < 0)
+    label = tree_labels(parent_row)  # also rejects cycles
+    if roots.shape[0] == 1:
+        return [ImportedFilament(positions, radii, types, edges, int(roots[0]), time_index)]
+
+    # Several trees: renumber rows within each tree and split the arrays
+    tree = np.searchsorted(roots, label)
+    rows = np.argsort(tree, kind='stable')
+    sizes = np.bincount(tree, minlength=roots.shape[0])
+    starts = np.cumsum(sizes) - sizes
+    local = np.empty(n, dtype=np.int64)
+    local[rows] = np.arange(n) - np.repeat(starts, sizes)
+    edge_tree = tree[child]
+    edge_order = np.argsort(edge_tree, kind='stable')
+    edge_splits = np.cumsum(np.bincount(edge_tree, minlength=roots.shape[0]))[:-1]
+    row_splits = np.cumsum(sizes)[:-1]
+    return [ImportedFilament(*parts, int(root), time_index)
+            for *parts, root in zip(np.split(positions[rows], row_splits),
+                                    np.split(radii[rows], row_splits),
+                                    np.split(types[rows], row_splits),
+                                    np.split(local[edges[edge_order]], edge_splits),
+                                    local[roots])]
+
+
+def load_swc_file(path, transform):
+    """Read and convert one SWC file to a list of ImportedFilaments.
+
+    Files written with TIME_INDEX sections keep the time index of each section.
+    .swcb files are memory-mapped and keep the time index of each filament.
+    """
+    if path.lower().endswith(_swc_binary.EXTENSION):
+        filaments = []
+        with _swc_binary.SWCBFile(path) as swcb:
+            for i in range(swcb.n_filaments):
+                if swcb.offsets[i + 1] > swcb.offsets[i]:
+                    filaments.extend(swc_to_filaments(swcb.filament(i), transform, int(swcb.time[i])))
+        if not filaments:
+            raise ValueError('SWCB file contains no nodes')
+        return filaments
+    with open(path, 'rb') as f:
+        timed = _swc_io.TIME_INDEX_TAG.encode() in f.read(_TIME_INDEX_PROBE)
+    if not timed:
+        return swc_to_filaments(_swc_io.read_swc(path), transform)
+    filaments = []
+    for time_index, swc in _swc_io.read_swc_timepoints(path):
+        if swc.shape[0]:
+            filaments.extend(swc_to_filaments(swc, transform, time_index))
+    if not filaments:
+        raise ValueError('SWC file contains no nodes')
+    return filaments
+
+
+def load_swc_files(paths, transform, workers=None, max_pending=None):
+    """Yield (path, list of ImportedFilament or None, error or None) for paths, in order.
+
+    Files are read and converted in a pool of `workers` processes (IMPORT_WORKERS
+    if None; 0 or 1 loads them in the calling thread). At most max_pending files
+    (default 2 * workers) are in flight, so memory stays bounded however large
+    the folder is, and results are handed out as soon as they are next in order.
+    """
+    if workers is None:
+        workers = IMPORT_WORKERS
+    workers = min(workers, len(paths))
+    if workers <= 1:
+        for path in paths:
+            try:
+                yield path, load_swc_file(path, transform), None
+            except Exception as e:
+                yield path, None, e
+        return
+
+    if max_pending is None:
+        max_pending = 2 * workers
+    import multiprocessing
+    context = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(workers, mp_context=context) as pool:
+        pending = collections.deque()
+        remaining = iter(paths)
+        for path in remaining:
+            pending.append((path, pool.submit(load_swc_file, path, transform)))
+            if len(pending) >= max_pending:
+                break
+        while pending:
+            path, future = pending.popleft()
+            try:
+                yield path, future.result(), None
+            except Exception as e:
+                yield path, None, e
+            for path in remaining:
+                pending.append((path, pool.submit(load_swc_file, path, transform)))
+                break
+
+
+def combine_filaments(filaments):
+    """Concatenate filaments into the flat arrays of a cFilamentsList.
+
+    Edges stay indexed into each filament's own vertices: like GetFilamentsList
+    returns them (see _filament_fetch) and AddFilament takes them, only the
+    per-filament counts tell where one filament ends. The combined filament has
+    no root.
+
+    Returns:
+        tuple: (ImportedFilament, points per filament, edges per filament)
+    """
+    n_points = np.array([f.positions.shape[0] for f in filaments], dtype=np.int64)
+    n_edges = np.array([f.edges.shape[0] for f in filaments], dtype=np.int64)
+    combined = ImportedFilament(np.concatenate([f.positions for f in filaments]).reshape(-1, 3),
+                                np.concatenate([f.radii for f in filaments]),
+                                np.concatenate([f.types for f in filaments]),
+                                np.concatenate([f.edges for f in filaments]).reshape(-1, 2).astype(np.int64),
+                                None)
+    return combined, n_points, n_edges
+
+
+def _batches(filaments, max_vertices):
+    """Split filaments into consecutive groups of at most max_vertices vertices (at least one filament each)."""
+    batch, size = [], 0
+    for f in filaments:
+        if batch and size + f.positions.shape[0] > max_vertices:
+            yield batch
+            batch, size = [], 0
+        batch.append(f)
+        size += f.positions.shape[0]
+    if batch:
+        yield batch
+
+
+def _add_bulk(vFilaments, filaments, max_vertices):
+    """Add filaments with one AddFilamentsList call per batch of max_vertices vertices.
+
+    The cFilamentsList structure is taken from one GetFilamentsList call, made
+    before anything is added, so no Ice type has to be imported; it is the same
+    layout _filament_fetch reads. Every batch refills and resends that structure.
+    """
+    vList = vFilaments.GetFilamentsList(filaments[0].time_index)
+    for batch in _batches(filaments, max_vertices):
+        combined, n_points, n_edges = combine_filaments(batch)
+        vList.mNumberOfPointsPerFilament = n_points.tolist()
+        vList.mNumberOfEdgesPerFilament = n_edges.tolist()
+        vList.mPositionsXYZ = combined.positions.tolist()
+        vList.mRadii = combined.radii.tolist()
+        vList.mTypes = combined.types.astype(np.int64).tolist()
+        vList.mEdges = combined.edges.tolist()
+        if hasattr(vList, 'mTimeIndexPerFilament'):
+            vList.mTimeIndexPerFilament = [f.time_index for f in batch]
+        elif any(f.time_index != batch[0].time_index for f in batch):
+            raise ValueError('AddFilamentsList cannot set per-filament time indices')
+        vFilaments.AddFilamentsList(vList)
+
+
+def add_filaments(vFilaments, filaments, use_bulk=True, max_vertices=BULK_MAX_VERTICES):
+    """Append filaments to one Filaments object, all in as few calls as the API allows.
+
+    Uses AddFilamentsList when the connected Imaris provides it and one
+    AddFilament per filament otherwise. The beginning vertex of every added
+    filament is then set to its root.
+    """
+    if not filaments:
+        return
+    first_index = vFilaments.GetNumberOfFilaments()
+    proxy_type = type(vFilaments)
+    added = False
+    if use_bulk and proxy_type not in _bulk_unsupported and hasattr(vFilaments, 'AddFilamentsList'):
+        try:
+            _add_bulk(vFilaments, filaments, max_vertices)
+            added = True
+        except Exception as e:
+            logging.debug(f"Bulk filament add unavailable, using AddFilament: {e}")
+            _bulk_unsupported.add(proxy_type)
+        # Verifies the bulk add, and that a failed one left nothing behind to duplicate
+        expected = first_index + (len(filaments) if added else 0)
+        if vFilaments.GetNumberOfFilaments() != expected:
+            raise RuntimeError('AddFilamentsList did not add the expected number of filaments')
+    if not added:
+        for f in filaments:
+            vFilaments.AddFilament(f.positions.tolist(), f.radii.tolist(), f.types.tolist(),
+                                   f.edges.tolist(), f.time_index)
+    for vFilamentIndex, f in enumerate(filaments, first_index):
+        vFilaments.SetBeginningVertexIndex(vFilamentIndex, f.root)
+
+
+def add_filament_object(vFactory, vParent, filaments, name):
+    """Create a Filaments object holding the trees of one SWC file and add it under vParent."""
+    vFilaments = vFactory.CreateFilaments()
+    for vFilamentIndex, f in enumerate(filaments):
+        vFilaments.AddFilament(f.positions.tolist(), f.radii.tolist(), f.types.tolist(),
+                               f.edges.tolist(), f.time_index)
+        vFilaments.SetBeginningVertexIndex(vFilamentIndex, f.root)
+    # Name the filaments after the file
+    try:
+        vFilaments.SetName(name)
+    except Exception:
+        pass
+    vParent.AddChild(vFilaments, -1)
+    return vFilaments
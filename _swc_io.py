@@ -0,0 +1,412 @@
+# SWC file input/output for the Imaris SWC XTensions
+# Chunked writer producing exactly the text np.savetxt(fmt=SWC_FORMAT) would, without
+# formatting row by row and without stacking all filaments into one array first,
+# and a chunked reader parsing straight into a structured NumPy array.
+
+import datetime
+import io
+import os
+import re
+import warnings
+
+import numpy as np
+
+from _swc_convert import SWC_FORMAT
+
+
+# Comment that starts the nodes of one timepoint in a time-indexed SWC file
+TIME_INDEX_TAG = 'TIME_INDEX'
+
+_TIME_INDEX_LINE = re.compile(rb'^#[ \t]*' + TIME_INDEX_TAG.encode() + rb'[ \t]+(-?\d+)[^\n]*\n?', re.M)
+
+# Rows formatted per `%` call; bounds the temporary text held in memory
+CHUNK_ROWS = 65536
+
+_ROW = SWC_FORMAT + '\n'
+
+
+def make_header(source=None, comments=()):
+    """Standard SWC comment header lines (without the leading '# ')."""
+    lines = ['ORIGINAL_SOURCE Imaris SWC Export XTension']
+    if source:
+        lines.append(f'SOURCE_FILE {source}')
+    lines.append(f'CREATED {datetime.datetime.now().isoformat(timespec="seconds")}')
+    lines.extend(comments)
+    lines.append('id type x y z radius parent')
+    return lines
+
+
+class SWCWriter:
+    """Stream SWC rows to a file.
+
+    Each append() continues the node numbering of the previous one, offsetting
+    ids and parent ids like _swc_convert.combine_swc, so several filaments can be
+    written to one file without building the combined array.
+
+    Args:
+        path: output file path
+        header: optional iterable of comment lines, written as '# <line>'
+    """
+
+    def __init__(self, path, header=None):
+        self._f = open(path, 'wb')
+        self.node_offset = 0
+        self.bytes_written = 0
+        if header:
+            self._write(''.join(f'# {line}\n' for line in header).encode('latin1'))
+
+    def _write(self, data):
+        self._f.write(data)
+        self.bytes_written += len(data)
+
+    def comment(self, line):
+        """Write a '# <line>' comment at the current position."""
+        self._write(f'# {line}\n'.encode('latin1'))
+
+    def append(self, swc):
+        """Write an (N, 7) SWC array, renumbered after the rows already written."""
+        n = swc.shape[0]
+        for start in range(0, n, CHUNK_ROWS):
+            chunk = swc[start:start + CHUNK_ROWS]
+            if self.node_offset:
+                chunk = chunk.copy()
+                chunk[:, 0] += self.node_offset
+                parent_mask = chunk[:, 6] != -1
+                chunk[parent_mask, 6] += self.node_offset
+            self._write(_format_chunk(np.asarray(chunk, dtype=np.float64)))
+        self.node_offset += n
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+_full_chunk_fmt = None
+
+_ZERO, _MINUS, _DOT, _SPACE, _NEWLINE = 0, ord('-'), ord('.'), ord(' '), ord('\n')
+
+# Values at or beyond this magnitude go through the Python formatter
+_MAX_EXACT = 2.0 ** 52
+
+_FRAC_POW10 = (10 ** np.arange(5, -1, -1)).astype(np.uint32)
+
+
+def _format_rows_py(rows):
+    """Reference formatter: one `%` call per chunk, exactly what np.savetxt produces."""
+    global _full_chunk_fmt
+    n = rows.shape[0]
+    if n == CHUNK_ROWS:
+        if _full_chunk_fmt is None:
+            _full_chunk_fmt = _ROW * CHUNK_ROWS
+        fmt = _full_chunk_fmt
+    else:
+        fmt = _ROW * n
+    return fmt % tuple(rows.ravel().tolist())
+
+
+def _digits(v):
+    """(N, w) uint8 ASCII digits of non-negative int64 v, leading zeros as 0 bytes."""
+    vmax = int(v.max()) if v.shape[0] else 0
+    w = len(str(vmax))
+    # 32-bit division is much faster than 64-bit; most SWC values fit
+    dtype = np.uint32 if vmax < 2 ** 32 else np.int64
+    v = v.astype(dtype)
+    pow10 = (10 ** np.arange(w - 1, -1, -1, dtype=np.int64)).astype(dtype)
+    out = ((v[:, None] // pow10) % 10 + ord('0')).astype(np.uint8)
+    if w > 1:
+        n_digits = 1 + (v[:, None] >= pow10[:-1][::-1]).sum(axis=1)
+        out[np.arange(w)[None, :] < (w - n_digits)[:, None]] = _ZERO
+    return out
+
+
+def format_rows(rows):
+    """Format an (N, 7) array as SWC text, identical to np.savetxt with SWC_FORMAT."""
+    return _format_chunk(np.asarray(rows, dtype=np.float64)).decode('latin1')
+
+
+def _format_chunk(rows):
+    """Format an (N, 7) float64 array as SWC bytes.
+
+    Digits are assembled as bytes with NumPy. '%.6f' is correctly rounded, so
+    a value is only formatted this way when x * 1e6 is far enough from a .5
+    boundary that rounding the float product gives the same digits; chunks with
+    such values (or NaN/huge values) use the Python formatter instead.
+    """
+    n = rows.shape[0]
+    if n == 0:
+        return b''
+
+    ints = np.trunc(rows[:, [0, 1, 6]])
+    scaled = rows[:, 2:6] * 1e6
+    with np.errstate(invalid='ignore'):
+        frac = scaled - np.floor(scaled)
+        exact = (np.all(np.abs(ints) < _MAX_EXACT) and np.all(np.abs(scaled) < _MAX_EXACT)
+                 and np.all(np.abs(frac - 0.5) > 2 * np.spacing(np.abs(scaled))))
+    if not exact:
+        return _format_rows_py(rows).encode('latin1')
+
+    ints = ints.astype(np.int64)
+    int_sign = np.where(ints < 0, _MINUS, _ZERO).astype(np.uint8)
+    ints = np.abs(ints)
+    fixed = np.abs(np.rint(scaled).astype(np.int64))
+    float_sign = np.where(np.signbit(rows[:, 2:6]), _MINUS, _ZERO).astype(np.uint8)
+    int_part, frac = np.divmod(fixed, 1000000)
+    frac_digits = ((frac.astype(np.uint32)[:, :, None] // _FRAC_POW10) % 10 + ord('0')).astype(np.uint8)
+
+    space = np.full((n, 1), _SPACE, dtype=np.uint8)
+    dot = np.full((n, 1), _DOT, dtype=np.uint8)
+    fields = [int_sign[:, 0:1], _digits(ints[:, 0]), space,
+              int_sign[:, 1:2], _digits(ints[:, 1]), space]
+    for k in range(4):
+        fields += [float_sign[:, k:k + 1], _digits(int_part[:, k]), dot, frac_digits[:, k], space]
+    fields += [int_sign[:, 2:3], _digits(ints[:, 2]), np.full((n, 1), _NEWLINE, dtype=np.uint8)]
+
+    # Pad bytes are 0 and never occur in the text, so dropping them packs the rows
+    text = np.concatenate(fields, axis=1)
+    return text[text != _ZERO].tobytes()
+
+
+def write_swc(path, swc, header=None):
+    """Write one SWC array to path. Returns the number of bytes written."""
+    with SWCWriter(path, header) as writer:
+        writer.append(swc)
+    return writer.bytes_written
+
+
+# --- Reading ---
+
+# Fields of a parsed SWC node; extra columns in the file are ignored
+SWC_DTYPE = np.dtype([('id', np.int64), ('type', np.int32),
+                      ('x', np.float64), ('y', np.float64), ('z', np.float64),
+                      ('radius', np.float64), ('parent', np.int64)])
+
+# Bytes parsed at a time; chunks are cut at line ends
+CHUNK_BYTES = 16 * 1024 * 1024
+
+# Files at least this large are memory-mapped rather than read by default
+MMAP_THRESHOLD = 256 * 1024 * 1024
+
+_HASH, _TAB, _CR = ord('#'), ord('\t'), ord('\r')
+
+# NumPy 1.23 replaced the Python loadtxt with a C implementation
+_C_LOADTXT = np.lib.NumpyVersion(np.__version__) >= '1.23.0'
+
+
+def _records(cols):
+    out = np.empty(cols.shape[0], dtype=SWC_DTYPE)
+    for k, name in enumerate(SWC_DTYPE.names):
+        out[name] = cols[:, k]
+    return out
+
+
+def _loadtxt(source, dtype=SWC_DTYPE):
+    """np.loadtxt of SWC lines from a path or binary file, or None if a line does not parse.
+
+    Text is decoded as latin-1: any byte is valid in comments, and NumPy's
+    default decoding of binary input is markedly slower.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)  # comments only
+        try:
+            return np.loadtxt(source, dtype=dtype, usecols=range(7), comments='#',
+                              ndmin=1 if dtype is SWC_DTYPE else 2, encoding='latin1')
+        except ValueError:
+            return None
+
+
+def _parse_chunk(data, first_line):
+    """Parse complete SWC lines in `data` (bytes) into a SWC_DTYPE array.
+
+    '#' starts a comment anywhere on a line, blank lines are skipped, spaces,
+    tabs and CR all separate columns, and columns beyond the seventh are ignored.
+    first_line is the 1-based file line number of data's first line (for errors).
+    """
+    if _C_LOADTXT:
+        # NumPy's C tokenizer already handles all of the above when told to use
+        # only the first seven columns; it is the fastest parser available here.
+        nodes = _loadtxt(io.BytesIO(data))
+        if nodes is not None:
+            return nodes
+        # Some tools write ids and parents as floats ('12.0')
+        cols = _loadtxt(io.BytesIO(data), dtype=np.float64)
+        if cols is None:
+            # Short or non-numeric line: the line parser reports it with its line number
+            return _parse_lines_py(data, first_line)
+        return _records(cols)
+    return _parse_chunk_vectorized(data, first_line)
+
+
+def _parse_chunk_vectorized(data, first_line):
+    """_parse_chunk for NumPy < 1.23, whose loadtxt is pure Python.
+
+    Comments and separators are located with array operations and all numbers
+    are converted by a single np.fromstring call.
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if buf.shape[0] == 0:
+        return np.empty(0, dtype=SWC_DTYPE)
+    idx = np.arange(buf.shape[0])
+    newline = buf == _NEWLINE
+
+    # Blank out comments: bytes after the last '#' that follows the last newline
+    hashes = buf == _HASH
+    if hashes.any():
+        last_hash = np.maximum.accumulate(np.where(hashes, idx, -1))
+        last_newline = np.maximum.accumulate(np.where(newline, idx, -1))
+        buf = buf.copy()
+        buf[last_hash > last_newline] = _SPACE
+
+    # Token starts: a non-separator byte preceded by a separator (or the chunk start)
+    sep = (buf == _SPACE) | (buf == _TAB) | (buf == _CR) | newline
+    starts = ~sep
+    starts[1:] &= sep[:-1]
+    line_of_byte = np.cumsum(newline) - newline  # 0-based line within the chunk
+    n_lines = int(line_of_byte[-1]) + 1
+    tokens_per_line = np.bincount(line_of_byte[starts], minlength=n_lines)
+
+    if not tokens_per_line.any():
+        return np.empty(0, dtype=SWC_DTYPE)
+    try:
+        with warnings.catch_warnings():
+            # Older NumPy warns and stops at the first non-numeric token, newer raises
+            warnings.simplefilter('ignore', DeprecationWarning)
+            values = np.fromstring(buf.tobytes(), dtype=np.float64, sep=' ')
+    except ValueError:
+        values = None
+    if values is None or values.shape[0] != tokens_per_line.sum():
+        # Non-numeric text somewhere, e.g. in extra columns: parse line by line
+        return _parse_lines_py(data, first_line)
+
+    data_lines = np.flatnonzero(tokens_per_line)
+    short = tokens_per_line[data_lines] < 7
+    if short.any():
+        line_no = first_line + int(data_lines[np.argmax(short)])
+        raise ValueError(f"SWC line {line_no} has fewer than 7 columns")
+
+    first_token = (np.cumsum(tokens_per_line) - tokens_per_line)[data_lines]
+    return _records(values[first_token[:, None] + np.arange(7)])
+
+
+def _parse_lines_py(data, first_line):
+    """Line-by-line fallback of _parse_chunk, used when some token is not a number."""
+    rows = []
+    for i, line in enumerate(data.split(b'\n')):
+        tokens = line.split(b'#', 1)[0].split()
+        if not tokens:
+            continue
+        if len(tokens) < 7:
+            raise ValueError(f"SWC line {first_line + i} has fewer than 7 columns")
+        try:
+            rows.append([float(t) for t in tokens[:7]])
+        except ValueError:
+            raise ValueError(f"Non-numeric SWC data on line {first_line + i}") from None
+    return _records(np.array(rows).reshape(-1, 7))
+
+
+def _iter_blocks(path, use_mmap=None, chunk_bytes=CHUNK_BYTES):
+    """Yield (bytes, first line number) for successive blocks of whole lines of a file.
+
+    With use_mmap the file is memory-mapped instead of read, so very large
+    files are paged in by the OS as parsing advances. None picks mmap for
+    files of MMAP_THRESHOLD bytes or more. Each block is cut at a line end
+    where it is taken from the file, so no bytes are copied between blocks.
+    """
+    import mmap
+
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if use_mmap is None:
+            use_mmap = size >= MMAP_THRESHOLD
+        line_no = 1
+        if not use_mmap:
+            while True:
+                block = f.read(chunk_bytes)
+                if not block:
+                    break
+                if block[-1] != _NEWLINE:
+                    block += f.readline()  # finish the last line
+                yield block, line_no
+                line_no += block.count(b'\n')
+            return
+        if size == 0:
+            return
+        source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            pos = 0
+            while pos < size:
+                end = pos + chunk_bytes
+                if end < size:
+                    # Back to the last line end, or on to the next for a longer line
+                    end = (source.rfind(b'\n', pos, end) + 1
+                           or source.find(b'\n', end) + 1 or size)
+                else:
+                    end = size
+                block = source[pos:end]
+                yield block, line_no
+                line_no += block.count(b'\n')
+                pos = end
+        finally:
+            source.close()
+
+
+def iter_swc_chunks(path, use_mmap=None, chunk_bytes=CHUNK_BYTES):
+    """Yield SWC_DTYPE arrays for successive blocks of lines of an SWC file (see _iter_blocks)."""
+    for block, line_no in _iter_blocks(path, use_mmap, chunk_bytes):
+        yield _parse_chunk(block, line_no)
+
+
+def _join(chunks):
+    if not chunks:
+        return np.empty(0, dtype=SWC_DTYPE)
+    return chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+
+
+def read_swc(path, use_mmap=None, chunk_bytes=CHUNK_BYTES):
+    """Read an SWC file into a structured array with fields id, type, x, y, z, radius, parent.
+
+    Files below MMAP_THRESHOLD are parsed by a single np.loadtxt call; larger
+    ones (or with use_mmap) block by block, as iter_swc_chunks yields them.
+    """
+    if _C_LOADTXT and not use_mmap and os.path.getsize(path) < MMAP_THRESHOLD:
+        nodes = _loadtxt(path)
+        if nodes is not None:
+            return nodes
+        # Float ids or a bad line: the block parser handles and reports them
+    return _join(list(iter_swc_chunks(path, use_mmap, chunk_bytes)))
+
+
+def read_swc_timepoints(path, use_mmap=None, chunk_bytes=CHUNK_BYTES):
+    """Read an SWC file written with TIME_INDEX sections.
+
+    Returns a list of (time_index, SWC_DTYPE array), one per section in file
+    order. Nodes before the first section (or in a file without sections)
+    belong to time index 0. The file is parsed block by block like read_swc,
+    with each block split at the TIME_INDEX comments it contains.
+    """
+    sections = []
+    time_index, chunks, marked = 0, [], False
+    for block, line_no in _iter_blocks(path, use_mmap, chunk_bytes):
+        start = counted = 0
+        for m in _TIME_INDEX_LINE.finditer(block):
+            line_no += block.count(b'\n', counted, start)
+            counted = start
+            if m.start() > start:
+                chunks.append(_parse_chunk(block[start:m.start()], line_no))
+            nodes = _join(chunks)
+            if nodes.shape[0] or marked:
+                sections.append((time_index, nodes))
+            time_index, chunks, marked = int(m.group(1)), [], True
+            start = m.end()
+        if start < len(block):
+            line_no += block.count(b'\n', counted, start)
+            chunks.append(_parse_chunk(block[start:], line_no))
+    nodes = _join(chunks)
+    if nodes.shape[0] or marked or not sections:
+        sections.append((time_index, nodes))
+    return sections
@@ -2,6 +2,9 @@
 # This file provides compatibility functions for the IOF-PyImaris plugin system
 
 import functools
+import importlib
+import logging
+import sys
 import traceback
 import time
 
@@ -37,11 +40,10 @@ def getImaris(aImarisId):
             - scene: Surpass scene object
     """
     try:
-        import ImarisLib
+        import _imaris_pool
         
-        # Connect to Imaris
-        vImarisLib = ImarisLib.ImarisLib()
-        vImaris = vImarisLib.GetApplication(aImarisId)
+        # Connect to Imaris (shared, health-checked connection)
+        vImaris = _imaris_pool.get_application(aImarisId)
         
         if vImaris is None:
             raise RuntimeError("Could not connect to Imaris. Make sure Imaris is running.")
@@ -68,3 +70,59 @@ def getImaris(aImarisId):
         print(f"Error connecting to Imaris: {str(e)}")
         time.sleep(4)
         raise
+
+
+class _LazyModule:
+    """Stand-in for a module that imports it on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            # import_module holds the import lock, so threads racing here are safe
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        return f"<lazy module '{self._name}'{' (loaded)' if self._module is not None else ''}>"
+
+
+def lazy_import(name):
+    """
+    Module `name`, imported on first attribute access instead of now.
+    Lets the XTension modules start (and show their first dialog) without
+    loading numpy and the helper modules until a code path needs them.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return _LazyModule(name)
+
+
+_logging_targets = set()
+
+
+def setup_logging(log_file=None, console_level=logging.INFO,
+                  file_format='%(asctime)s - %(levelname)s - %(message)s',
+                  console_format='%(asctime)s - %(levelname)s - %(message)s'):
+    """
+    Configure the root logger when a tool first needs it, instead of at import.
+    Adds a console handler once per process and a DEBUG file handler once per
+    log_file, so every entry point can call it.
+    """
+    root = logging.getLogger()
+    root.setLevel(logging.DEBUG)
+    if 'console' not in _logging_targets:
+        _logging_targets.add('console')
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(console_level)
+        console_handler.setFormatter(logging.Formatter(console_format))
+        root.addHandler(console_handler)
+    if log_file and log_file not in _logging_targets:
+        _logging_targets.add(log_file)
+        file_handler = logging.FileHandler(log_file, mode='a')
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(logging.Formatter(file_format))
+        root.addHandler(file_handler)
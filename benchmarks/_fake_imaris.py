@@ -0,0 +1,254 @@
+# In-process stand-in for ImarisLib and the Imaris objects the XTensions use
+# Lets the export and import tools run on a machine without Imaris. Settings come from
+# environment variables so spawned worker processes see the same fake:
+#
+#   FAKE_IMARIS_LOAD_SEC     simulated FileOpen time per dataset   (default 0.2)
+#   FAKE_IMARIS_LATENCY_MS   simulated Ice round-trip per call      (default 0)
+#   FAKE_IMARIS_FILAMENTS    filaments in each opened dataset       (default 3)
+#   FAKE_IMARIS_VERTICES     vertices per filament                  (default 2000)
+#   FAKE_IMARIS_BRANCH_PROB  chance that a vertex starts a branch    (default 0.01)
+#   FAKE_IMARIS_TIME_POINTS  filaments are spread over this many    (default 1)
+#                            time indices
+#   FAKE_IMARIS_OBJECTS      Filaments objects in each scene; extra  (default 1)
+#                            ones ('Filaments 2', ...) sit in a 'Traced' folder
+#   FAKE_IMARIS_ASYNC_LOAD   1: FileOpen returns at once and the     (default 0)
+#                            previous dataset stays visible until the load time
+#                            has passed, like a non-blocking open
+#   FAKE_IMARIS_CONNECT_MS   simulated Ice client setup per ImarisLib (default 0)
+#   FAKE_IMARIS_REUSE_DATASET 1: GetCurrentFileName is unavailable  (default 0)
+#                            and every load refills the same DataSet proxy
+#   FAKE_IMARIS_STAGE_SHIFT  1: each file's extents start at its own (default 0)
+#                            stage position instead of the origin
+
+import os
+import sys
+import time
+import zlib
+from types import SimpleNamespace
+
+import numpy as np
+
+from _synthetic import random_filament
+
+
+def _setting(name, default):
+    return type(default)(os.environ.get(name, default))
+
+
+# Calls made on fake proxies in this process, for RPC-count benchmarks
+rpc_calls = 0
+
+
+def _rpc():
+    global rpc_calls
+    rpc_calls += 1
+    latency = _setting('FAKE_IMARIS_LATENCY_MS', 0.0)
+    if latency:
+        time.sleep(latency / 1000.0)
+
+
+class FakeDataSet:
+    def __init__(self, extent_min=(0.0, 0.0, 0.0), extent_max=(500.0, 500.0, 100.0), size=(1024, 1024, 200)):
+        self._min = extent_min
+        self._max = extent_max
+        self._size = size
+
+    def GetExtendMinX(self): _rpc(); return self._min[0]
+    def GetExtendMinY(self): _rpc(); return self._min[1]
+    def GetExtendMinZ(self): _rpc(); return self._min[2]
+    def GetExtendMaxX(self): _rpc(); return self._max[0]
+    def GetExtendMaxY(self): _rpc(); return self._max[1]
+    def GetExtendMaxZ(self): _rpc(); return self._max[2]
+    def GetSizeX(self): _rpc(); return self._size[0]
+    def GetSizeY(self): _rpc(); return self._size[1]
+    def GetSizeZ(self): _rpc(); return self._size[2]
+
+
+class FakeFilaments:
+    def __init__(self, filaments=(), name='Filaments 1'):
+        self._filaments = list(filaments)
+        self._name = name
+        self._time_indices = [0] * len(self._filaments)
+        self._beginning = {}
+
+    def GetName(self): _rpc(); return self._name
+    def SetName(self, name): _rpc(); self._name = name
+    def GetNumberOfFilaments(self): _rpc(); return len(self._filaments)
+    def GetPositionsXYZ(self, i): _rpc(); return self._filaments[i][0].tolist()
+    def GetRadii(self, i): _rpc(); return self._filaments[i][1].tolist()
+    def GetTypes(self, i): _rpc(); return self._filaments[i][2].tolist()
+    def GetEdges(self, i): _rpc(); return self._filaments[i][3].tolist()
+    def GetTimeIndex(self, i): _rpc(); return self._time_indices[i]
+
+    def AddFilament(self, positions, radii, types, edges, time_index):
+        _rpc()
+        self._filaments.append((np.asarray(positions, dtype=float).reshape(-1, 3),
+                                np.asarray(radii, dtype=float), np.asarray(types, dtype=int),
+                                np.asarray(edges, dtype=int).reshape(-1, 2)))
+        self._time_indices.append(time_index)
+
+    def SetBeginningVertexIndex(self, i, vertex): _rpc(); self._beginning[i] = vertex
+    def GetBeginningVertexIndex(self, i): _rpc(); return self._beginning.get(i, 0)
+
+    # cFilamentsList: per-vertex and per-edge arrays of all filaments concatenated,
+    # split by the per-filament counts; mEdges indexes each filament's own vertices
+    # (as GetEdges and AddFilament do), in both GetFilamentsList and AddFilamentsList
+    def GetFilamentsList(self, time_index):
+        _rpc()
+        f = [x for x, t in zip(self._filaments, self._time_indices) if time_index in (-1, t)]
+        cat = lambda k: np.concatenate([x[k] for x in f]).tolist() if f else []
+        return SimpleNamespace(
+            mNumberOfPointsPerFilament=[len(x[0]) for x in f],
+            mNumberOfEdgesPerFilament=[len(x[3]) for x in f],
+            mTimeIndexPerFilament=[t for t in self._time_indices if time_index in (-1, t)],
+            mPositionsXYZ=cat(0), mRadii=cat(1), mTypes=cat(2), mEdges=cat(3))
+
+    def AddFilamentsList(self, vList):
+        _rpc()
+        n_points = np.asarray(vList.mNumberOfPointsPerFilament, dtype=np.int64)
+        n_edges = np.asarray(vList.mNumberOfEdgesPerFilament, dtype=np.int64)
+        point_start = np.concatenate(([0], np.cumsum(n_points)))
+        edge_start = np.concatenate(([0], np.cumsum(n_edges)))
+        positions = np.asarray(vList.mPositionsXYZ, dtype=float).reshape(-1, 3)
+        radii = np.asarray(vList.mRadii, dtype=float)
+        types = np.asarray(vList.mTypes, dtype=int)
+        edges = np.asarray(vList.mEdges, dtype=int).reshape(-1, 2)
+        added = []
+        for i in range(n_points.shape[0]):
+            p0, p1 = point_start[i], point_start[i + 1]
+            e = edges[edge_start[i]:edge_start[i + 1]]
+            if e.size and (e.min() < 0 or e.max() >= p1 - p0):
+                raise ValueError(f"filament {i}: edge index out of range of its {p1 - p0} vertices")
+            added.append((positions[p0:p1], radii[p0:p1], types[p0:p1], e))
+        self._filaments.extend(added)
+        self._time_indices.extend(vList.mTimeIndexPerFilament[:len(added)])
+
+
+class FakeDataContainer:
+    def __init__(self, children=(), name='Surpass Scene'):
+        self._children = list(children)
+        self._name = name
+
+    def GetName(self): _rpc(); return self._name
+    def SetName(self, name): _rpc(); self._name = name
+
+    def GetNumberOfChildren(self): _rpc(); return len(self._children)
+    def GetChild(self, i): _rpc(); return self._children[i]
+    def AddChild(self, child, position): _rpc(); self._children.append(child)
+
+
+class FakeFactory:
+    def ToFilaments(self, obj):
+        _rpc()
+        return obj if isinstance(obj, FakeFilaments) else None
+
+    def ToDataContainer(self, obj):
+        _rpc()
+        return obj if isinstance(obj, FakeDataContainer) else None
+
+    def CreateFilaments(self): _rpc(); return FakeFilaments()
+    def CreateDataContainer(self): _rpc(); return FakeDataContainer(name='Folder')
+
+
+class FakeApplication:
+    def __init__(self):
+        self._dataset = None
+        self._scene = None
+        self._selection = None
+        self._file_name = ''
+        self._loading = None  # (path, time the asynchronous load completes)
+
+    def _poll_load(self):
+        if self._loading is not None and time.perf_counter() >= self._loading[1]:
+            path, _ready_at = self._loading
+            self._loading = None
+            self._load(path)
+
+    def GetVersion(self): _rpc(); return 'Fake Imaris 10.0'
+    def GetFactory(self): _rpc(); return FakeFactory()
+    def GetDataSet(self): _rpc(); self._poll_load(); return self._dataset
+    def GetSurpassScene(self): _rpc(); self._poll_load(); return self._scene
+    def GetSurpassSelection(self): _rpc(); self._poll_load(); return self._selection
+
+    def GetCurrentFileName(self):
+        _rpc()
+        if _setting('FAKE_IMARIS_REUSE_DATASET', 0):
+            raise AttributeError('GetCurrentFileName')
+        self._poll_load()
+        return self._file_name
+
+    def FileOpen(self, path, options):
+        """Simulate loading a dataset; filaments are seeded from the file path."""
+        _rpc()
+        load_sec = _setting('FAKE_IMARIS_LOAD_SEC', 0.2)
+        if _setting('FAKE_IMARIS_ASYNC_LOAD', 0):
+            self._loading = (path, time.perf_counter() + load_sec)
+            return
+        if not _setting('FAKE_IMARIS_REUSE_DATASET', 0):
+            self._dataset = None
+        time.sleep(load_sec)
+        self._load(path)
+
+    def _load(self, path):
+        seed = zlib.crc32(os.path.abspath(path).encode())
+        n_vertices = _setting('FAKE_IMARIS_VERTICES', 2000)
+        branch_prob = _setting('FAKE_IMARIS_BRANCH_PROB', 0.01)
+        filaments = [random_filament(n_vertices, branch_prob, seed=seed + k)
+                     for k in range(_setting('FAKE_IMARIS_FILAMENTS', 3))]
+        self._selection = FakeFilaments(filaments, name=os.path.basename(path))
+        n_times = _setting('FAKE_IMARIS_TIME_POINTS', 1)
+        self._selection._time_indices = [k % n_times for k in range(len(filaments))]
+        extra = [FakeFilaments(filaments, name=f'Filaments {k}')
+                 for k in range(2, _setting('FAKE_IMARIS_OBJECTS', 1) + 1)]
+        children = [self._selection] + ([FakeDataContainer(extra, name='Traced')] if extra else [])
+        self._scene = FakeDataContainer([FakeDataContainer(children, name='Folder')])
+        extent_min = np.zeros(3)
+        if _setting('FAKE_IMARIS_STAGE_SHIFT', 0):
+            extent_min = np.array([seed % 1000, seed // 1000 % 1000, 0.0])
+        geometry = (tuple(extent_min), tuple(extent_min + (500.0, 500.0, 100.0)), (1024, 1024, 200))
+        if _setting('FAKE_IMARIS_REUSE_DATASET', 0) and self._dataset is not None:
+            self._dataset.__init__(*geometry)
+        else:
+            self._dataset = FakeDataSet(*geometry)
+        self._file_name = os.path.abspath(path)
+
+    def NewScene(self):
+        """Empty scene on a default dataset, for running the import tools."""
+        self._dataset = FakeDataSet()
+        self._selection = None
+        self._scene = FakeDataContainer()
+
+
+class ImarisLib:
+    """Drop-in for ImarisLib.ImarisLib; one fake application per (endpoints, id)."""
+
+    _applications = {}
+
+    def __init__(self):
+        self._mEndPoints = 'default -p 4029'
+        self._connected = False
+
+    def Disconnect(self):
+        self._connected = False
+
+    def SetEndPoints(self, aEndPoints):
+        self.Disconnect()
+        self._mEndPoints = aEndPoints
+
+    def GetServer(self):
+        if not self._connected:
+            time.sleep(_setting('FAKE_IMARIS_CONNECT_MS', 0.0) / 1000.0)
+            self._connected = True
+        return self
+
+    def GetApplication(self, aImarisId):
+        self.GetServer()
+        key = (self._mEndPoints, aImarisId)
+        if key not in self._applications:
+            self._applications[key] = FakeApplication()
+        return self._applications[key]
+
+
+def install():
+    """Register this module as `ImarisLib` so the XTensions import the fake."""
+    sys.modules['ImarisLib'] = sys.modules[__name__]
@@ -0,0 +1,51 @@
+# Synthetic neuron-like filaments for the benchmarks
+# Trees are mostly long unbranched runs with occasional branch points, like traced
+# dendrites, and vertex indices are shuffled the way Imaris edits tend to leave them.
+
+import os
+import sys
+
+import numpy as np
+
+# Make the XTension modules importable when running from benchmarks/
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def random_filament(n, branch_prob=0.01, seed=0, shuffle=True):
+    """Return (positions, radii, types, edges) for a random tree of n vertices."""
+    rng = np.random.default_rng(seed)
+    parent = np.arange(-1, n - 1)
+    if n > 1:
+        branch = rng.random(n) < branch_prob
+        branch[0] = False
+        idx = np.flatnonzero(branch)
+        parent[idx] = (rng.random(idx.shape[0]) * idx).astype(np.int64)
+
+    steps = rng.normal(scale=1.0, size=(n, 3))
+    positions = np.zeros((n, 3))
+    for i in range(1, n):
+        positions[i] = positions[parent[i]] + steps[i]
+    positions += 100.0
+    radii = rng.uniform(0.2, 3.0, size=n)
+    types = np.zeros(n, dtype=np.int64)
+
+    child = np.arange(1, n)
+    edges = np.stack([parent[1:], child], axis=1)
+    flip = rng.random(edges.shape[0]) < 0.5
+    edges[flip] = edges[flip, ::-1]
+
+    if shuffle and n > 1:
+        perm = rng.permutation(n)
+        positions = positions[np.argsort(perm)]
+        radii = radii[np.argsort(perm)]
+        edges = perm[edges]
+        edges = edges[rng.permutation(edges.shape[0])]
+
+    return positions, radii, types, edges
+
+
+def as_imaris_lists(positions, radii, types, edges):
+    """Convert arrays to the nested Python lists returned over the Ice proxy."""
+    return positions.tolist(), radii.tolist(), types.tolist(), edges.tolist()
@@ -0,0 +1,58 @@
+"""Benchmark Imaris connection setup: a new ImarisLib client per call vs _imaris_pool.
+
+Scripted runs call the XTension entry points in a loop, and each call used to
+build its own ImarisLib client. This connects `--calls` times against the fake
+Imaris with a simulated client setup and Ice latency, once with fresh clients
+and once through the pool, with and without idle health checks.
+
+    python benchmarks/bench_connect.py --calls 50 --connect-ms 30 --latency-ms 0.5
+"""
+
+import argparse
+import os
+import time
+
+import _fake_imaris
+import _synthetic  # noqa: F401  (puts the repo root on sys.path)
+
+import _imaris_pool
+
+
+def _fresh(aImarisId):
+    vImarisLib = _fake_imaris.ImarisLib()
+    vImaris = vImarisLib.GetApplication(aImarisId)
+    vImaris.GetVersion()
+    vImarisLib.Disconnect()
+
+
+def _pooled(aImarisId):
+    _imaris_pool.get_application(aImarisId).GetVersion()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=50)
+    parser.add_argument('--connect-ms', type=float, default=30.0, help='simulated client setup')
+    parser.add_argument('--latency-ms', type=float, default=0.5, help='simulated Ice round-trip')
+    args = parser.parse_args()
+    os.environ['FAKE_IMARIS_CONNECT_MS'] = str(args.connect_ms)
+    os.environ['FAKE_IMARIS_LATENCY_MS'] = str(args.latency_ms)
+    _fake_imaris.install()
+
+    print(f"{args.calls} connections, {args.connect_ms} ms client setup, {args.latency_ms} ms per call")
+    print(f"{'client':>22} {'ms/call':>8}")
+    runs = [('new ImarisLib per call', _fresh, None),
+            ('pool', _pooled, _imaris_pool.HEALTH_CHECK_IDLE_SEC),
+            ('pool, check every call', _pooled, 0.0)]
+    for name, connect, idle in runs:
+        if idle is not None:
+            _imaris_pool.disconnect_all()
+            _imaris_pool.HEALTH_CHECK_IDLE_SEC = idle
+        t0 = time.perf_counter()
+        for _ in range(args.calls):
+            connect(0)
+        print(f"{name:>22} {(time.perf_counter() - t0) * 1000 / args.calls:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark filament -> SWC conversion: legacy per-vertex BFS vs _swc_convert.
+
+Checks that both produce byte-identical SWC text and reports the speedup.
+
+    python benchmarks/bench_convert.py                 # 10k, 100k, 1M vertices
+    python benchmarks/bench_convert.py --sizes 10000 --legacy-max 100000
+"""
+
+import argparse
+import io
+import time
+
+import numpy as np
+
+from _synthetic import random_filament, as_imaris_lists
+
+from _coord_transform import CoordinateTransform
+import _swc_convert
+
+
+def legacy_filament_to_swc(vFilamentsXYZ, vFilamentsRadius, vFilamentsTypes, vFilamentsEdges,
+                           pixel_offset, pixel_scale):
+    """The per-vertex BFS from ExportSWC_Batch.py before the vectorised engine."""
+    N = len(vFilamentsXYZ)
+    adj = [[] for _ in range(N)]
+    for p1, p2 in vFilamentsEdges:
+        if 0 <= p1 < N and 0 <= p2 < N:
+            adj[p1].append(p2)
+            adj[p2].append(p1)
+
+    swc_lines = np.zeros((N, 7))
+    visited = np.zeros(N, dtype=bool)
+    swc_idx_counter = 1
+    nodes_processed = 0
+    for start_node_idx in range(N):
+        if not visited[start_node_idx]:
+            queue = [(start_node_idx, -1)]
+            visited[start_node_idx] = True
+            while queue:
+                cur_imaris_idx, current_swc_parent_idx = queue.pop(0)
+                current_swc_idx = swc_idx_counter
+                swc_idx_counter += 1
+                pos = np.array(vFilamentsXYZ[cur_imaris_idx]) - pixel_offset
+                scaled_pos = pos * pixel_scale
+                radius = vFilamentsRadius[cur_imaris_idx]
+                node_type = (
+                    vFilamentsTypes[cur_imaris_idx]
+                    if vFilamentsTypes and cur_imaris_idx < len(vFilamentsTypes)
+                    else 3
+                )
+                swc_lines[nodes_processed] = [
+                    current_swc_idx, node_type,
+                    scaled_pos[0], scaled_pos[1], scaled_pos[2],
+                    radius, current_swc_parent_idx
+                ]
+                nodes_processed += 1
+                for neighbor_imaris_idx in adj[cur_imaris_idx]:
+                    if not visited[neighbor_imaris_idx]:
+                        visited[neighbor_imaris_idx] = True
+                        queue.append((neighbor_imaris_idx, current_swc_idx))
+    return swc_lines[:nodes_processed]
+
+
+def _as_text(swc):
+    buf = io.BytesIO()
+    np.savetxt(buf, swc, fmt=_swc_convert.SWC_FORMAT, delimiter=' ')
+    return buf.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--legacy-max', type=int, default=1_000_000,
+                        help='skip the legacy implementation above this many vertices')
+    parser.add_argument('--branch-prob', type=float, default=0.01)
+    args = parser.parse_args()
+
+    pixel_offset = np.array([12.5, -3.0, 40.0])
+    pixel_scale = np.array([2.0, 2.0, -0.5])
+    transform = CoordinateTransform(pixel_offset, pixel_scale)
+
+    print(f"{'vertices':>10} {'legacy s':>10} {'vector s':>10} {'speedup':>8}  identical")
+    for n in args.sizes:
+        xyz, radii, types, edges = as_imaris_lists(*random_filament(n, args.branch_prob, seed=n))
+
+        t0 = time.perf_counter()
+        new, _ = _swc_convert.filament_to_swc(xyz, radii, types, edges, transform)
+        t_new = time.perf_counter() - t0
+
+        if n <= args.legacy_max:
+            t0 = time.perf_counter()
+            old = legacy_filament_to_swc(xyz, radii, types, edges, pixel_offset, pixel_scale)
+            t_old = time.perf_counter() - t0
+            same = _as_text(old) == _as_text(new)
+            print(f"{n:>10} {t_old:>10.3f} {t_new:>10.3f} {t_old / t_new:>7.1f}x  {same}")
+        else:
+            print(f"{n:>10} {'-':>10} {t_new:>10.3f} {'-':>8}  -")
+
+
+if __name__ == '__main__':
+    main()
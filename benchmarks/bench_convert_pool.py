@@ -0,0 +1,68 @@
+"""Benchmark parallel per-filament conversion with 1..N worker processes.
+
+Converts one synthetic multi-filament object with _convert_filaments of the
+exporter at each CONVERT_WORKERS setting, checks every result equals the
+single-core one and reports the speedup. The pool start-up (paid once per
+session) is reported separately from the warm conversion time.
+
+    python benchmarks/bench_convert_pool.py --filaments 32 --vertices 50000 --workers 1 2 4 8
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from _synthetic import random_filament
+
+import _convert_pool
+import _filament_fetch
+import ExportSWC_Batch as exporter
+from _coord_transform import CoordinateTransform
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filaments', type=int, default=32)
+    parser.add_argument('--vertices', type=int, default=50000, help='vertices per filament')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    transform = CoordinateTransform(np.array([12.5, -3.0, 40.0]), np.array([2.0, 2.0, -0.5]))
+    rng = np.random.default_rng(0)
+    filament_data = []
+    for k in range(args.filaments):
+        # Uneven sizes, like real objects: between a quarter and twice the mean
+        n = int(args.vertices * rng.uniform(0.25, 2.0))
+        filament_data.append(_filament_fetch.FilamentData(*random_filament(n, seed=k)))
+    fetched = (transform, filament_data)
+    n_vertices = sum(len(f.positions) for f in filament_data)
+    _convert_pool.PARALLEL_MIN_VERTICES = 0
+
+    print(f"{args.filaments} filaments, {n_vertices} vertices")
+    print(f"{'workers':>7} {'start s':>8} {'convert s':>10} {'speedup':>8}  identical")
+    reference = None
+    baseline = None
+    for workers in args.workers:
+        exporter.CONVERT_WORKERS = workers
+        t0 = time.perf_counter()
+        converted = exporter._convert_filaments(fetched)  # also starts the pool
+        start = time.perf_counter() - t0
+        best = None
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            converted = exporter._convert_filaments(fetched)
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+        if reference is None:
+            reference, baseline = converted, best
+        same = (len(converted) == len(reference) and
+                all(a[0] == b[0] and np.array_equal(a[2], b[2]) for a, b in zip(converted, reference)))
+        start_cost = max(0.0, start - best) if workers > 1 else 0.0
+        print(f"{workers:>7} {start_cost:>8.2f} {best:>10.3f} {baseline / best:>7.2f}x  {same}")
+    _convert_pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
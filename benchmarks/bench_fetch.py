@@ -0,0 +1,107 @@
+"""Benchmark filament retrieval: per-index getters vs one bulk GetFilamentsList call.
+
+A mock Filaments proxy counts RPCs and sleeps for an injected latency per call,
+standing in for the Ice round-trip to Imaris. The 'bulk+root' row adds the
+GetBeginningVertexIndex call per filament that SWC_ROOT = 'beginning' costs.
+
+    python benchmarks/bench_fetch.py --filaments 100 1000 --latency-ms 1
+"""
+
+import argparse
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from _synthetic import random_filament
+
+import _filament_fetch
+
+
+class MockFilaments:
+    """Filaments proxy stand-in with an RPC counter and per-call latency."""
+
+    def __init__(self, filaments, latency_sec=0.0):
+        self._filaments = filaments
+        self._latency = latency_sec
+        self.calls = 0
+
+    def _rpc(self):
+        self.calls += 1
+        if self._latency:
+            time.sleep(self._latency)
+
+    def GetNumberOfFilaments(self):
+        self._rpc()
+        return len(self._filaments)
+
+    def GetPositionsXYZ(self, i):
+        self._rpc()
+        return self._filaments[i][0].tolist()
+
+    def GetRadii(self, i):
+        self._rpc()
+        return self._filaments[i][1].tolist()
+
+    def GetTypes(self, i):
+        self._rpc()
+        return self._filaments[i][2].tolist()
+
+    def GetEdges(self, i):
+        self._rpc()
+        return self._filaments[i][3].tolist()
+
+    def GetBeginningVertexIndex(self, i):
+        self._rpc()
+        return 0
+
+    def GetFilamentsList(self, aTimeIndex):
+        self._rpc()
+        f = self._filaments
+        return SimpleNamespace(
+            mNumberOfPointsPerFilament=[len(x[0]) for x in f],
+            mNumberOfEdgesPerFilament=[len(x[3]) for x in f],
+            mPositionsXYZ=np.concatenate([x[0] for x in f]).tolist(),
+            mRadii=np.concatenate([x[1] for x in f]).tolist(),
+            mTypes=np.concatenate([x[2] for x in f]).tolist(),
+            mEdges=np.concatenate([x[3] for x in f]).tolist(),
+        )
+
+
+class _NoBulk(MockFilaments):
+    """Proxy of an Imaris version without GetFilamentsList."""
+
+    def __getattribute__(self, name):
+        if name == 'GetFilamentsList':
+            raise AttributeError(name)
+        return object.__getattribute__(self, name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filaments', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--vertices', type=int, default=200, help='vertices per filament')
+    parser.add_argument('--latency-ms', type=float, default=1.0, help='injected latency per RPC')
+    args = parser.parse_args()
+
+    print(f"{'filaments':>10} {'mode':>10} {'RPCs':>8} {'seconds':>9}")
+    for count in args.filaments:
+        filaments = [random_filament(args.vertices, seed=i) for i in range(count)]
+        results = {}
+        for mode, cls, with_root in (('per-index', _NoBulk, False), ('bulk', MockFilaments, False),
+                                     ('bulk+root', MockFilaments, True)):
+            _filament_fetch._bulk_unsupported.clear()
+            proxy = cls(filaments, latency_sec=args.latency_ms / 1000.0)
+            t0 = time.perf_counter()
+            data = _filament_fetch.fetch_filaments(proxy, with_root=with_root)
+            elapsed = time.perf_counter() - t0
+            results[mode] = data
+            print(f"{count:>10} {mode:>10} {proxy.calls:>8} {elapsed:>9.3f}")
+
+        for a, b in zip(results['per-index'], results['bulk']):
+            assert np.array_equal(np.asarray(a.positions), b.positions)
+            assert np.array_equal(np.asarray(a.edges).reshape(-1, 2), b.edges)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark importing many SWC files: one Filaments object per file vs one bulk object.
+
+Runs the import helpers against the fake Imaris with an injected per-call
+latency, counts the calls and checks both modes hold the same filaments.
+
+    python benchmarks/bench_import.py --files 100 1000 --latency-ms 1
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+import _fake_imaris
+from _synthetic import random_filament
+
+import _swc_import
+
+
+def _filaments(count, vertices):
+    result = []
+    for k in range(count):
+        positions, radii, types, edges = random_filament(vertices, seed=k)
+        result.append(_swc_import.ImportedFilament(positions, radii, types.astype(float), edges, 0))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--vertices', type=int, default=500, help='vertices per SWC file')
+    parser.add_argument('--latency-ms', type=float, default=1.0, help='injected latency per call')
+    args = parser.parse_args()
+    os.environ['FAKE_IMARIS_LATENCY_MS'] = str(args.latency_ms)
+
+    print(f"{'files':>7} {'mode':>24} {'calls':>7} {'seconds':>9}")
+    for count in args.files:
+        filaments = _filaments(count, args.vertices)
+        imported = {}
+        for mode in ('object per file', 'one object, AddFilament', 'one object, bulk'):
+            _swc_import._bulk_unsupported.clear()
+            vFactory = _fake_imaris.FakeFactory()
+            vScene = _fake_imaris.FakeDataContainer()
+            _fake_imaris.rpc_calls = 0
+            t0 = time.perf_counter()
+            if mode == 'object per file':
+                for k, f in enumerate(filaments):
+                    _swc_import.add_filament_object(vFactory, vScene, [f], f'n{k}.swc')
+                stored = [x for child in vScene._children for x in child._filaments]
+            else:
+                vFilaments = vFactory.CreateFilaments()
+                _swc_import.add_filaments(vFilaments, filaments, use_bulk=mode.endswith('bulk'))
+                vFilaments.SetName('bulk')
+                vScene.AddChild(vFilaments, -1)
+                stored = vFilaments._filaments
+            elapsed = time.perf_counter() - t0
+            imported[mode] = stored
+            print(f"{count:>7} {mode:>24} {_fake_imaris.rpc_calls:>7} {elapsed:>9.3f}")
+
+        reference = imported['object per file']
+        for stored in imported.values():
+            assert len(stored) == len(reference)
+            for a, b in zip(reference, stored):
+                assert np.array_equal(a[0], b[0]) and np.array_equal(a[3], b[3])
+
+
+if __name__ == '__main__':
+    main()
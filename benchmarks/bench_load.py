@@ -0,0 +1,121 @@
+"""Benchmark waiting for datasets after FileOpen: fixed polling vs _dataset_ready.
+
+Opens placeholder files in the fake Imaris with a non-blocking FileOpen, so the
+previous dataset stays visible while the next one loads. The old wait (poll
+GetDataSet every 0.5 s) returns on that stale dataset; the same interval with
+the new readiness check shows the cost of fixed polling, and
+_dataset_ready.open_file waits with its millisecond-range backoff. Reports the
+time spent past the simulated loads, how many waits returned before the file
+was loaded, and the Imaris calls made while waiting.
+
+A second table runs _dataset_ready.open_file against an Imaris without
+GetCurrentFileName that refills one DataSet proxy on every load: files at
+different stage positions (readiness seen from the extents) and files of
+identical geometry, which can't be confirmed and are reported 'unconfirmed'
+after STABLE_SEC instead of being read. Last, small files are opened after
+large ones, to check their wait does not depend on the earlier loads.
+
+    python benchmarks/bench_load.py --files 20 --load-sec 0.05 0.3
+"""
+
+import argparse
+import os
+import random
+import time
+
+import _fake_imaris
+import _synthetic  # noqa: F401  (puts the repo root on sys.path)
+
+import _dataset_ready
+
+
+def _fixed_open(vImaris, path, confirm, timeout_sec=120.0, poll_sec=0.5):
+    """FileOpen followed by the former fixed-interval wait, for any dataset or
+    (with confirm) for the readiness check of _dataset_ready."""
+    readiness = _dataset_ready._Readiness(vImaris, path)
+    readiness.open(vImaris)
+    start = time.time()
+    while time.time() - start < timeout_sec:
+        if confirm:
+            if readiness.check(vImaris):
+                return True
+        elif vImaris.GetDataSet() is not None:
+            return True
+        time.sleep(poll_sec)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=20)
+    parser.add_argument('--load-sec', type=float, nargs=2, default=[0.05, 0.3],
+                        help='range of simulated load times')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    os.environ['FAKE_IMARIS_ASYNC_LOAD'] = '1'
+    os.environ['FAKE_IMARIS_VERTICES'] = '10'
+
+    rng = random.Random(args.seed)
+    loads = [rng.uniform(*args.load_sec) for _ in range(args.files)]
+    paths = [os.path.abspath(f"cell_{i:04d}.ims") for i in range(args.files)]
+
+    print(f"{args.files} files, load {args.load_sec[0]}-{args.load_sec[1]} s "
+          f"(total {sum(loads):.2f} s)")
+    print(f"{'wait':>16} {'seconds':>8} {'dead s':>7} {'stale':>6} {'calls':>6}")
+    for name in ('fixed 0.5 s', 'fixed, checked', '_dataset_ready'):
+        app = _fake_imaris.FakeApplication()
+        stale = calls = 0
+        t0 = time.perf_counter()
+        for path, load_sec in zip(paths, loads):
+            os.environ['FAKE_IMARIS_LOAD_SEC'] = str(load_sec)
+            before = _fake_imaris.rpc_calls
+            if name == '_dataset_ready':
+                _dataset_ready.open_file(app, path)
+            else:
+                _fixed_open(app, path, confirm=name == 'fixed, checked')
+            calls += _fake_imaris.rpc_calls - before
+            if app._loading is not None:
+                # Returned on the previous dataset; let the load finish
+                stale += 1
+                time.sleep(max(0.0, app._loading[1] - time.perf_counter()))
+                app.GetDataSet()
+        elapsed = time.perf_counter() - t0
+        print(f"{name:>16} {elapsed:>8.2f} {elapsed - sum(loads):>7.2f} {stale:>6} {calls:>6}")
+
+    print(f"\n{'reused DataSet':>28} {'seconds':>8} {'dead s':>7} {'ready':>6} {'stale':>6} {'unconfirmed':>11}")
+    os.environ['FAKE_IMARIS_REUSE_DATASET'] = '1'
+    for name, stage_shift, async_load in (('stage positions', '1', '1'),
+                                          ('same geometry, blocking', '0', '0'),
+                                          ('same geometry, async', '0', '1')):
+        os.environ.update(FAKE_IMARIS_STAGE_SHIFT=stage_shift, FAKE_IMARIS_ASYNC_LOAD=async_load)
+        app = _fake_imaris.FakeApplication()
+        statuses = []
+        stale = 0
+        t0 = time.perf_counter()
+        for path, load_sec in zip(paths, loads):
+            os.environ['FAKE_IMARIS_LOAD_SEC'] = str(load_sec)
+            load = _dataset_ready.open_file(app, path, timeout_sec=10 * args.load_sec[1])
+            statuses.append(load.status)
+            if app._loading is not None:
+                # Stale only if it was taken as ready; unconfirmed opens are not exported
+                stale += load.ready
+                time.sleep(max(0.0, app._loading[1] - time.perf_counter()))
+                app.GetDataSet()
+        elapsed = time.perf_counter() - t0
+        print(f"{name:>28} {elapsed:>8.2f} {elapsed - sum(loads):>7.2f} {statuses.count('ready'):>6} "
+              f"{stale:>6} {statuses.count('unconfirmed'):>11}")
+    os.environ.update(FAKE_IMARIS_REUSE_DATASET='0', FAKE_IMARIS_STAGE_SHIFT='0', FAKE_IMARIS_ASYNC_LOAD='1')
+
+    # Small files after large ones: each open is polled from FIRST_POLL_SEC,
+    # whatever the earlier files took
+    big, small = args.load_sec[1], args.load_sec[0]
+    app = _fake_imaris.FakeApplication()
+    waits = []
+    for k, load_sec in enumerate([big] * 6 + [small] * 6):
+        os.environ['FAKE_IMARIS_LOAD_SEC'] = str(load_sec)
+        waits.append(_dataset_ready.open_file(app, os.path.abspath(f"mixed_{k:04d}.ims")).seconds)
+    print(f"\nmixed sizes: {big} s loads take {sum(waits[:6]) / 6:.3f} s, "
+          f"then {small} s loads take {sum(waits[6:]) / 6:.3f} s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark morphometrics during export vs a second pass over the exported SWC files.
+
+Converts synthetic filaments, writes each to its own SWC like an exported
+corpus, then measures cable length, branch points, tips and Sholl profiles
+either from the in-memory SWC arrays (what MORPHOMETRY does in the export) or
+by reading every file back first. Checks both give the same numbers.
+
+    python benchmarks/bench_morphometry.py --files 200 --vertices 5000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from _synthetic import random_filament
+
+import _morphometry
+import _swc_convert
+import _swc_io
+from _coord_transform import CoordinateTransform
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--vertices', type=int, default=5000, help='vertices per file')
+    parser.add_argument('--sholl-step', type=float, default=10.0)
+    args = parser.parse_args()
+
+    # Anisotropic voxels, like the fake dataset: lengths are measured in world units
+    transform = CoordinateTransform(np.zeros(3), 1 / np.array([0.49, 0.49, 0.5]))
+    converted = []
+    for k in range(args.files):
+        p, r, t, e = random_filament(args.vertices, seed=k)
+        converted.append((k, 0, _swc_convert.filament_to_swc(p, r, t, e, transform, 'radius')[0]))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for k, _t, swc in converted:
+            paths.append(os.path.join(tmp, f'n{k:05d}.swc'))
+            _swc_io.write_swc(paths[-1], swc)
+
+        t0 = time.perf_counter()
+        in_export = _morphometry.measure_filaments(converted, args.sholl_step, transform)
+        t_export = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        second_pass = []
+        for k, path in enumerate(paths):
+            nodes = _swc_io.read_swc(path)
+            swc = np.column_stack([nodes[name] for name in ('id', 'type', 'x', 'y', 'z', 'radius', 'parent')])
+            second_pass.extend(_morphometry.measure_filaments([(k, 0, swc.astype(np.float64))], args.sholl_step,
+                                                              transform))
+        t_reread = time.perf_counter() - t0
+
+    for a, b in zip(in_export, second_pass):
+        assert (a['nodes'], a['branch_points'], a['tips']) == (b['nodes'], b['branch_points'], b['tips'])
+        assert abs(a['total_length'] - b['total_length']) < 1e-3 * max(1.0, a['total_length'])
+    total = _morphometry.summarize(in_export)
+    print(f"{args.files} files, {total['nodes']} nodes, {total['total_length']:.0f} {total['unit']} cable length, "
+          f"{total['branch_points']} branch points, {total['tips']} tips")
+    print(f"measured during export: {t_export:.3f} s")
+    print(f"re-read and measured:   {t_reread:.3f} s ({t_reread / t_export:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark SWC root policies and node numbering against a downstream re-sort.
+
+Converts synthetic filaments with every root policy and node order, checks that
+each result has its root first and every parent before its children, and
+compares the ordered export with the old index-rooted export followed by the
+kind of re-root and depth-first re-sort pass analysis pipelines run on it.
+
+    python benchmarks/bench_order.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from _synthetic import random_filament
+
+import _swc_convert
+from _coord_transform import CoordinateTransform
+
+
+def resort_swc(swc, root_id):
+    """Downstream re-sort: re-root an SWC tree at root_id and renumber it depth-first."""
+    neighbours = {}
+    for node, parent in zip(swc[:, 0].astype(int).tolist(), swc[:, 6].astype(int).tolist()):
+        neighbours.setdefault(node, [])
+        if parent != -1:
+            neighbours[node].append(parent)
+            neighbours.setdefault(parent, []).append(node)
+    rows = {node: k for k, node in enumerate(swc[:, 0].astype(int).tolist())}
+    order, parents, seen = [], [], {root_id}
+    stack = [(root_id, -1)]
+    while stack:
+        node, parent = stack.pop()
+        order.append(rows[node])
+        parents.append(parent)
+        row = len(order)
+        for other in reversed(neighbours[node]):
+            if other not in seen:
+                seen.add(other)
+                stack.append((other, row))
+    out = swc[order].copy()
+    out[:, 0] = np.arange(1, len(order) + 1)
+    out[:, 6] = parents
+    return out
+
+
+def _check(swc, root_xyz):
+    ids = swc[:, 0]
+    assert np.all((swc[:, 6] == -1) | (swc[:, 6] < ids)), 'parent after child'
+    assert np.allclose(swc[0, 2:5], root_xyz), 'root is not the first node'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--branch-prob', type=float, default=0.01)
+    parser.add_argument('--resort-max', type=int, default=1_000_000,
+                        help='skip the re-sort baseline above this many vertices')
+    args = parser.parse_args()
+    transform = CoordinateTransform(np.zeros(3), np.ones(3))
+
+    print(f"{'vertices':>10} {'root':>10} {'order':>6} {'convert s':>10}")
+    for n in args.sizes:
+        positions, radii, types, edges = random_filament(n, args.branch_prob, seed=n)
+        beginning = int(np.random.default_rng(n).integers(n))
+        for policy in _swc_convert.ROOT_POLICIES:
+            for order in _swc_convert.NODE_ORDERS:
+                t0 = time.perf_counter()
+                swc, _ = _swc_convert.filament_to_swc(positions, radii, types, edges, transform,
+                                                      policy, beginning, order)
+                elapsed = time.perf_counter() - t0
+                root = {'index': 0, 'beginning': beginning, 'radius': int(np.argmax(radii))}[policy]
+                _check(swc, positions[root])
+                print(f"{n:>10} {policy:>10} {order:>6} {elapsed:>10.3f}")
+
+        if n <= args.resort_max:
+            t0 = time.perf_counter()
+            swc, _ = _swc_convert.filament_to_swc(positions, radii, types, edges, transform, 'index')
+            root_id = int(swc[np.flatnonzero(np.all(swc[:, 2:5] == positions[beginning], axis=1))[0], 0])
+            resorted = resort_swc(swc, root_id)
+            t_resort = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            direct, _ = _swc_convert.filament_to_swc(positions, radii, types, edges, transform,
+                                                     'beginning', beginning, 'dfs')
+            t_direct = time.perf_counter() - t0
+            _check(resorted, positions[beginning])
+            assert sorted(map(tuple, resorted[:, 2:6])) == sorted(map(tuple, direct[:, 2:6]))
+            print(f"{n:>10}  index export + re-sort {t_resort:.3f} s, ordered export {t_direct:.3f} s "
+                  f"({t_resort / t_direct:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
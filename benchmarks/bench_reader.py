@@ -0,0 +1,61 @@
+"""Benchmark SWC parsing: np.loadtxt vs _swc_io.read_swc (read and mmap modes).
+
+Writes a synthetic SWC with a comment header, checks all parsers agree and
+reports time and MB/s. On NumPy >= 1.23 read_swc runs on loadtxt's C tokenizer,
+so the interesting comparison there is the 'pre-1.23 path' row, which is what
+older NumPy builds (as shipped with some Imaris versions) use instead of their
+pure-Python loadtxt.
+
+    python benchmarks/bench_reader.py --lines 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from _synthetic import random_filament
+
+from _coord_transform import CoordinateTransform
+import _swc_convert
+import _swc_io
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, nargs='+', default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'lines':>10} {'MB':>7} {'parser':>14} {'seconds':>9} {'MB/s':>8} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.lines:
+            p, r, t, e = random_filament(n, seed=n)
+            swc = _swc_convert.filament_to_swc(p, r, t, e, CoordinateTransform(np.zeros(3), np.ones(3)))[0]
+            path = os.path.join(tmp, 'bench.swc')
+            _swc_io.write_swc(path, swc, header=_swc_io.make_header(source='bench'))
+            mb = os.path.getsize(path) / 1e6
+
+            t0 = time.perf_counter()
+            ref = np.loadtxt(path)
+            t_ref = time.perf_counter() - t0
+            print(f"{n:>10} {mb:>7.1f} {'np.loadtxt':>14} {t_ref:>9.3f} {mb / t_ref:>8.1f} {1.0:>7.1f}x")
+
+            c_loadtxt = _swc_io._C_LOADTXT
+            for label, use_mmap, use_c in (('read_swc', False, c_loadtxt),
+                                           ('read_swc mmap', True, c_loadtxt),
+                                           ('pre-1.23 path', False, False)):
+                _swc_io._C_LOADTXT = use_c
+                t0 = time.perf_counter()
+                got = _swc_io.read_swc(path, use_mmap=use_mmap)
+                elapsed = time.perf_counter() - t0
+                _swc_io._C_LOADTXT = c_loadtxt
+                for k, name in enumerate(_swc_io.SWC_DTYPE.names):
+                    assert np.array_equal(got[name], ref[:, k].astype(got[name].dtype)), name
+                print(f"{'':>10} {'':>7} {label:>14} {elapsed:>9.3f} {mb / elapsed:>8.1f} "
+                      f"{t_ref / elapsed:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark Surpass scene lookups: repeated tree walks vs one scene index.
+
+Builds a fake scene of nested folders holding Filaments objects and other items,
+then counts the Ice calls (and time, with simulated latency) needed to look up
+Filaments objects `--lookups` times: walking the tree for each lookup, as the
+batch export did, against one _scene_index.SceneIndex, which walks it once.
+
+    python benchmarks/bench_scene.py --folders 10 --objects 5 --lookups 20 --latency-ms 0.5
+"""
+
+import argparse
+import os
+import time
+
+import _fake_imaris
+import _synthetic  # noqa: F401  (puts the repo root on sys.path)
+
+import _scene_index
+
+
+def _walk_first(vImaris):
+    """Tree walk stopping at the first Filaments object (the old per-call lookup)."""
+    vFactory = vImaris.GetFactory()
+    stack = [vImaris.GetSurpassScene()]
+    while stack:
+        container = stack.pop()
+        for i in range(container.GetNumberOfChildren()):
+            child = container.GetChild(i)
+            if vFactory.ToFilaments(child) is not None:
+                return child
+            folder = vFactory.ToDataContainer(child)
+            if folder is not None:
+                stack.append(folder)
+    return None
+
+
+def _build_scene(n_folders, n_objects, n_other):
+    folders = []
+    for f in range(n_folders):
+        # Non-Filaments items (volumes, spots, ...) come first, as in a typical scene
+        items = [_fake_imaris.FakeDataSet() for _ in range(n_other)]
+        items += [_fake_imaris.FakeFilaments(name=f'Neuron {f}.{k}') for k in range(n_objects)]
+        folders.append(_fake_imaris.FakeDataContainer(items, name=f'Region {f}'))
+    app = _fake_imaris.FakeApplication()
+    app._scene = _fake_imaris.FakeDataContainer(folders)
+    return app
+
+
+def _measure(fn, lookups):
+    calls = _fake_imaris.rpc_calls
+    t0 = time.perf_counter()
+    for _ in range(lookups):
+        fn()
+    return _fake_imaris.rpc_calls - calls, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--folders', type=int, default=10)
+    parser.add_argument('--objects', type=int, default=5, help='Filaments objects per folder')
+    parser.add_argument('--other', type=int, default=5, help='other items per folder')
+    parser.add_argument('--lookups', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=0.5, help='simulated Ice round-trip')
+    args = parser.parse_args()
+    os.environ['FAKE_IMARIS_LATENCY_MS'] = str(args.latency_ms)
+
+    app = _build_scene(args.folders, args.objects, args.other)
+    n_objects = len(_scene_index.SceneIndex(app).objects())
+
+    # A fresh index for each row, so each one pays for its own walk
+    rows = [
+        ('walk, first object', _measure(lambda: _walk_first(app), args.lookups)),
+        ('walk, all objects', _measure(lambda: _scene_index._walk(app.GetFactory(), app.GetSurpassScene()),
+                                       args.lookups)),
+        ('index, first object', _measure(_scene_index.SceneIndex(app).first, args.lookups)),
+        ('index, all objects', _measure(_scene_index.SceneIndex(app).select, args.lookups)),
+    ]
+    index = _scene_index.SceneIndex(app)
+    rows.append(('index, pattern', _measure(lambda: index.select('Neuron 3.*'), args.lookups)))
+
+    print(f"{n_objects} Filaments objects in {args.folders} folders, {args.lookups} lookups, "
+          f"{args.latency_ms} ms per call")
+    print(f"{'lookup':>20} {'calls':>7} {'seconds':>8}")
+    for name, (calls, seconds) in rows:
+        print(f"{name:>20} {calls:>7} {seconds:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark multi-instance batch export scaling against the fake Imaris.
+
+Creates a folder of placeholder .ims files, then exports it with 1..N fake
+Imaris instances through _batch_scheduler and reports throughput and speedup.
+The fake simulates dataset load time, so scaling mirrors real FileOpen-bound runs.
+
+    python benchmarks/bench_scheduler.py --files 40 --workers 1 2 4 --load-sec 0.2
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import _fake_imaris
+import _synthetic  # noqa: F401  (puts the repo root on sys.path)
+
+import _batch_scheduler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=40)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--load-sec', type=float, default=0.2, help='simulated FileOpen time')
+    parser.add_argument('--vertices', type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ['FAKE_IMARIS_LOAD_SEC'] = str(args.load_sec)
+    os.environ['FAKE_IMARIS_VERTICES'] = str(args.vertices)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = os.path.join(tmp, 'ims')
+        for i in range(args.files):
+            sub = os.path.join(input_dir, f"animal_{i % 4}")
+            os.makedirs(sub, exist_ok=True)
+            open(os.path.join(sub, f"cell_{i:04d}.ims"), 'wb').close()
+        files = sorted(os.path.join(r, f) for r, _d, fs in os.walk(input_dir) for f in fs)
+
+        baseline = None
+        print(f"{'workers':>8} {'seconds':>9} {'files/s':>8} {'speedup':>8} {'ok':>5}")
+        for n in args.workers:
+            output_dir = os.path.join(tmp, f"swc_{n}")
+            os.makedirs(output_dir)
+            slots = [('default -p 4029', k) for k in range(n)]
+            task = ('ExportSWC_Batch', '_export_one_file', {'input_dir': input_dir, 'output_dir': output_dir})
+            t0 = time.perf_counter()
+            results = _batch_scheduler.run_batch(files, slots, task, setup=_fake_imaris.install)
+            elapsed = time.perf_counter() - t0
+            _batch_scheduler.write_report(results, os.path.join(output_dir, 'batch_report.csv'))
+            baseline = baseline or elapsed
+            ok = sum(1 for r in results if r['status'] == 'ok')
+            print(f"{n:>8} {elapsed:>9.2f} {len(files) / elapsed:>8.1f} {baseline / elapsed:>7.1f}x {ok:>5}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark XTension start-up: import time of each tool module.
+
+Runs `python -X importtime -c "import <module>"` in fresh interpreters, with
+stand-in IceClient and Imaris modules on the path so ImarisLib imports without
+an Imaris installation, and reports the median cumulative import time of each
+module and whether numpy or tkinter were loaded by the import.
+
+    python benchmarks/bench_startup.py --repeat 7
+    python benchmarks/bench_startup.py --repo /path/to/other/checkout
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+MODULES = ['ExportSWC_Batch', 'ExportSWC_Single', 'ImportSWC_Single', 'ImportSWC_Folder',
+           'swc_cli', 'ImarisLib']
+HEAVY = ['numpy', 'tkinter']
+
+_STUBS = {
+    'IceClient.py': "class IceClient:\n    def __init__(self, *args):\n        pass\n",
+    'Imaris.py': "class IApplicationPrx:\n    @staticmethod\n    def checkedCast(proxy):\n        return proxy\n",
+}
+
+
+def _import_times(module, repo, stub_dir):
+    """(cumulative microseconds of `module`, names of all modules imported)."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([repo, stub_dir]))
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=repo, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+    total, names = None, set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line or 'cumulative' in line:
+            continue
+        _self, cumulative, name = line[len('import time:'):].split('|')
+        names.add(name.strip())
+        if name.strip() == module:
+            total = int(cumulative)
+    return total, names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--repo', default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as stub_dir:
+        for name, source in _STUBS.items():
+            with open(os.path.join(stub_dir, name), 'w') as f:
+                f.write(source)
+        print(f"{'module':>18} {'import ms':>10}  loads")
+        for module in MODULES:
+            if not os.path.exists(os.path.join(args.repo, module + '.py')):
+                continue
+            times, names = [], set()
+            for _ in range(args.repeat):
+                total, names = _import_times(module, args.repo, stub_dir)
+                times.append(total)
+            heavy = ', '.join(h for h in HEAVY if h in names) or '-'
+            print(f"{module:>18} {statistics.median(times) / 1000:>10.1f}  {heavy}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark batch output targets: per-filament .swc files vs one HDF5 store.
+
+Writes the same converted filaments (sources x filaments per source) as a
+mirrored tree of .swc files and as an _h5_store.MorphologyStore, then reads
+back random single neurons from each. Needs h5py.
+
+Local disks make file creation nearly free; --meta-ms adds that much sleep per
+file created or opened, to model the metadata round-trips of a network share.
+
+    python benchmarks/bench_store.py --sources 100 --filaments 100 --meta-ms 2
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from _synthetic import random_filament
+
+from _coord_transform import CoordinateTransform
+import _h5_store
+import _swc_convert
+import _swc_io
+
+
+def _tree_size(path):
+    files, size = 0, 0
+    for root, _dirs, names in os.walk(path):
+        for name in names:
+            files += 1
+            size += os.path.getsize(os.path.join(root, name))
+    return files, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sources', type=int, default=100, help='.ims files in the batch')
+    parser.add_argument('--filaments', type=int, default=100, help='filaments per source')
+    parser.add_argument('--vertices', type=int, default=200, help='vertices per filament')
+    parser.add_argument('--reads', type=int, default=200, help='random single-neuron reads')
+    parser.add_argument('--meta-ms', type=float, default=0.0, help='simulated cost per file open')
+    args = parser.parse_args()
+    meta = args.meta_ms / 1000.0
+
+    transform = CoordinateTransform([0.0, 0.0, 0.0], [2.048, 2.048, 2.0])
+    converted = []
+    for k in range(args.filaments):
+        p, r, t, e = random_filament(args.vertices, seed=k)
+        converted.append((k, 0, _swc_convert.filament_to_swc(p, r, t, e, transform)[0]))
+    keys = [f"animal_{s % 10}/cell_{s:05d}" for s in range(args.sources)]
+    rng = np.random.default_rng(0)
+    picks = [(keys[rng.integers(len(keys))], int(rng.integers(args.filaments))) for _ in range(args.reads)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tree = os.path.join(tmp, 'swc')
+        t0 = time.perf_counter()
+        for key in keys:
+            os.makedirs(os.path.join(tree, os.path.dirname(key)), exist_ok=True)
+            for i, _t, swc in converted:
+                time.sleep(meta)
+                _swc_io.write_swc(os.path.join(tree, f"{key}_filament_{i}.swc"), swc)
+        t_tree = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for key, i in picks:
+            time.sleep(meta)
+            _swc_io.read_swc(os.path.join(tree, f"{key}_filament_{i}.swc"))
+        r_tree = (time.perf_counter() - t0) / len(picks)
+
+        store_path = os.path.join(tmp, _h5_store.STORE_NAME)
+        t0 = time.perf_counter()
+        time.sleep(meta)
+        with _h5_store.MorphologyStore(store_path) as store:
+            for key in keys:
+                store.write_source(key, converted)
+        t_store = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        time.sleep(meta)
+        with _h5_store.MorphologyStore(store_path, 'r') as store:
+            for key, i in picks:
+                swc = store.read_filament(key, f'filament_{i}')
+        r_store = (time.perf_counter() - t0) / len(picks)
+        assert np.array_equal(swc, converted[picks[-1][1]][2])
+
+        total = args.sources * args.filaments
+        print(f"{total} filaments of {args.vertices} vertices from {args.sources} sources")
+        print(f"{'target':>10} {'files':>7} {'MB':>7} {'write s':>8} {'read ms':>8}")
+        files, size = _tree_size(tree)
+        print(f"{'swc files':>10} {files:>7} {size / 1e6:>7.1f} {t_tree:>8.2f} {r_tree * 1e3:>8.2f}")
+        print(f"{'hdf5':>10} {1:>7} {os.path.getsize(store_path) / 1e6:>7.1f} {t_store:>8.2f} "
+              f"{r_store * 1e3:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark peak memory of in-memory vs streaming SWC export with tracemalloc.
+
+Exports one Filaments object of the fake Imaris with _export_filaments_to_swc,
+once holding every filament (bulk fetch, convert all, write) and once with
+EXPORT_STREAMING (one filament at a time), checks both files are identical and
+reports the traced peak next to the size of the largest single filament.
+
+    python benchmarks/bench_stream.py --filaments 50 --vertices 20000
+"""
+
+import argparse
+import filecmp
+import os
+import tempfile
+import time
+import tracemalloc
+
+import _fake_imaris
+import _synthetic  # noqa: F401  (puts the repo root on sys.path)
+
+
+def _export(exporter, streaming, path):
+    vImaris = _fake_imaris.ImarisLib().GetApplication(0)
+    vFilaments = vImaris.GetSurpassSelection()
+    exporter.EXPORT_STREAMING = streaming
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    exporter._export_filaments_to_swc(vImaris, vFilaments, path)
+    elapsed = time.perf_counter() - t0
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filaments', type=int, nargs='+', default=[10, 40])
+    parser.add_argument('--vertices', type=int, default=20000, help='vertices per filament')
+    parser.add_argument('--time-index', action='store_true', help='export with EXPORT_TIME_INDEX')
+    args = parser.parse_args()
+    os.environ.update(FAKE_IMARIS_LOAD_SEC='0', FAKE_IMARIS_VERTICES=str(args.vertices),
+                      FAKE_IMARIS_TIME_POINTS='4' if args.time_index else '1')
+    _fake_imaris.install()
+    import ExportSWC_Batch as exporter
+    exporter.EXPORT_TIME_INDEX = args.time_index
+
+    print(f"{'filaments':>9} {'mode':>10} {'peak MB':>9} {'seconds':>8} {'file MB':>8}  identical")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.filaments:
+            os.environ['FAKE_IMARIS_FILAMENTS'] = str(count)
+            _fake_imaris.ImarisLib().GetApplication(0).FileOpen(os.path.join(tmp, 'cell.ims'), '')
+            paths = {}
+            for mode, streaming in (('in memory', False), ('streaming', True)):
+                paths[mode] = os.path.join(tmp, f'{streaming}.swc')
+                peak, elapsed = _export(exporter, streaming, paths[mode])
+                same = filecmp.cmp(paths['in memory'], paths[mode], shallow=False)
+                print(f"{count:>9} {mode:>10} {peak / 2**20:>9.1f} {elapsed:>8.3f} "
+                      f"{os.path.getsize(paths[mode]) / 2**20:>8.1f}  {same}")
+
+        os.environ['FAKE_IMARIS_FILAMENTS'] = '1'
+        _fake_imaris.ImarisLib().GetApplication(0).FileOpen(os.path.join(tmp, 'one.ims'), '')
+        peak, _elapsed = _export(exporter, True, os.path.join(tmp, 'one.swc'))
+        print(f"Streaming peak for a single filament: {peak / 2**20:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""Run the export and import tools end to end against the fake Imaris and track throughput.
+
+Scenarios (best of --repeat runs each):
+  export_filaments  ExportSWC_Batch._export_filaments_to_swc on one Filaments object
+  batch_export      run_batch_export (the XTExportSWC_Batch work) over a folder of files
+  import_file       ImportSWC_Single.import_file (the XTImportSWC work) of one SWC file
+  import_folder     ImportSWC_Folder.import_folder of the batch output
+
+Every run is appended to a history file. Each scenario is compared with the
+latest earlier run of the same settings, and a throughput drop of more than
+--threshold is reported as a regression (exit code 1 with --fail-on-regression).
+
+    python benchmarks/bench_suite.py --vertices 2000 --filaments 3 --latency-ms 0.5
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+import _fake_imaris
+import _synthetic  # noqa: F401  (puts the repo root on sys.path)
+
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_history.jsonl')
+
+SCENARIOS = ('export_filaments', 'batch_export', 'import_file', 'import_folder')
+
+
+def _make_inputs(folder, count):
+    for i in range(count):
+        sub = os.path.join(folder, f"animal_{i % 4}")
+        os.makedirs(sub, exist_ok=True)
+        open(os.path.join(sub, f"cell_{i:04d}.ims"), 'wb').close()
+
+
+def _export_filaments(tmp, args):
+    import ExportSWC_Batch
+    vImaris = _fake_imaris.ImarisLib().GetApplication(0)
+    vImaris.FileOpen(os.path.join(tmp, 'single.ims'), '')
+    vFilaments = vImaris.GetSurpassSelection()
+    t0 = time.perf_counter()
+    ExportSWC_Batch._export_filaments_to_swc(vImaris, vFilaments, os.path.join(tmp, 'single.swc'))
+    return time.perf_counter() - t0, args.filaments * args.vertices
+
+
+def _batch_export(tmp, args):
+    import ExportSWC_Batch
+    input_dir = os.path.join(tmp, 'ims')
+    output_dir = os.path.join(tmp, 'swc')
+    shutil.rmtree(output_dir, ignore_errors=True)  # a fresh manifest, so nothing is skipped
+    os.makedirs(output_dir)
+    vImaris = _fake_imaris.ImarisLib().GetApplication(0)
+    t0 = time.perf_counter()
+    summary = ExportSWC_Batch.run_batch_export(vImaris, (None, 0), input_dir, output_dir)
+    elapsed = time.perf_counter() - t0
+    assert summary['exported'] == args.files, summary
+    return elapsed, args.files
+
+
+def _import_file(tmp, args):
+    import ImportSWC_Single
+    vImaris = _fake_imaris.ImarisLib().GetApplication(0)
+    vImaris.NewScene()
+    t0 = time.perf_counter()
+    ImportSWC_Single.import_file(vImaris, os.path.join(tmp, 'single.swc'))
+    return time.perf_counter() - t0, args.filaments * args.vertices
+
+
+def _import_folder(tmp, args):
+    import ImportSWC_Folder
+    vImaris = _fake_imaris.ImarisLib().GetApplication(0)
+    vImaris.NewScene()
+    t0 = time.perf_counter()
+    summary = ImportSWC_Folder.import_folder(vImaris, os.path.join(tmp, 'swc'), recursive=True)
+    elapsed = time.perf_counter() - t0
+    assert summary['imported'] == args.files, summary
+    return elapsed, args.files
+
+
+# scenario -> (function(tmp, args) -> (seconds, items), throughput unit)
+_RUNNERS = {
+    'export_filaments': (_export_filaments, 'vertices/s'),
+    'batch_export': (_batch_export, 'files/s'),
+    'import_file': (_import_file, 'vertices/s'),
+    'import_folder': (_import_folder, 'files/s'),
+}
+
+
+def _config(args):
+    """Settings a run is compared on; runs with other settings are not comparable."""
+    return {'vertices': args.vertices, 'filaments': args.filaments, 'branch_prob': args.branch_prob,
+            'time_points': args.time_points, 'latency_ms': args.latency_ms, 'load_sec': args.load_sec,
+            'files': args.files, 'host': platform.node(), 'python': platform.python_version()}
+
+
+def _load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _previous(history, config, scenario):
+    for run in reversed(history):
+        if run['config'] == config and scenario in run['results']:
+            return run['results'][scenario]
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vertices', type=int, default=2000, help='vertices per filament')
+    parser.add_argument('--filaments', type=int, default=3, help='filaments per dataset')
+    parser.add_argument('--branch-prob', type=float, default=0.01, help='chance a vertex starts a branch')
+    parser.add_argument('--time-points', type=int, default=1)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='injected latency per Imaris call')
+    parser.add_argument('--load-sec', type=float, default=0.0, help='simulated FileOpen time')
+    parser.add_argument('--files', type=int, default=20, help='files in the batch scenarios')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per scenario; the best counts')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--history', default=HISTORY_PATH, help='JSON lines file of earlier runs')
+    parser.add_argument('--threshold', type=float, default=0.1, help='throughput drop counted as regression')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    os.environ.update(FAKE_IMARIS_VERTICES=str(args.vertices), FAKE_IMARIS_FILAMENTS=str(args.filaments),
+                      FAKE_IMARIS_BRANCH_PROB=str(args.branch_prob),
+                      FAKE_IMARIS_TIME_POINTS=str(args.time_points),
+                      FAKE_IMARIS_LATENCY_MS=str(args.latency_ms), FAKE_IMARIS_LOAD_SEC=str(args.load_sec))
+    _fake_imaris.install()
+    # The tools log every file; only the measurements matter here
+    logging.disable(logging.INFO)
+
+    config = _config(args)
+    history = _load_history(args.history)
+    results = {}
+    regressions = []
+    print(f"{'scenario':>17} {'seconds':>9} {'throughput':>14} {'unit':>11} {'calls':>7} {'change':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        _make_inputs(os.path.join(tmp, 'ims'), args.files)
+        # The import scenarios read what the export scenarios wrote
+        scenarios = [s for s in SCENARIOS if s in args.scenarios or
+                     (s == 'export_filaments' and 'import_file' in args.scenarios) or
+                     (s == 'batch_export' and 'import_folder' in args.scenarios)]
+        for scenario in scenarios:
+            run, unit = _RUNNERS[scenario]
+            best = None
+            for _ in range(args.repeat):
+                calls = _fake_imaris.rpc_calls
+                seconds, items = run(tmp, args)
+                calls = _fake_imaris.rpc_calls - calls
+                if best is None or seconds < best[0]:
+                    best = (seconds, items, calls)
+            if scenario not in args.scenarios:
+                continue
+            seconds, items, calls = best
+            result = results[scenario] = {'seconds': round(seconds, 5), 'throughput': round(items / seconds, 3),
+                                          'unit': unit, 'rpc_calls': calls}
+            change = ''
+            previous = _previous(history, config, scenario)
+            if previous is not None:
+                ratio = result['throughput'] / previous['throughput'] - 1.0
+                change = f"{100 * ratio:+.1f}%"
+                if ratio < -args.threshold:
+                    regressions.append((scenario, previous['throughput'], result['throughput'], unit))
+            print(f"{scenario:>17} {seconds:>9.4f} {result['throughput']:>14.1f} {unit:>11} {calls:>7} {change:>8}")
+
+    with open(args.history, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'time': datetime.datetime.now().isoformat(timespec='seconds'),
+                            'config': config, 'results': results}) + '\n')
+    for scenario, before, now, unit in regressions:
+        print(f"REGRESSION {scenario}: {before:.1f} -> {now:.1f} {unit}")
+    if not regressions:
+        print("No regressions" if any(_previous(history, config, s) for s in results)
+              else f"Baseline recorded in {args.history}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
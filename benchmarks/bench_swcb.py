@@ -0,0 +1,86 @@
+"""Benchmark the binary .swcb format against text SWC: file size, save and load time.
+
+Writes the same converted filaments both ways and reads them back, once as raw
+columns (read_swc vs memory-mapped SWCBFile) and once through the import
+loader (_swc_import.load_swc_file), checking both give the same nodes.
+
+    python benchmarks/bench_swcb.py --nodes 100000 1000000 --filaments 20
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from _synthetic import random_filament
+
+from _coord_transform import CoordinateTransform
+import _swc_binary
+import _swc_convert
+import _swc_import
+import _swc_io
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nodes', type=int, nargs='+', default=[100_000, 1_000_000],
+                        help='total nodes per file')
+    parser.add_argument('--filaments', type=int, default=20)
+    args = parser.parse_args()
+
+    transform = CoordinateTransform([0.0, 0.0, 0.0], [2.048, 2.048, 2.0])
+
+    print(f"{'nodes':>9} {'format':>6} {'MB':>7} {'save s':>8} {'load s':>8} {'import s':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for total in args.nodes:
+            per = max(1, total // args.filaments)
+            swcs = []
+            for k in range(args.filaments):
+                p, r, t, e = random_filament(per, seed=k)
+                swcs.append(_swc_convert.filament_to_swc(p, r, t, e, transform)[0])
+
+            text_path = os.path.join(tmp, 'bench.swc')
+            binary_path = os.path.join(tmp, 'bench.swcb')
+
+            def save_text():
+                with _swc_io.SWCWriter(text_path) as writer:
+                    for swc in swcs:
+                        writer.append(swc)
+
+            _, save_text_s = _timed(save_text)
+            _, save_binary_s = _timed(lambda: _swc_binary.write_swcb(binary_path, swcs))
+
+            text, load_text_s = _timed(lambda: _swc_io.read_swc(text_path))
+
+            def load_binary():
+                # Opening maps the file; summing touches every coordinate page
+                swcb = _swc_binary.SWCBFile(binary_path)
+                swcb.xyz.sum()
+                return swcb
+
+            swcb, load_binary_s = _timed(load_binary)
+            assert np.array_equal(text['id'], swcb.id) and np.array_equal(text['parent'], swcb.parent)
+            assert np.allclose(text['x'], swcb.xyz[:, 0], atol=1e-6)
+            swcb.close()
+
+            imported_text, import_text_s = _timed(lambda: _swc_import.load_swc_file(text_path, transform))
+            imported_binary, import_binary_s = _timed(lambda: _swc_import.load_swc_file(binary_path, transform))
+            assert len(imported_text) == len(imported_binary)
+
+            for fmt, path, save_s, load_s, import_s in (
+                    ('swc', text_path, save_text_s, load_text_s, import_text_s),
+                    ('swcb', binary_path, save_binary_s, load_binary_s, import_binary_s)):
+                print(f"{per * args.filaments:>9} {fmt:>6} {os.path.getsize(path) / 1e6:>7.1f} "
+                      f"{save_s:>8.3f} {load_s:>8.3f} {import_s:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
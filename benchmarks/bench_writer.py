@@ -0,0 +1,61 @@
+"""Benchmark SWC writing: np.vstack + np.savetxt vs the streaming _swc_io.SWCWriter.
+
+Writes a combined file of several filaments both ways, checks the files are
+byte-identical and reports throughput in MB/s.
+
+    python benchmarks/bench_writer.py --nodes 1000000 3000000 --filaments 20
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from _synthetic import random_filament
+
+from _coord_transform import CoordinateTransform
+import _swc_convert
+import _swc_io
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nodes', type=int, nargs='+', default=[100_000, 1_000_000, 3_000_000],
+                        help='total nodes in the combined file')
+    parser.add_argument('--filaments', type=int, default=20)
+    args = parser.parse_args()
+
+    transform = CoordinateTransform([0.0, 0.0, 0.0], [2.048, 2.048, 2.0])
+
+    print(f"{'nodes':>10} {'MB':>8} {'savetxt MB/s':>13} {'writer MB/s':>12} {'speedup':>8}  identical")
+    with tempfile.TemporaryDirectory() as tmp:
+        for total in args.nodes:
+            per = max(1, total // args.filaments)
+            swcs = []
+            for k in range(args.filaments):
+                p, r, t, e = random_filament(per, seed=k)
+                swcs.append(_swc_convert.filament_to_swc(p, r, t, e, transform)[0])
+
+            old_path = os.path.join(tmp, 'savetxt.swc')
+            t0 = time.perf_counter()
+            np.savetxt(old_path, _swc_convert.combine_swc(swcs), fmt=_swc_convert.SWC_FORMAT, delimiter=' ')
+            t_old = time.perf_counter() - t0
+
+            new_path = os.path.join(tmp, 'writer.swc')
+            t0 = time.perf_counter()
+            with _swc_io.SWCWriter(new_path) as writer:
+                for swc in swcs:
+                    writer.append(swc)
+            t_new = time.perf_counter() - t0
+
+            mb = os.path.getsize(old_path) / 1e6
+            with open(old_path, 'rb') as a, open(new_path, 'rb') as b:
+                same = a.read() == b.read()
+            print(f"{per * args.filaments:>10} {mb:>8.1f} {mb / t_old:>13.1f} {mb / t_new:>12.1f} "
+                  f"{t_old / t_new:>7.1f}x  {same}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+# Command-line driver for the SWC export and import tools
+# Runs single export, batch export and folder import without any Tk dialog (and
+# without importing tkinter), for scheduled runs on processing nodes. Settings
+# that the XTensions read from their module constants are given as arguments.
+# A JSON summary is written to stdout (or --summary) and the exit code tells
+# the outcome:
+#
+#   0  everything succeeded (or was already up to date)
+#   1  some files or filaments failed; see the summary
+#   2  invalid arguments
+#   3  could not connect to Imaris
+#   4  nothing to process (no input files, no Filaments object)
+#   5  unexpected error; the message is in the summary
+#   6  no dataset open in Imaris to import into
+#
+# Examples:
+#   python -m swc_cli batch D:/data/ims D:/data/swc --worker "default -h node2 -p 4029" 0
+#   python -m swc_cli export --input cell.ims --output cell.swc --object "Neuron*"
+#   python -m swc_cli import D:/data/swc --recursive --one-object
+
+import argparse
+import functools
+import json
+import logging
+import os
+import sys
+import traceback
+
+import _utils
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_NO_IMARIS = 3
+EXIT_NO_INPUT = 4
+EXIT_ERROR = 5
+EXIT_NO_DATASET = 6
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m swc_cli', description='Headless SWC export and import for Imaris.',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='exit codes: 0 ok, 1 some items failed, 2 invalid arguments, 3 no Imaris connection,\n'
+               '            4 nothing to process, 5 unexpected error, 6 no dataset open (import)')
+    parser.add_argument('--imaris-id', type=int, default=0, help='Imaris application id (default 0)')
+    parser.add_argument('--endpoints', help="Ice endpoints of that Imaris, e.g. 'default -h node1 -p 4029'")
+    parser.add_argument('--summary', default='-', help="JSON summary file ('-': stdout)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export = argparse.ArgumentParser(add_help=False)
+    export.add_argument('--format', choices=['swc', 'swcb'], default='swc')
+    export.add_argument('--time-index', action='store_true', help='write TIME_INDEX sections')
+    export.add_argument('--header', action='store_true', help="start each SWC with a '#' header")
+    export.add_argument('--root', choices=['beginning', 'index', 'radius'], default='beginning',
+                        help='where each tree is rooted (SWC_ROOT)')
+    export.add_argument('--order', choices=['bfs', 'dfs'], default='bfs', help='node numbering (SWC_ORDER)')
+    export.add_argument('--stream', action='store_true',
+                        help='convert and write one filament at a time (EXPORT_STREAMING)')
+    export.add_argument('--convert-workers', type=int, default=None,
+                        help='processes converting large objects (CONVERT_WORKERS; 0: none)')
+    export.add_argument('--morphometry', action='store_true',
+                        help='write length, branch, tip and Sholl metrics CSVs (MORPHOMETRY)')
+    export.add_argument('--sholl-step', type=float, default=10.0, help='Sholl radius step in micrometres (SHOLL_STEP)')
+
+    single = commands.add_parser('export', parents=[export], help='export one Filaments object')
+    single.add_argument('--output', required=True, help='combined SWC (or .swcb) file to write')
+    single.add_argument('--input', help='.ims file to open first (default: the loaded dataset)')
+    single.add_argument('--object', help='glob on the object name or path (default: the selected '
+                                         'object, else the first one)')
+    single.add_argument('--individual', action='store_true', help='also write one SWC per filament')
+
+    batch = commands.add_parser('batch', parents=[export], help='export every .ims file of a folder tree')
+    batch.add_argument('input_dir')
+    batch.add_argument('output_dir')
+    batch.add_argument('--worker', nargs=2, action='append', default=[], metavar=('ENDPOINTS', 'ID'),
+                       help='extra Imaris instance (repeat for more)')
+    batch.add_argument('--target', choices=['files', 'hdf5'], default='files', help='BATCH_OUTPUT')
+    batch.add_argument('--objects', default='first', help="'first', 'all' or a glob (EXPORT_OBJECTS)")
+    batch.add_argument('--hash-sources', action='store_true', help='MANIFEST_HASH_SOURCES')
+    batch.add_argument('--load-timeout', type=float, default=120.0, help='seconds to wait for a file')
+    batch.add_argument('--no-metrics', action='store_true', help='no batch_metrics_*.jsonl (PERF_LOG)')
+
+    imp = commands.add_parser('import', help='import every SWC file of a folder')
+    imp.add_argument('input_dir')
+    imp.add_argument('--recursive', action='store_true', help='include subfolders')
+    imp.add_argument('--one-object', action='store_true', help='all files into one Filaments object')
+    imp.add_argument('--workers', type=int, default=None, help='parser processes (0: none)')
+    return parser
+
+
+def apply_export_settings(settings):
+    """Set ExportSWC_Batch module constants; also run in batch worker processes."""
+    import ExportSWC_Batch
+    for name, value in settings.items():
+        setattr(ExportSWC_Batch, name, value)
+    return ExportSWC_Batch
+
+
+def _export_settings(args):
+    settings = {'EXPORT_FORMAT': args.format, 'EXPORT_TIME_INDEX': args.time_index,
+                'WRITE_SWC_HEADER': args.header, 'SWC_ROOT': args.root, 'SWC_ORDER': args.order,
+                'EXPORT_STREAMING': args.stream, 'MORPHOMETRY': args.morphometry,
+                'SHOLL_STEP': args.sholl_step}
+    if args.convert_workers is not None:
+        settings['CONVERT_WORKERS'] = args.convert_workers
+    if args.command == 'batch':
+        settings.update(BATCH_WORKERS=[(endpoints, int(i)) for endpoints, i in args.worker],
+                        BATCH_OUTPUT=args.target, EXPORT_OBJECTS=args.objects,
+                        MANIFEST_HASH_SOURCES=args.hash_sources, LOAD_TIMEOUT_SEC=args.load_timeout,
+                        PERF_LOG=not args.no_metrics)
+    return settings
+
+
+def _run_export(args, vImaris):
+    import _dataset_ready
+    import _perf
+    import _scene_index
+    exporter = apply_export_settings(_export_settings(args))
+    metrics = _perf.new_metrics()
+    summary = {'output': args.output, 'object': None, 'filaments': 0, 'metrics': metrics}
+    if args.input:
+        with _perf.span(metrics, 'open'):
+            load = _dataset_ready.open_file(vImaris, args.input, timeout_sec=exporter.LOAD_TIMEOUT_SEC)
+        summary.update(input=args.input, load_seconds=round(load.seconds, 3))
+        if not load.ready:
+            summary['error'] = _dataset_ready.MESSAGES[load.status]
+            return EXIT_FAILED, summary
+    index = _scene_index.SceneIndex(vImaris)
+    if args.object:
+        matches = index.select(args.object)
+        vFilaments = matches[0].filaments if matches else None
+    else:
+        vFilaments = vImaris.GetFactory().ToFilaments(vImaris.GetSurpassSelection())
+        if vFilaments is None and index.first() is not None:
+            vFilaments = index.first().filaments
+    if vFilaments is None:
+        summary['error'] = 'No matching Filaments object in scene'
+        return EXIT_NO_INPUT, summary
+    summary.update(object=vFilaments.GetName(), filaments=vFilaments.GetNumberOfFilaments())
+    if not exporter._export_filaments_to_swc(vImaris, vFilaments, args.output, args.individual, metrics):
+        summary['error'] = 'Filaments object has no vertices'
+        return EXIT_NO_INPUT, summary
+    return EXIT_OK, summary
+
+
+def _run_batch(args, vImaris):
+    settings = _export_settings(args)
+    exporter = apply_export_settings(settings)
+    summary = exporter.run_batch_export(vImaris, (args.endpoints, args.imaris_id), args.input_dir,
+                                        args.output_dir,
+                                        worker_setup=functools.partial(apply_export_settings, settings))
+    if not summary['files']:
+        return EXIT_NO_INPUT, summary
+    return (EXIT_FAILED if summary['failed'] else EXIT_OK), summary
+
+
+def _run_import(args, vImaris):
+    import ImportSWC_Folder
+    summary = ImportSWC_Folder.import_folder(vImaris, args.input_dir, args.recursive,
+                                             args.one_object, args.workers)
+    if not summary['files']:
+        return EXIT_NO_INPUT, summary
+    if 'error' in summary:
+        return EXIT_NO_DATASET, summary
+    return (EXIT_FAILED if summary['failed'] else EXIT_OK), summary
+
+
+def _write_summary(path, summary):
+    text = json.dumps(summary, indent=2, default=str)
+    if path == '-':
+        sys.stdout.write(text + '\n')
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+
+def main(argv=None):
+    parser = _parser()
+    args = parser.parse_args(argv)
+    for folder in (getattr(args, 'input_dir', None), getattr(args, 'output_dir', None)):
+        if folder is not None and not os.path.isdir(folder):
+            parser.error(f"not a folder: {folder}")
+    summary = {'command': args.command}
+    # Log to stderr; stdout is reserved for the JSON summary
+    _utils.setup_logging()
+    try:
+        import _imaris_pool
+        vImaris = _imaris_pool.get_application(args.imaris_id, args.endpoints)
+        if vImaris is None:
+            code, result = EXIT_NO_IMARIS, {'error': 'Could not connect to Imaris'}
+        else:
+            run = {'export': _run_export, 'batch': _run_batch, 'import': _run_import}[args.command]
+            code, result = run(args, vImaris)
+    except Exception as e:
+        logging.error("swc_cli error:\n" + traceback.format_exc())
+        code, result = EXIT_ERROR, {'error': f"{type(e).__name__}: {e}"}
+    summary.update(result)
+    summary['exit_code'] = code
+    _write_summary(args.summary, summary)
+    return code
+
+
+if __name__ == '__main__':
+    sys.exit(main())